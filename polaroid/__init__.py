@@ -6,9 +6,28 @@ Polaroid Generator Library
 с физически корректной эмуляцией оптики, химии и бумаги.
 """
 
-from .core import process_image
+from .core import process_image, process_path
+from .batch import process_batch, BatchItem, BatchStats
+from .aio import process_image_async, AsyncRenderer
+from .tiled import process_image_tiled, iter_tiles
+from .sequence import process_sequence, save_animation
+from .variants import process_variants
 from .data import PolaroidResult
-from .exceptions import PolaroidError, ImageValidationError
+from .encode import render_to_bytes, EncodedOutput
+from .result_cache import ResultCache
+from .profiles import register_profile, unregister_profile, get_profile, list_profiles, CompiledProfile
+from .trace import TraceCollector, Span
+from .exceptions import (
+    PolaroidError, ImageValidationError, InvalidProfileError, RendererOverloadedError, EncodingError
+)
 
 __version__ = "1.0.0"
-__all__ = ["process_image", "PolaroidResult", "PolaroidError", "ImageValidationError"]
\ No newline at end of file
+__all__ = [
+    "process_image", "process_path", "process_batch", "BatchItem", "BatchStats",
+    "process_image_async", "AsyncRenderer", "process_image_tiled", "iter_tiles",
+    "process_sequence", "save_animation", "process_variants",
+    "PolaroidResult", "render_to_bytes", "EncodedOutput", "ResultCache", "TraceCollector", "Span",
+    "register_profile", "unregister_profile", "get_profile", "list_profiles", "CompiledProfile",
+    "PolaroidError", "ImageValidationError", "InvalidProfileError", "RendererOverloadedError",
+    "EncodingError",
+]
\ No newline at end of file
@@ -0,0 +1,201 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Callable, Union
+from PIL import Image
+from . import config
+from .core import process_image, process_path
+from .data import PolaroidResult
+from .exceptions import RendererOverloadedError
+
+async def process_image_async(image: Image.Image, executor: Executor = None, eager_side_outputs: bool = False,
+                              **kwargs) -> PolaroidResult:
+    """
+    Асинхронная обертка над process_image: рендер выполняется в пуле, не блокируя event loop.
+
+    Без ограничения очереди; для сервиса под нагрузкой используйте AsyncRenderer.
+
+    Args:
+        image (Image.Image): Исходное изображение.
+        executor (Executor, optional): Пул для рендера. None — пул event loop по умолчанию.
+        eager_side_outputs (bool, optional): Строить маску и карту нормалей в пуле вместе с
+                                             рендером, а не лениво при обращении (в потоке
+                                             event loop). Defaults to False.
+        **kwargs: Параметры process_image (profile, seed, target_size и др.).
+
+    Returns:
+        PolaroidResult: Результат обработки.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(_render, process_image, image, eager_side_outputs,
+                                                                  kwargs))
+
+@dataclass
+class RendererStats:
+    """
+    Состояние и счетчики AsyncRenderer.
+
+    Attributes:
+        queue_depth (int): Сколько запросов сейчас ждут свободного слота.
+        in_flight (int): Сколько рендеров выполняется прямо сейчас.
+        submitted (int): Всего принятых запросов.
+        completed (int): Успешно завершенных рендеров.
+        failed (int): Рендеров, завершившихся ошибкой.
+        rejected (int): Отказов из-за заполненной очереди.
+        timed_out (int): Отказов из-за превышения времени ожидания в очереди.
+        total_wait (float): Суммарное время ожидания слота, секунды.
+        max_wait (float): Максимальное время ожидания слота, секунды.
+    """
+    queue_depth: int = 0
+    in_flight: int = 0
+    submitted: int = 0
+    completed: int = 0
+    failed: int = 0
+    rejected: int = 0
+    timed_out: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    @property
+    def mean_wait(self) -> float:
+        """Среднее время ожидания слота для запросов, дошедших до рендера, секунды."""
+        started = self.completed + self.failed + self.in_flight
+        return self.total_wait / started if started else 0.0
+
+class AsyncRenderer:
+    """
+    Асинхронный рендерер с ограниченной параллельностью и очередью.
+
+    Одновременно выполняется не более concurrency рендеров, остальные запросы
+    ждут слота. Если ждущих уже max_queue, новый запрос сразу получает
+    RendererOverloadedError (вместо неограниченного роста памяти и задержек);
+    запрос, прождавший дольше queue_timeout, тоже снимается с очереди.
+    Время ожидания каждого запроса попадает в style_info["queue_wait"].
+
+    Пример:
+        async with AsyncRenderer(concurrency=4, max_queue=16) as renderer:
+            result = await renderer.render(image, seed=1)
+            renderer.stats.queue_depth
+    """
+    def __init__(self, concurrency: int = None, max_queue: int = None, queue_timeout: float = None,
+                 executor: Executor = None):
+        """
+        Args:
+            concurrency (int, optional): Максимум одновременных рендеров.
+                                         Defaults to config.ASYNC_CONCURRENCY (по числу ядер).
+            max_queue (int, optional): Максимум ждущих запросов. Defaults to config.ASYNC_MAX_QUEUE.
+            queue_timeout (float, optional): Максимальное ожидание слота, секунды.
+                                             Defaults to config.ASYNC_QUEUE_TIMEOUT.
+            executor (Executor, optional): Пул для рендеров. По умолчанию создается
+                                           собственный пул потоков на concurrency потоков.
+        """
+        if concurrency is None:
+            concurrency = config.ASYNC_CONCURRENCY or os.cpu_count() or 1
+        if concurrency < 1:
+            raise ValueError("concurrency must be at least 1")
+
+        self.concurrency = concurrency
+        self.max_queue = config.ASYNC_MAX_QUEUE if max_queue is None else max_queue
+        self.queue_timeout = config.ASYNC_QUEUE_TIMEOUT if queue_timeout is None else queue_timeout
+        self.stats = RendererStats()
+
+        self._owns_executor = executor is None
+        self._executor = executor or ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="polaroid-async")
+        self._semaphore = None
+        self._closed = False
+
+    async def render(self, image: Image.Image, eager_side_outputs: bool = False, **kwargs) -> PolaroidResult:
+        """
+        Рендерит изображение (см. process_image), ожидая свободного слота.
+
+        С eager_side_outputs=True маска и карта нормалей строятся в пуле в том же
+        слоте, а не лениво при обращении в потоке event loop.
+
+        Raises:
+            RendererOverloadedError: Если очередь заполнена или ожидание превысило queue_timeout.
+        """
+        return await self._submit(functools.partial(_render, process_image, image, eager_side_outputs, kwargs))
+
+    async def render_path(self, fp: Union[str, BinaryIO], eager_side_outputs: bool = False,
+                          **kwargs) -> PolaroidResult:
+        """
+        Рендерит изображение из файла (см. process_path); декодирование тоже идет в пуле.
+
+        Raises:
+            RendererOverloadedError: Если очередь заполнена или ожидание превысило queue_timeout.
+        """
+        return await self._submit(functools.partial(_render, process_path, fp, eager_side_outputs, kwargs))
+
+    async def close(self) -> None:
+        """Перестает принимать запросы и дожидается завершения рендеров в собственном пуле."""
+        self._closed = True
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _submit(self, job) -> PolaroidResult:
+        if self._closed:
+            raise RuntimeError("AsyncRenderer is closed")
+        if self._semaphore is None:
+            # Семафор создается в том event loop, где рендерер используется
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        stats = self.stats
+        if self._semaphore.locked() and stats.queue_depth >= self.max_queue:
+            stats.rejected += 1
+            raise RendererOverloadedError(
+                f"Render queue is full ({stats.queue_depth} waiting, {stats.in_flight} running)."
+            )
+
+        stats.submitted += 1
+        queued_at = time.perf_counter()
+        stats.queue_depth += 1
+        try:
+            if self.queue_timeout is None:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            stats.timed_out += 1
+            raise RendererOverloadedError(
+                f"Request waited more than {self.queue_timeout}s for a render slot."
+            ) from None
+        finally:
+            stats.queue_depth -= 1
+
+        wait = time.perf_counter() - queued_at
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        stats.in_flight += 1
+        # Слот освобождается, только когда задача в пуле действительно завершилась:
+        # отмена ожидающей корутины не останавливает уже запущенный рендер
+        future = asyncio.get_running_loop().run_in_executor(self._executor, job)
+        future.add_done_callback(self._job_done)
+        result = await asyncio.shield(future)
+
+        result.style_info["queue_wait"] = wait
+        return result
+
+    def _job_done(self, future: asyncio.Future) -> None:
+        stats = self.stats
+        stats.in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            stats.failed += 1
+        else:
+            stats.completed += 1
+        self._semaphore.release()
+
+def _render(render: Callable[..., PolaroidResult], source, eager_side_outputs: bool, kwargs: dict) -> PolaroidResult:
+    """Задача пула: рендер и, по запросу, построение побочных выходов в том же потоке."""
+    result = render(source, **kwargs)
+    if eager_side_outputs:
+        result.build_side_outputs()
+    return result
@@ -0,0 +1,259 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Any, Iterable, Iterator, List, Optional, Sequence
+from PIL import Image
+from .core import process_image, process_path
+from .data import PolaroidResult
+
+EXECUTORS = ("process", "thread")
+_MISSING = object()
+
+@dataclass
+class BatchItem:
+    """
+    Результат обработки одного элемента пакета.
+
+    Attributes:
+        index (int): Порядковый номер элемента во входной последовательности.
+        source (Any): Путь к файлу или None, если на вход подано изображение.
+        result (PolaroidResult): Результат обработки (None при ошибке).
+        error (BaseException): Исключение, если обработка не удалась.
+        elapsed (float): Время обработки элемента в воркере, секунды.
+        megapixels (float): Размер исходного изображения в мегапикселях.
+    """
+    index: int
+    source: Any
+    result: Optional[PolaroidResult]
+    error: Optional[BaseException]
+    elapsed: float = 0.0
+    megapixels: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """True, если элемент обработан без ошибок."""
+        return self.error is None
+
+@dataclass
+class BatchStats:
+    """
+    Сводная статистика пакетной обработки.
+
+    Attributes:
+        images (int): Количество успешно обработанных изображений.
+        failed (int): Количество элементов, завершившихся ошибкой.
+        megapixels (float): Суммарный объем обработанных исходников, Мп.
+        elapsed (float): Время от старта пакета до последнего результата, секунды.
+    """
+    images: int = 0
+    failed: int = 0
+    megapixels: float = 0.0
+    elapsed: float = 0.0
+
+    @property
+    def images_per_second(self) -> float:
+        """Пропускная способность в изображениях в секунду."""
+        return self.images / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def megapixels_per_second(self) -> float:
+        """Пропускная способность в мегапикселях в секунду."""
+        return self.megapixels / self.elapsed if self.elapsed > 0 else 0.0
+
+class BatchRun:
+    """
+    Итератор по результатам пакетной обработки.
+
+    Результаты отдаются по мере готовности (или в исходном порядке при ordered=True).
+    После (или во время) итерации доступна статистика через атрибут stats.
+    """
+    def __init__(self, items: Iterable, profile: str, workers: int, ordered: bool,
+                 chunksize: int, seeds: Optional[Sequence[int]], kwargs: dict, executor: str = "process",
+                 eager_side_outputs: bool = False):
+        self._items = items
+        self._profile = profile
+        self._workers = workers
+        self._executor = executor
+        self._ordered = ordered
+        self._chunksize = max(1, chunksize)
+        self._seeds = seeds
+        self._kwargs = kwargs
+        self._eager = eager_side_outputs
+        self.stats = BatchStats()
+
+    def __iter__(self) -> Iterator[BatchItem]:
+        started = time.perf_counter()
+        for item in self._run():
+            if item.ok:
+                self.stats.images += 1
+                self.stats.megapixels += item.megapixels
+            else:
+                self.stats.failed += 1
+            self.stats.elapsed = time.perf_counter() - started
+            yield item
+
+    def _chunks(self) -> Iterator[List[tuple]]:
+        """Нарезает вход на чанки (index, source, seed) без материализации всего списка."""
+        seeds = iter(self._seeds) if self._seeds is not None else None
+        chunk = []
+        for index, source in enumerate(self._items):
+            if seeds is None:
+                seed = self._kwargs.get('seed')
+            else:
+                seed = next(seeds, _MISSING)
+                if seed is _MISSING:
+                    raise ValueError(f"seeds has fewer entries than items (no seed for item {index}).")
+            chunk.append((index, source, seed))
+            if len(chunk) >= self._chunksize:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _run(self) -> Iterator[BatchItem]:
+        if self._workers == 0:
+            for chunk in self._chunks():
+                yield from _process_chunk(chunk, self._profile, self._kwargs, self._eager)
+            return
+
+        # Держим ограниченное число чанков "в полете", чтобы не тянуть
+        # в память весь вход и не копить готовые результаты. В упорядоченном
+        # режиме ограничено и окно от первого неотданного элемента: готовые
+        # результаты за медленным элементом не копятся без предела.
+        max_in_flight = self._workers * 2
+        max_window = max_in_flight * self._chunksize
+        chunks = self._chunks()
+        pending = deque()
+        ready = {}
+        next_index = 0
+        submitted = 0
+
+        with self._make_pool() as executor:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < max_in_flight:
+                    if self._ordered and submitted - next_index >= max_window:
+                        break
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        exhausted = True
+                        break
+                    future = executor.submit(_process_chunk, chunk, self._profile, self._kwargs, self._eager)
+                    pending.append((future, chunk))
+                    submitted = chunk[-1][0] + 1
+
+                if not pending:
+                    break
+
+                done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+                for entry in [e for e in pending if e[0] in done]:
+                    pending.remove(entry)
+                    for item in _collect(*entry):
+                        if not self._ordered:
+                            yield item
+                        else:
+                            ready[item.index] = item
+
+                while next_index in ready:
+                    yield ready.pop(next_index)
+                    next_index += 1
+
+    def _make_pool(self):
+        if self._executor == "thread":
+            # Потоки делят кэши процесса; прогреваем их один раз заранее
+            init_worker()
+            return ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="polaroid-batch")
+        return ProcessPoolExecutor(max_workers=self._workers, initializer=init_worker)
+
+def process_batch(images_or_paths: Iterable, profile: str = "classic", workers: int = None,
+                  ordered: bool = True, chunksize: int = 1, seeds: Sequence[int] = None,
+                  executor: str = "process", eager_side_outputs: bool = False, **kwargs) -> BatchRun:
+    """
+    Обрабатывает набор изображений параллельно в пуле процессов или потоков.
+
+    В пуле процессов каждый воркер один раз импортирует и "прогревает" библиотеку
+    при старте. Пул потоков не тратит время на передачу изображений между
+    процессами (pickle) и делит кэши рамок, масок и тайлов; тяжелые операции
+    Pillow отпускают GIL, поэтому потоки тоже загружают все ядра.
+    Результаты (или ошибки) возвращаются поэлементно по мере готовности.
+    При одинаковом seed результат элемента совпадает с последовательным
+    вызовом process_image(image, seed=seed) в любом режиме.
+
+    Args:
+        images_or_paths (Iterable): Изображения (Image.Image) и/или пути к файлам.
+        profile (str, optional): Профиль обработки. Defaults to "classic".
+        workers (int, optional): Количество процессов. None — по числу ядер,
+                                 0 — обработка в текущем процессе.
+        ordered (bool, optional): Отдавать результаты в исходном порядке. Defaults to True.
+        chunksize (int, optional): Сколько элементов отправлять воркеру за раз. Defaults to 1.
+        seeds (Sequence[int], optional): Сиды для каждого элемента по порядку (не меньше, чем элементов).
+        executor (str, optional): "process" (пул процессов) или "thread" (пул потоков).
+                                  Defaults to "process".
+        eager_side_outputs (bool, optional): Строить маску и карту нормалей в воркере
+                                             (см. PolaroidResult.build_side_outputs). Иначе они
+                                             строятся лениво при обращении, а из пула процессов
+                                             приходят без буферов и строятся в вызывающем процессе.
+                                             Defaults to False.
+        **kwargs: Параметры, передаваемые в process_image (seed, generate_normal и др.).
+
+    Returns:
+        BatchRun: Итератор по BatchItem со статистикой пропускной способности (stats).
+
+    Raises:
+        ValueError: Если executor не "process" и не "thread". Если сидов меньше,
+                    чем элементов, ValueError возникает при итерации, на первом элементе без сида.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}.")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return BatchRun(images_or_paths, profile, workers, ordered, chunksize, seeds, kwargs, executor,
+                    eager_side_outputs)
+
+def init_worker() -> None:
+    """
+    Инициализатор воркера: прогревает импорты и кэши библиотеки (включая банк
+    тайлов нормалей) один раз на процесс.
+
+    Подходит как initializer для собственных пулов процессов (например, в CLI).
+    """
+    warmup = Image.new("RGB", (64, 64), (128, 128, 128))
+    # Карта нормалей строится лениво: строим ее явно, чтобы банк тайлов нормалей
+    # собирался здесь, а не в первом задании воркера
+    process_image(warmup, seed=0).build_side_outputs()
+
+def _process_chunk(chunk: List[tuple], profile: str, kwargs: dict, eager_side_outputs: bool = False) -> List[BatchItem]:
+    """Обрабатывает чанк в воркере; ошибки не прерывают обработку остальных элементов."""
+    items = []
+    for index, source, seed in chunk:
+        started = time.perf_counter()
+        path = source if isinstance(source, (str, os.PathLike)) else None
+        megapixels = 0.0
+        try:
+            options = dict(kwargs)
+            if seed is not None:
+                options['seed'] = seed
+            if path is not None:
+                result = process_path(path, profile=profile, **options)
+            else:
+                result = process_image(source, profile=profile, **options)
+            if eager_side_outputs:
+                result.build_side_outputs()
+            source_w, source_h = result.style_info["source_size"]
+            megapixels = source_w * source_h / 1e6
+            items.append(BatchItem(index, path, result, None, time.perf_counter() - started, megapixels))
+        except Exception as exc:
+            items.append(BatchItem(index, path, None, exc, time.perf_counter() - started, megapixels))
+    return items
+
+def _collect(future, chunk: List[tuple]) -> List[BatchItem]:
+    """Забирает результаты чанка; падение самого воркера превращается в ошибки элементов."""
+    try:
+        return future.result()
+    except Exception as exc:
+        return [
+            BatchItem(index, source if isinstance(source, (str, os.PathLike)) else None, None, exc)
+            for index, source, _ in chunk
+        ]
@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple
+
+
+class CacheInfo(NamedTuple):
+    """
+    Статистика работы кэша.
+
+    Attributes:
+        hits (int): Количество попаданий.
+        misses (int): Количество промахов (построений нового значения).
+        evictions (int): Количество вытесненных записей.
+        maxsize (int): Максимальное число записей.
+        currsize (int): Текущее число записей.
+    """
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class LRUCache:
+    """
+    Ограниченный LRU-кэш для заранее отрисованных ресурсов (шаблоны рамок, маски и т.д.).
+
+    Потокобезопасен: все операции со словарем выполняются под блокировкой.
+    Само построение значения (factory) выполняется вне блокировки, поэтому
+    тяжелый рендер не блокирует другие потоки.
+    """
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any], store: bool = True) -> Any:
+        """
+        Возвращает значение по ключу, при промахе строит его через factory().
+
+        Args:
+            key (Hashable): Ключ записи.
+            factory (Callable[[], Any]): Функция построения значения при промахе.
+            store (bool, optional): Сохранять ли построенное значение в кэш. Defaults to True.
+
+        Returns:
+            Any: Закэшированное (или только что построенное) значение.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._hits += 1
+                return self._data[key]
+            self._misses += 1
+
+        value = factory()
+
+        if self.maxsize <= 0 or not store:
+            return value
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+        return value
+
+    def info(self) -> CacheInfo:
+        """Возвращает текущую статистику кэша."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self.maxsize, len(self._data))
+
+    def clear(self) -> None:
+        """Очищает кэш и сбрасывает статистику."""
+        with self._lock:
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+            self._evictions = 0
@@ -1,78 +1,227 @@
+import math
 from PIL import Image, ImageDraw, ImageFilter, ImageChops
 from . import config
 from . import filters
+from .cache import LRUCache, CacheInfo
 from .geometry import Layout
 
-def create_chassis(layout: Layout, width_ref: int, photo_size: tuple, rotation_angle: float = 0.0) -> Image.Image:
+# Шаблоны рамок переиспользуются между вызовами: на практике входные
+# изображения приходят в небольшом наборе размеров.
+_template_cache = LRUCache(config.CHASSIS_CACHE_SIZE)
+
+# Параметры, от которых зависит шаблон рамки (входят в ключ кэша)
+_TEMPLATE_SETTINGS = (
+    "BORDER_BOTTOM_RATIO", "GRIP_RATIO", "CHASSIS_NOISE_SEED", "CHASSIS_PAPER_NOISE",
+    "CHASSIS_GRIP_NOISE", "GRAIN_SCALE", "GRAIN_CUTOFF", "GRAIN_TILE_BANK", "GRAIN_TILE_SEED",
+    "GRAIN_TILE_COUNT", "GRAIN_TILE_NOISE_SIZE", "SEAM_HEIGHT",
+    "SEAM_OPACITY", "SEAM_BLUR_RADIUS", "FRAME_CORNER_RADIUS_TOP", "FRAME_CORNER_RADIUS_BOTTOM",
+    "PHOTO_CORNER_RADIUS",
+)
+
+def create_chassis(layout: Layout, width_ref: int, photo_size: tuple, rotation_angle: float = 0.0,
+                   settings=config, colors: tuple = None, copy: bool = True, cache: bool = True) -> Image.Image:
     """
     Создает графический слой корпуса картриджа (рамки) с учетом текстуры бумаги, 
     объема нижней части и физических дефектов вырубки.
 
+    Готовые шаблоны кэшируются по (total_size, width_ref, photo_size, угол) и значениям
+    параметров рамки из settings; угол квантуется с шагом CHASSIS_ROTATION_STEP.
+
     Args:
         layout (Layout): Объект с рассчитанной геометрией снимка.
         width_ref (int): Референсная ширина исходного изображения для расчета пропорций.
         photo_size (tuple): Размеры зоны фотографии (ширина, высота).
         rotation_angle (float, optional): Угол поворота вырезанного окна (имитация производственного брака). 
                                           По умолчанию 0.0.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+        colors (tuple, optional): Готовые цвета рамки (см. chassis_colors).
+        copy (bool, optional): Отдавать копию шаблона. False — сам шаблон из кэша
+                               (только для чтения!), без лишнего полноразмерного буфера.
+        cache (bool, optional): Сохранять ли новый шаблон в кэш. Defaults to True.
 
     Returns:
         Image.Image: RGBA изображение рамки с прозрачным окном под фото.
     """
+    angle = quantize_angle(rotation_angle, settings.CHASSIS_ROTATION_STEP)
+    if colors is None:
+        colors = chassis_colors(settings)
+    key = (
+        tuple(layout.total_size), tuple(layout.photo_pos), width_ref, tuple(photo_size), angle,
+        colors, tuple(getattr(settings, name) for name in _TEMPLATE_SETTINGS),
+    )
+
+    template = _template_cache.get_or_create(
+        key,
+        lambda: _render_chassis(layout, width_ref, photo_size, angle, settings, colors),
+        store=cache
+    )
+    # Отдаем копию, чтобы вызывающий код не мог испортить шаблон в кэше
+    return template.copy() if copy else template
+
+def quantize_angle(angle: float, step: float = None) -> float:
+    """
+    Округляет угол поворота до шага step.
+
+    Args:
+        angle (float): Угол в градусах.
+        step (float, optional): Шаг квантования. Defaults to config.CHASSIS_ROTATION_STEP.
+
+    Returns:
+        float: Квантованный угол.
+    """
+    if step is None:
+        step = config.CHASSIS_ROTATION_STEP
+    if step <= 0:
+        return angle
+    return round(round(angle / step) * step, 6)
+
+def chassis_colors(settings=config) -> tuple:
+    """
+    Считает цвета рамки: бумага, верх и затемненный низ хваталки.
+
+    Args:
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        tuple: (paper, grip_top, grip_bottom), каждый — кортеж (R, G, B).
+    """
+    c_top = tuple(settings.GRIP_COLOR)
+    dark_factor = 1.0 - settings.GRIP_SHADE_STRENGTH
+    c_bottom = tuple(int(c * dark_factor) for c in c_top)
+    return (tuple(settings.PAPER_COLOR), c_top, c_bottom)
+
+def cache_info() -> CacheInfo:
+    """Возвращает статистику кэша шаблонов рамок (hits, misses, evictions)."""
+    return _template_cache.info()
+
+def clear_cache() -> None:
+    """Очищает кэш шаблонов рамок."""
+    _template_cache.clear()
+
+def _render_chassis(layout: Layout, width_ref: int, photo_size: tuple, rotation_angle: float,
+                    settings, colors: tuple) -> Image.Image:
+    """Отрисовывает шаблон рамки с нуля (вызывается только при промахе кэша)."""
+    box = (0, 0) + tuple(layout.total_size)
+    return render_chassis_region(layout, width_ref, photo_size, rotation_angle, box, settings, colors)
+
+def chassis_noise(layout: Layout, width_ref: int, settings=config) -> tuple:
+    """
+    Поля шума бумаги и хваталки (см. filters.grain_noise) для render_chassis_region.
+
+    Строятся один раз на снимок и передаются во все фрагменты рамки.
+
+    Returns:
+        tuple: (шум бумаги, шум хваталки); None вместо поля, если используется банк тайлов.
+    """
+    if settings.GRAIN_TILE_BANK:
+        return (None, None)
+    total_w, total_h = layout.total_size
+    grip_height = _grip_height(width_ref, settings)
+    return (
+        filters.grain_noise((total_w, total_h), seed=settings.CHASSIS_NOISE_SEED, settings=settings),
+        filters.grain_noise((total_w, grip_height), seed=settings.CHASSIS_NOISE_SEED + 1, settings=settings),
+    )
+
+def render_chassis_region(layout: Layout, width_ref: int, photo_size: tuple, rotation_angle: float, box: tuple,
+                          settings=config, colors: tuple = None, noise: tuple = None) -> Image.Image:
+    """
+    Отрисовывает фрагмент рамки (окно box холста) без построения всего холста.
+
+    Фрагменты совпадают с соответствующими участками полного шаблона
+    (create_chassis), поэтому рамку можно собирать тайлами любого размера.
+
+    Args:
+        layout (Layout): Объект с рассчитанной геометрией снимка.
+        width_ref (int): Референсная ширина исходного изображения для расчета пропорций.
+        photo_size (tuple): Размеры зоны фотографии (ширина, высота).
+        rotation_angle (float): Угол поворота вырезанного окна.
+        box (tuple): Окно (x0, y0, x1, y1) в координатах холста.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+        colors (tuple, optional): Готовые цвета рамки (см. chassis_colors).
+        noise (tuple, optional): Поля шума (см. chassis_noise). Если None, строятся заново.
+
+    Returns:
+        Image.Image: RGBA-фрагмент рамки размера окна box.
+    """
     total_w, total_h = layout.total_size
     photo_w, photo_h = photo_size
+    x0, y0, x1, y1 = box
+    region = (x1 - x0, y1 - y0)
+    if colors is None:
+        colors = chassis_colors(settings)
+    paper_color, c_top, c_bottom = colors
+    if noise is None:
+        noise = chassis_noise(layout, width_ref, settings)
+    paper_noise, grip_noise = noise
 
-    paper_layer = Image.new("RGB", (total_w, total_h), config.PAPER_COLOR)
-    paper_layer = filters.apply_grain(paper_layer, intensity=config.CHASSIS_PAPER_NOISE)
+    paper_layer = Image.new("RGB", region, paper_color)
+    # Шум рамки детерминирован: шаблон не зависит от того, какой вызов его построил
+    paper_layer = filters.apply_grain_region(paper_layer, (total_w, total_h), box, seed=settings.CHASSIS_NOISE_SEED,
+                                             intensity=settings.CHASSIS_PAPER_NOISE, noise=paper_noise,
+                                             settings=settings)
 
-    margin_bottom = int(width_ref * config.BORDER_BOTTOM_RATIO)
-    grip_height = int(margin_bottom * config.GRIP_RATIO)
+    grip_height = _grip_height(width_ref, settings)
     grip_y = total_h - grip_height
 
     # Генерация градиента для объема "хваталки" (Developer Pod)
-    c_top = config.GRIP_COLOR
-    dark_factor = 1.0 - config.GRIP_SHADE_STRENGTH
-    c_bottom = tuple(int(c * dark_factor) for c in c_top)
+    gy0, gy1 = max(y0, grip_y), min(y1, total_h)
+    if gy1 > gy0:
+        # Градиент меняется только по вертикали: считаем один столбец (O(H))
+        # и растягиваем его на всю ширину без интерполяции.
+        column = []
+        for y in range(gy0 - grip_y, gy1 - grip_y):
+            ratio = y / max(1, grip_height - 1)
 
-    grip_layer = Image.new("RGB", (total_w, grip_height))
-    pixels = grip_layer.load()
+            r = int(c_top[0] * (1 - ratio) + c_bottom[0] * ratio)
+            g = int(c_top[1] * (1 - ratio) + c_bottom[1] * ratio)
+            b = int(c_top[2] * (1 - ratio) + c_bottom[2] * ratio)
+            column.append((r, g, b))
 
-    for y in range(grip_height):
-        ratio = y / max(1, grip_height - 1)
-  
-        r = int(c_top[0] * (1 - ratio) + c_bottom[0] * ratio)
-        g = int(c_top[1] * (1 - ratio) + c_bottom[1] * ratio)
-        b = int(c_top[2] * (1 - ratio) + c_bottom[2] * ratio)
+        grip_layer = Image.new("RGB", (1, gy1 - gy0))
+        grip_layer.putdata(column)
+        grip_layer = grip_layer.resize((region[0], gy1 - gy0), Image.NEAREST)
 
-        for x in range(total_w):
-            pixels[x, y] = (r, g, b)
-      
-    grip_layer = filters.apply_grain(grip_layer, intensity=config.CHASSIS_GRIP_NOISE)
+        grip_box = (x0, gy0 - grip_y, x1, gy1 - grip_y)
+        grip_layer = filters.apply_grain_region(grip_layer, (total_w, grip_height), grip_box,
+                                                seed=settings.CHASSIS_NOISE_SEED + 1,
+                                                intensity=settings.CHASSIS_GRIP_NOISE, noise=grip_noise,
+                                                settings=settings)
+        paper_layer.paste(grip_layer, (0, gy0 - y0))
 
-    base = paper_layer.copy()
-    base.paste(grip_layer, (0, grip_y))
-    base = base.convert("RGBA")
+    base = paper_layer.convert("RGBA")
 
-    seam_layer = Image.new("RGBA", (total_w, total_h), (0, 0, 0, 0))
-    d_seam = ImageDraw.Draw(seam_layer)
-    seam_h = int(width_ref * config.SEAM_HEIGHT)
+    seam_h = int(width_ref * settings.SEAM_HEIGHT)
+    blur_px = int(width_ref * settings.SEAM_BLUR_RADIUS)
 
-    d_seam.rectangle(
-        [(0, grip_y - seam_h), (total_w, grip_y)], 
-        fill=(0, 0, 0, config.SEAM_OPACITY)
-    )
+    # Стык занимает узкую полосу: рисуем и размываем только ее
+    # (с запасом 3 сигмы под хвост размытия), а не весь холст.
+    # Полоса одинакова по всей ширине, поэтому считается один столбец.
+    halo = 3 * blur_px
+    strip_top = max(0, grip_y - seam_h - halo)
+    strip_bottom = min(total_h, grip_y + halo + 1)
+    sy0, sy1 = max(y0, strip_top), min(y1, strip_bottom)
 
-    blur_px = int(width_ref * config.SEAM_BLUR_RADIUS)
-    if blur_px > 0:
-        seam_layer = seam_layer.filter(ImageFilter.GaussianBlur(blur_px))
+    if sy1 > sy0:
+        seam_layer = Image.new("RGBA", (1, strip_bottom - strip_top), (0, 0, 0, 0))
+        d_seam = ImageDraw.Draw(seam_layer)
 
-    base.alpha_composite(seam_layer)
+        d_seam.rectangle(
+            [(0, grip_y - seam_h - strip_top), (1, grip_y - strip_top)], 
+            fill=(0, 0, 0, settings.SEAM_OPACITY)
+        )
+
+        if blur_px > 0:
+            seam_layer = seam_layer.filter(ImageFilter.GaussianBlur(blur_px))
+
+        seam_layer = seam_layer.crop((0, sy0 - strip_top, 1, sy1 - strip_top)).resize((region[0], sy1 - sy0), Image.NEAREST)
+        base.alpha_composite(seam_layer, dest=(0, sy0 - y0))
 
     # Генерация альфа-маски формы картриджа и выреза
-    mask_base = Image.new("L", (total_w, total_h), 0)
+    mask_base = Image.new("L", region, 0)
     d_base = ImageDraw.Draw(mask_base)
 
-    r_top = int(width_ref * config.FRAME_CORNER_RADIUS_TOP)
-    r_bottom = int(width_ref * config.FRAME_CORNER_RADIUS_BOTTOM)
+    r_top = int(width_ref * settings.FRAME_CORNER_RADIUS_TOP)
+    r_bottom = int(width_ref * settings.FRAME_CORNER_RADIUS_BOTTOM)
 
     w, h = total_w, total_h
     points = [
@@ -81,49 +230,83 @@ def create_chassis(layout: Layout, width_ref: int, photo_size: tuple, rotation_a
         (w, h - r_bottom), (w - r_bottom, h),
         (r_bottom, h), (0, h - r_bottom)
     ]
-    d_base.polygon(points, fill=255)
-    
-    mask_hole_layer = Image.new("L", (total_w, total_h), 0)
-    d_hole = ImageDraw.Draw(mask_hole_layer)
-    
+    d_base.polygon([(x - x0, y - y0) for x, y in points], fill=255)
+
     px, py = layout.photo_pos
-    r_photo = int(width_ref * config.PHOTO_CORNER_RADIUS)
-    
-    d_hole.rounded_rectangle(
-        (px, py, px + photo_w, py + photo_h), 
-        radius=r_photo, 
-        fill=255
-    )
-    
-    cx = px + photo_w / 2
-    cy = py + photo_h / 2
-    
+    r_photo = int(width_ref * settings.PHOTO_CORNER_RADIUS)
+    hole_rect = (px, py, px + photo_w, py + photo_h)
+
     if rotation_angle != 0:
-        mask_hole_layer = mask_hole_layer.rotate(
-            rotation_angle, 
-            resample=Image.BICUBIC, 
-            center=(cx, cy)
+        cx = px + photo_w / 2
+        cy = py + photo_h / 2
+        a, b, c, d, e, f = _rotate_matrix(rotation_angle, (cx, cy))
+
+        # Окно неповернутого выреза, из которого берутся пиксели фрагмента (+ опора BICUBIC)
+        corners = [(a * x + b * y + c, d * x + e * y + f) for x in (x0, x1) for y in (y0, y1)]
+        hx0 = max(0, int(min(x for x, _ in corners)) - 3)
+        hy0 = max(0, int(min(y for _, y in corners)) - 3)
+        hx1 = min(total_w, int(max(x for x, _ in corners)) + 4)
+        hy1 = min(total_h, int(max(y for _, y in corners)) + 4)
+
+        mask_hole_layer = Image.new("L", (max(1, hx1 - hx0), max(1, hy1 - hy0)), 0)
+        _draw_hole(mask_hole_layer, hole_rect, r_photo, (hx0, hy0))
+        mask_hole_layer = mask_hole_layer.transform(
+            region, Image.AFFINE,
+            (a, b, a * x0 + b * y0 + c - hx0, d, e, d * x0 + e * y0 + f - hy0),
+            resample=Image.BICUBIC
         )
+    else:
+        mask_hole_layer = Image.new("L", region, 0)
+        _draw_hole(mask_hole_layer, hole_rect, r_photo, (x0, y0))
     
     final_mask = ImageChops.subtract(mask_base, mask_hole_layer)
 
     base.putalpha(final_mask)
     return base
 
-def create_photo_mask(size: tuple, width_ref: int) -> Image.Image:
+def _grip_height(width_ref: int, settings) -> int:
+    margin_bottom = int(width_ref * settings.BORDER_BOTTOM_RATIO)
+    return int(margin_bottom * settings.GRIP_RATIO)
+
+def _draw_hole(layer: Image.Image, rect: tuple, radius: int, origin: tuple) -> None:
+    ox, oy = origin
+    ImageDraw.Draw(layer).rounded_rectangle(
+        (rect[0] - ox, rect[1] - oy, rect[2] - ox, rect[3] - oy),
+        radius=radius,
+        fill=255
+    )
+
+def _rotate_matrix(angle: float, center: tuple) -> list:
+    """Коэффициенты AFFINE, которые строит Image.rotate(angle, center=center) (без expand)."""
+    angle = -math.radians(angle % 360.0)
+    matrix = [
+        round(math.cos(angle), 15), round(math.sin(angle), 15), 0.0,
+        round(-math.sin(angle), 15), round(math.cos(angle), 15), 0.0,
+    ]
+    a, b, c, d, e, f = matrix
+    matrix[2] = a * -center[0] + b * -center[1] + c + center[0]
+    matrix[5] = d * -center[0] + e * -center[1] + f + center[1]
+    return matrix
+
+def create_photo_mask(size: tuple, width_ref: int, bleed: int = 0, settings=config, box: tuple = None) -> Image.Image:
     """
     Генерирует маску для скругления углов самой фотографии.
 
     Args:
         size (tuple): Размеры фото (ширина, высота).
         width_ref (int): Референсная ширина для расчета радиуса скругления.
+        bleed (int, optional): На сколько пикселей край маски выходит за пределы холста
+                               с каждой стороны. Defaults to 0.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+        box (tuple, optional): Вернуть только окно (x0, y0, x1, y1) маски. Defaults to вся маска.
 
     Returns:
         Image.Image: L-изображение (маска), где белое — видимая область, черное — прозрачная.
     """
     w, h = size
-    mask = Image.new("L", (w, h), 0)
+    x0, y0, x1, y1 = box if box is not None else (0, 0, w, h)
+    mask = Image.new("L", (x1 - x0, y1 - y0), 0)
     draw = ImageDraw.Draw(mask)
-    radius = int(width_ref * config.PHOTO_CORNER_RADIUS)
-    draw.rounded_rectangle((0, 0, w, h), radius=radius, fill=255)
+    radius = int(width_ref * settings.PHOTO_CORNER_RADIUS)
+    draw.rounded_rectangle((-bleed - x0, -bleed - y0, w + bleed - x0, h + bleed - y0), radius=radius, fill=255)
     return mask
\ No newline at end of file
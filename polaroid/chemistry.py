@@ -1,6 +1,7 @@
 from PIL import Image
+from . import config
 
-def develop_image(image: Image.Image) -> Image.Image:
+def develop_image(image: Image.Image, lut: list = None, settings=config) -> Image.Image:
     """
     Эмулирует химический процесс проявки снимка Instax.
 
@@ -10,6 +11,8 @@ def develop_image(image: Image.Image) -> Image.Image:
 
     Args:
         image (Image.Image): Исходное изображение.
+        lut (list, optional): Готовые кривые (см. build_lut). Если None, строятся заново.
+        settings (optional): Параметры для построения кривых, если lut не задан. Defaults to config.
 
     Returns:
         Image.Image: Изображение с примененной цветокоррекцией.
@@ -17,32 +20,42 @@ def develop_image(image: Image.Image) -> Image.Image:
     if image.mode != 'RGB':
         image = image.convert('RGB')
 
-    # Генерация LUT для Красного канала (R)
-    # Тени делаем темнее (сдвиг в циан), точка черного приподнята до 20.
-    r_curve = []
-    for x in range(256):
-        val = x
-        if x < 128:
-            val = x * 0.9 
-        
-        val = max(20, val) 
-        r_curve.append(int(val))
-
-    # Генерация LUT для Зеленого канала (G)
-    # Линейная кривая, но с поднятой точкой черного до 25.
-    g_curve = []
-    for x in range(256):
-        val = max(25, x) 
-        g_curve.append(int(val))
-
-    # Генерация LUT для Синего канала (B)
-    # Усиление синего по всему диапазону и сильный подъем теней (до 30).
-    b_curve = []
-    for x in range(256):
-        val = max(30, x * 1.05)
-        b_curve.append(min(255, int(val)))
+    if lut is None:
+        lut = build_lut(settings)
 
     # Применение кривых: метод point принимает объединенный список [R_lut + G_lut + B_lut]
-    developed = image.point(r_curve + g_curve + b_curve)
+    return image.point(lut)
 
-    return developed
\ No newline at end of file
+def build_lut(settings=config) -> list:
+    """
+    Строит кривые проявки для всех каналов.
+
+    Каждый канал умножается на свой множитель в тенях (CHEMISTRY_SHADOW_*_SCALE)
+    и в светах (CHEMISTRY_HIGHLIGHT_*_SCALE), после чего точка черного
+    поднимается до CHEMISTRY_BLACK_POINT. По умолчанию: красный приглушен
+    в тенях (сдвиг в циан), синий усилен по всему диапазону, черный поднят
+    до 20 / 25 / 30.
+
+    Args:
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        list: Объединенная таблица [R_lut + G_lut + B_lut] (768 значений) для Image.point.
+    """
+    black_points = settings.CHEMISTRY_BLACK_POINT
+    if isinstance(black_points, (int, float)):
+        black_points = (black_points,) * 3
+
+    channels = (
+        (settings.CHEMISTRY_SHADOW_RED_SCALE, settings.CHEMISTRY_HIGHLIGHT_RED_SCALE),
+        (settings.CHEMISTRY_SHADOW_GREEN_SCALE, settings.CHEMISTRY_HIGHLIGHT_GREEN_SCALE),
+        (settings.CHEMISTRY_SHADOW_BLUE_SCALE, settings.CHEMISTRY_HIGHLIGHT_BLUE_SCALE),
+    )
+
+    lut = []
+    for (shadow_scale, highlight_scale), black_point in zip(channels, black_points):
+        for x in range(256):
+            val = x * (shadow_scale if x < 128 else highlight_scale)
+            val = max(black_point, val)
+            lut.append(max(0, min(255, int(val))))
+    return lut
@@ -0,0 +1,290 @@
+"""
+Консольная утилита для пакетной обработки папок.
+
+Пример:
+    python -m polaroid photos/ out/ --workers 8
+    python -m polaroid "photos/**/*.jpg" out/ --seed 42 --no-normal
+    python -m polaroid photos/ out/ --format webp --quality 85
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Iterator, List, Optional, Tuple
+from . import config
+from . import encode
+from . import loader
+from . import profiles
+from .batch import init_worker
+from .core import process_image
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".tif", ".tiff")
+STAGES = ("decode", "process", "encode")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Точка входа CLI.
+
+    Args:
+        argv (List[str], optional): Аргументы командной строки (без имени программы).
+
+    Returns:
+        int: Код возврата (0 — успех, 1 — были ошибки).
+    """
+    args = _build_parser().parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+
+    options = {
+        "profile": args.profile,
+        "generate_normal": not args.no_normal,
+        "write_mask": not args.no_mask,
+        "compress_level": args.compress_level,
+        "format": args.format,
+        "quality": args.quality,
+    }
+
+    totals = {stage: 0.0 for stage in STAGES}
+    done = skipped = 0
+    failures = []
+    started = time.perf_counter()
+
+    jobs = _iter_jobs(args.input, args.output, args, options)
+    for source, error, timings in _run_pipeline(jobs, args.workers, options):
+        if timings is None:
+            skipped += 1
+            continue
+        for stage, value in timings.items():
+            totals[stage] += value
+        if error is not None:
+            failures.append((source, error))
+            print(f"[FAIL] {source}: {error}", file=sys.stderr)
+        else:
+            done += 1
+            if not args.quiet:
+                print(f"[OK] {source} ({sum(timings.values()):.2f}s)")
+
+    elapsed = time.perf_counter() - started
+    _print_summary(done, skipped, failures, totals, elapsed)
+    return 1 if failures else 0
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m polaroid",
+        description="Пакетная обработка изображений в стиле моментальной фотографии."
+    )
+    parser.add_argument("input", help="Папка с изображениями или glob-шаблон (например, 'in/**/*.jpg').")
+    parser.add_argument("output", help="Папка для результатов.")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="Количество процессов-воркеров (0 — в текущем процессе).")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Обходить вложенные папки.")
+    parser.add_argument("--profile", default="classic", help="Профиль обработки.")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Базовый сид; сид каждого файла выводится из него и пути файла.")
+    parser.add_argument("--no-normal", action="store_true", help="Не сохранять карту нормалей.")
+    parser.add_argument("--no-mask", action="store_true", help="Не сохранять маску фото.")
+    parser.add_argument("--overwrite", action="store_true", help="Перезаписывать уже готовые результаты.")
+    parser.add_argument("--format", default=config.ENCODE_FORMAT, choices=tuple(encode.FORMATS),
+                        help="Формат снимка: png, webp, avif или jpeg (с отдельным файлом _alpha.png). "
+                             "Маска и карта нормалей всегда без потерь (WebP для webp, иначе PNG).")
+    parser.add_argument("--quality", type=int, default=config.ENCODE_QUALITY,
+                        help="Качество JPEG/WebP/AVIF (0-100).")
+    parser.add_argument("--compress-level", type=int, default=config.ENCODE_COMPRESS_LEVEL,
+                        help="Уровень сжатия PNG (0-9).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Печатать только ошибки и итог.")
+    return parser
+
+def _iter_sources(pattern: str, recursive: bool) -> Iterator[Tuple[str, str]]:
+    """Лениво перечисляет входные файлы как (путь, относительный путь)."""
+    if os.path.isdir(pattern):
+        if recursive:
+            for root, dirs, files in os.walk(pattern):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        yield path, os.path.relpath(path, pattern)
+        else:
+            for entry in sorted(os.scandir(pattern), key=lambda e: e.name):
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    yield entry.path, entry.name
+        return
+
+    base = _glob_base(pattern)
+    for path in glob.iglob(pattern, recursive=True):
+        if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+            yield path, os.path.relpath(path, base)
+
+def _glob_base(pattern: str) -> str:
+    """Возвращает неизменяемую часть glob-шаблона (папку до первого спецсимвола)."""
+    parts = []
+    for part in pattern.replace("\\", "/").split("/"):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    base = "/".join(parts)
+    return base if os.path.isdir(base) else (os.path.dirname(base) or ".")
+
+def output_paths(output_dir: str, relpath: str, image_format: str = "png") -> dict:
+    """
+    Возвращает пути всех выходных файлов для входного файла.
+
+    Args:
+        output_dir (str): Папка результатов.
+        relpath (str): Путь входного файла относительно корня обхода.
+        image_format (str, optional): Формат снимка (см. encode.FORMATS). Defaults to "png".
+
+    Returns:
+        dict: {"image": ..., "mask": ..., "normal": ...} и "alpha" для JPEG.
+    """
+    stem = os.path.splitext(relpath)[0]
+    base = os.path.join(output_dir, stem)
+    suffixes = {"image": "", "alpha": "_alpha", "mask": "_mask", "normal": "_normal"}
+    return {name: base + suffixes[name] + ext for name, ext in encode.extensions(image_format).items()}
+
+def _iter_jobs(pattern: str, output_dir: str, args, options: dict) -> Iterator[tuple]:
+    """
+    Формирует задания; уже готовые файлы помечаются как пропущенные (resume).
+
+    Если выходы файла совпадают с выходами уже встреченного (a.jpg и a.png), к имени
+    добавляется расширение исходника (a_png); порядок обхода детерминирован, поэтому
+    при повторном запуске имена те же.
+    """
+    taken = set()
+    for path, relpath in _iter_sources(pattern, args.recursive):
+        stem, ext = os.path.splitext(relpath)
+        outputs = _job_outputs(output_dir, relpath, options)
+        attempt = 1
+        while any(os.path.normcase(p) in taken for p in outputs.values()):
+            suffix = ext.lstrip(".").lower() + ("" if attempt == 1 else f"_{attempt}")
+            outputs = _job_outputs(output_dir, f"{stem}_{suffix}{ext}", options)
+            attempt += 1
+        if attempt > 1:
+            print(f"[WARN] {path}: output name collides with another input, writing "
+                  f"{os.path.basename(outputs['image'])}", file=sys.stderr)
+        taken.update(os.path.normcase(p) for p in outputs.values())
+
+        if not args.overwrite and all(os.path.exists(p) for p in outputs.values()):
+            yield path, None, None
+            continue
+
+        seed = None
+        if args.seed is not None:
+            seed = (args.seed + zlib.crc32(relpath.encode("utf-8"))) % (2**32)
+        yield path, outputs, seed
+
+def _job_outputs(output_dir: str, relpath: str, options: dict) -> dict:
+    """Выходные файлы задания без отключенных выходов (маски, карты нормалей)."""
+    outputs = output_paths(output_dir, relpath, options["format"])
+    if not options["write_mask"]:
+        outputs.pop("mask")
+    if not options["generate_normal"]:
+        outputs.pop("normal")
+    return outputs
+
+def _run_pipeline(jobs: Iterator[tuple], workers: int, options: dict) -> Iterator[tuple]:
+    """
+    Прогоняет задания через пул с ограниченным числом задач "в полете".
+
+    Отдает (путь, ошибка, тайминги); для пропущенных файлов тайминги равны None.
+    """
+    if workers == 0:
+        for path, outputs, seed in jobs:
+            if outputs is None:
+                yield path, None, None
+            else:
+                yield (path,) + _render_file(path, outputs, seed, options)
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < workers * 2:
+                job = next(jobs, None)
+                if job is None:
+                    exhausted = True
+                    break
+                path, outputs, seed = job
+                if outputs is None:
+                    yield path, None, None
+                    continue
+                pending.append((executor.submit(_render_file, path, outputs, seed, options), path))
+
+            if not pending:
+                break
+
+            done, _ = wait([f for f, _ in pending], return_when=FIRST_COMPLETED)
+            for entry in [e for e in pending if e[0] in done]:
+                pending.remove(entry)
+                future, path = entry
+                try:
+                    yield (path,) + future.result()
+                except Exception as exc:
+                    yield path, repr(exc), {}
+
+def _render_file(path: str, outputs: dict, seed: Optional[int], options: dict) -> Tuple[Optional[str], dict]:
+    """Декодирует, обрабатывает и сохраняет один файл; возвращает (ошибка, тайминги)."""
+    timings = {}
+    try:
+        t0 = time.perf_counter()
+        settings = profiles.get_profile(options.get("profile", "classic")).settings
+        image, source_size = loader.open_image(path, max_dimension=settings.MAX_PHOTO_DIMENSION, settings=settings)
+        t1 = time.perf_counter()
+        timings["decode"] = t1 - t0
+
+        result = process_image(
+            image,
+            profile=options.get("profile", "classic"),
+            generate_normal=options.get("generate_normal", True),
+            source_size=source_size,
+            seed=seed
+        )
+        t2 = time.perf_counter()
+        timings["process"] = t2 - t1
+
+        # Выходы кодируются параллельно, затем пишутся на диск
+        encoded = encode.encode_result(
+            result,
+            options.get("format", config.ENCODE_FORMAT),
+            outputs=[name for name in encode.OUTPUTS if name in outputs],
+            quality=options.get("quality"),
+            compress_level=options.get("compress_level", config.ENCODE_COMPRESS_LEVEL)
+        )
+        for name, output in encoded.items():
+            if name != "image":
+                _write_atomic(output.data, outputs[name])
+        # Основное изображение пишется последним: его наличие означает, что файл готов
+        _write_atomic(encoded["image"].data, outputs["image"])
+        timings["encode"] = time.perf_counter() - t2
+        return None, timings
+    except Exception as exc:
+        return f"{type(exc).__name__}: {exc}", timings
+
+def _write_atomic(data: bytes, path: str) -> None:
+    """Пишет файл через временный файл, чтобы прерванная запись не выглядела готовой."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+def _print_summary(done: int, skipped: int, failures: list, totals: dict, elapsed: float) -> None:
+    processed = done + len(failures)
+    print("")
+    print(f"Done: {done}, skipped (already done): {skipped}, failed: {len(failures)}, "
+          f"wall time: {elapsed:.1f}s")
+    if processed:
+        for stage in STAGES:
+            print(f"  {stage:<8} total {totals[stage]:8.2f}s   mean {totals[stage] / processed:6.3f}s")
+    if failures:
+        print("Failures:")
+        for source, error in failures:
+            print(f"  {source}: {error}")
@@ -19,15 +19,21 @@ GRIP_COLOR = (240, 240, 240)
 GRIP_RATIO = 0.8
 
 # === 4. CHEMISTRY ===
-# Насколько "поднимаем" черный цвет (0-255).
-CHEMISTRY_BLACK_POINT = 15
+# Насколько "поднимаем" черный цвет (0-255): одно число для всех каналов
+# или (R, G, B). Черный, поднятый сильнее в синем, дает холодные тени.
+CHEMISTRY_BLACK_POINT = (20, 25, 30)
 
 # Shadow Tint.
-# < 1.0 - уменьшаем канал, > 1.0 - усиливаем.
-# Убираем красный и зеленый, оставляем синий -> получаем холодные тени.
-CHEMISTRY_SHADOW_RED_SCALE = 0.85
-CHEMISTRY_SHADOW_GREEN_SCALE = 0.95
-CHEMISTRY_SHADOW_BLUE_SCALE = 1.10
+# < 1.0 - уменьшаем канал, > 1.0 - усиливаем. Тени — значения ниже 128.
+# Убираем красный, усиливаем синий -> получаем холодные тени.
+CHEMISTRY_SHADOW_RED_SCALE = 0.9
+CHEMISTRY_SHADOW_GREEN_SCALE = 1.0
+CHEMISTRY_SHADOW_BLUE_SCALE = 1.05
+
+# То же для светов (значения от 128): синий усилен по всему диапазону.
+CHEMISTRY_HIGHLIGHT_RED_SCALE = 1.0
+CHEMISTRY_HIGHLIGHT_GREEN_SCALE = 1.0
+CHEMISTRY_HIGHLIGHT_BLUE_SCALE = 1.05
 
 # === 5. OPTICS ===
 VIGNETTE_STRENGTH = 0.4
@@ -42,6 +48,18 @@ OPTICS_BLUR_SHARP_AREA = 0.6
 # 0.003 = 0.3% сдвига
 ABERRATION_OFFSET = 0.0045
 
+# Lens Distortion
+# Радиальная дисторсия: r' = r * (1 + k * r^2). 0.0 - нет дисторсии,
+# < 0 - "бочка", > 0 - "подушка". Применяется вместе с аберрацией одной выборкой.
+LENS_DISTORTION = 0.0
+# Шаг сетки (px), которой аппроксимируется дисторсия (Image.MESH).
+LENS_MESH_STEP = 32
+# Сколько моделей линзы (коэффициенты/сетки по размерам) держать в кэше.
+LENS_CACHE_SIZE = 8
+
+# Сколько радиальных масок (размытие, виньетка) держать в кэше.
+RADIAL_MASK_CACHE_SIZE = 16
+
 
 # === 6. GRAIN ===
 GRAIN_INTENSITY = 0.11
@@ -52,6 +70,22 @@ GRAIN_SCALE = 2.5
 # Clipping
 GRAIN_CUTOFF = 100
 
+# Grain Tile Bank
+# Вместо генерации зерна на каждый снимок берем готовые бесшовные тайлы
+# (строятся один раз на процесс) со случайным сдвигом и поворотом.
+GRAIN_TILE_BANK = False
+GRAIN_TILE_COUNT = 4
+# Сторона тайла в "мелком" шуме; итоговый тайл = NOISE_SIZE * GRAIN_SCALE px.
+GRAIN_TILE_NOISE_SIZE = 256
+GRAIN_TILE_SEED = 2024
+
+# Normal Map Tile Bank
+# Карта нормалей собирается из бесшовных тайлов картона и фото
+# (строятся один раз на процесс), выбор тайла и сдвиг зависят от seed.
+NORMAL_TILE_SIZE = 512
+NORMAL_TILE_COUNT = 2
+NORMAL_TILE_SEED = 4096
+
 # === 7. CHASSIS & ASSEMBLY ===
 
 # --- SHAPE ---
@@ -63,6 +97,8 @@ PHOTO_CORNER_RADIUS = 0.005
 # --- MATERIALS ---
 CHASSIS_PAPER_NOISE = 0.1
 CHASSIS_GRIP_NOISE = 0.07
+# Сид шума бумаги и хваталки (хваталка использует seed + 1).
+CHASSIS_NOISE_SEED = 1972
 
 # Цвет стыка (Seam) между бумагой и хваталкой
 SEAM_HEIGHT = 0.006
@@ -77,7 +113,9 @@ SHADOW_BLUR = 0.05
 # --- LAMINATION ---
 # 0.15 - легкий отблеск, не перекрывающий фото.
 PHOTO_ROTATION_LIMIT = 0.03
-PHOTO_ROTATION_OVERSIZE = 1.06
+# Край фото-блока (и начало внутренней тени/каймы) лежит за пределами
+# видимого окна на эту долю от большей стороны фото.
+PHOTO_EDGE_BLEED = 0.03
 
 # === ПАРАМЕТРЫ ФИОЛЕТОВОЙ КАЙМЫ (PURPLE FRINGE / EDGE LEAK) ===
 FRINGE_COLOR = (200, 50, 255)
@@ -85,6 +123,91 @@ FRINGE_STRENGTH = 130
 FRINGE_DEPTH = 0.01
 FRINGE_BLUR = 0.03
 
+# Сколько шаблонов кольцевых эффектов (тень, кайма) держать в кэше
+EDGE_RING_CACHE_SIZE = 8
+
 GRIP_SHADE_STRENGTH = 0.13
 
-MASK_OUTPUT_SCALE = 0.1
\ No newline at end of file
+# --- CHASSIS TEMPLATE CACHE ---
+# Сколько готовых шаблонов рамки держать в памяти (LRU).
+CHASSIS_CACHE_SIZE = 8
+# Шаг квантования угла поворота окна (в градусах) для ключа кэша.
+CHASSIS_ROTATION_STEP = 0.001
+
+MASK_OUTPUT_SCALE = 0.1
+
+# === 8. DEBUG ===
+# Формат промежуточных снимков: "png", "jpeg" или "webp".
+DEBUG_IMAGE_FORMAT = "png"
+# Уровень сжатия PNG (0-9). 1 — быстрая запись, файлы чуть больше.
+DEBUG_COMPRESS_LEVEL = 1
+# Качество для JPEG/WebP.
+DEBUG_QUALITY = 90
+# Если задано — снимки уменьшаются до этой стороны перед записью (None — полный размер).
+DEBUG_THUMBNAIL_SIZE = None
+# Сколько снимков может ждать записи; при переполнении save() ждет.
+DEBUG_QUEUE_SIZE = 8
+
+# === 9. RENDER SIZE / DRAFT ===
+# Максимальная сторона фото при полном рендере (SMART CAP).
+MAX_PHOTO_DIMENSION = 2500
+# Фильтр ресемплинга в черновом режиме (quality="draft").
+DRAFT_RESAMPLE = "bilinear"
+# Пропускать ли в черновике карту нормалей и фиолетовую кайму.
+DRAFT_SKIP_NORMAL = True
+DRAFT_SKIP_FRINGE = True
+
+# === 10. ASYNC ===
+# Сколько рендеров AsyncRenderer выполняет одновременно (None — по числу ядер).
+ASYNC_CONCURRENCY = None
+# Сколько запросов может ждать свободного слота; сверх этого — отказ (RendererOverloadedError).
+ASYNC_MAX_QUEUE = 32
+# Сколько секунд запрос может ждать в очереди (None — без ограничения).
+ASYNC_QUEUE_TIMEOUT = None
+
+# === 11. MEMORY ===
+# Экономный по памяти режим по умолчанию (см. process_image(lean=...)):
+# шаблон рамки не кэшируется, рамка накладывается полосами.
+MEMORY_LEAN = False
+# Высота полосы (px) при наложении рамки в экономном режиме.
+LEAN_COMPOSITE_BAND = 256
+# Период (секунды) фонового замера памяти внутри этапа при memory_report=True.
+MEMORY_SAMPLE_INTERVAL = 0.01
+
+# === 12. TILED RENDER ===
+# Сторона тайла (px) тайлового рендера (process_image_tiled) в координатах итогового снимка.
+TILE_SIZE = 1024
+# Сколько тайлов рендерится параллельно (None — по числу ядер).
+TILED_WORKERS = None
+# Максимальная сторона фото при тайловом рендере (None — исходное разрешение).
+TILED_MAX_DIMENSION = None
+
+# === 13. ENCODING ===
+# Формат снимка по умолчанию для PolaroidResult.encode / render_to_bytes: png, webp, avif, jpeg.
+ENCODE_FORMAT = "png"
+# Уровень сжатия PNG (0-9): выше — меньше файл, но дольше кодирование.
+ENCODE_COMPRESS_LEVEL = 6
+# Качество JPEG / WebP / AVIF (0-100).
+ENCODE_QUALITY = 90
+# Фон, на который кладется снимок при кодировании в JPEG (без прозрачности).
+ENCODE_JPEG_BACKGROUND = (255, 255, 255)
+# Сколько выходов (снимок, маска, нормали) кодируется одновременно.
+ENCODE_WORKERS = 3
+
+# === 14. RESULT CACHE ===
+# Папка дискового кэша результатов (ResultCache).
+RESULT_CACHE_DIR = ".polaroid_cache"
+# Максимальный суммарный размер кэша, байт; сверх него вытесняются давно не читавшиеся записи.
+RESULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# === 15. SEQUENCE ===
+# Через сколько кадров анимации сменяется ключевой рисунок зерна (между ключами — плавный переход).
+SEQUENCE_GRAIN_PERIOD = 6
+# Сколько кадров обрабатывается параллельно (None — по числу ядер).
+SEQUENCE_WORKERS = None
+# Длительность кадра анимации по умолчанию, мс.
+SEQUENCE_FRAME_DURATION = 100
+
+# === 16. VARIANTS ===
+# Сколько вариантов process_variants достраивается параллельно (None — по числу ядер).
+VARIANT_WORKERS = None
@@ -1,5 +1,8 @@
+import hashlib
 import random
-from PIL import Image, ImageFilter, ImageChops, ImageDraw
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Callable, Optional, Union
+from PIL import Image
 from . import validation
 from . import geometry
 from . import config
@@ -8,10 +11,19 @@ from . import chemistry
 from . import optics
 from . import chassis
 from . import texture
+from . import edges
+from . import loader
+from . import profiles
 from .debug import Debugger
 from .data import PolaroidResult
+from .trace import Span, StageTimer
 
-def process_image(image: Image.Image, profile: str = "classic", debug: bool = False, generate_normal: bool = True, **kwargs) -> PolaroidResult:
+QUALITY_LEVELS = ("final", "draft")
+
+def process_image(image: Image.Image, profile: Union[str, profiles.CompiledProfile] = "classic", debug: bool = False,
+                  generate_normal: bool = True, tracer: Callable[[Span], None] = None, target_size: int = None,
+                  quality: str = "final", source_size: tuple = None, lean: bool = None,
+                  memory_report: bool = False, **kwargs) -> PolaroidResult:
     """
     Основной пайплайн обработки изображения: от проявки до сборки в картридж.
 
@@ -25,177 +37,429 @@ def process_image(image: Image.Image, profile: str = "classic", debug: bool = Fa
 
     Args:
         image (Image.Image): Исходное изображение.
-        profile (str, optional): Профиль обработки (пока только "classic"). Defaults to "classic".
+        profile (str | CompiledProfile, optional): Имя зарегистрированного профиля
+            (см. profiles.register_profile) или скомпилированный профиль. Defaults to "classic".
         debug (bool, optional): Сохранять ли промежуточные этапы в папку _debug. Defaults to False.
-        **kwargs: Дополнительные параметры (seed, rotation_angle и др.).
+        generate_normal (bool, optional): Строить ли карту нормалей. Defaults to True.
+        tracer (Callable[[Span], None], optional): Получает замер (Span) каждого этапа:
+            время, процессорное время и число пикселей. Например, trace.TraceCollector().
+            Если задан, разбивка по этапам также попадает в style_info["timings"].
+        target_size (int, optional): Максимальная сторона итогового снимка (с рамкой).
+            Весь пайплайн выполняется сразу в этом разрешении; результат пропорционально
+            совпадает с полным рендером (тот же seed — тот же поворот и рисунок зерна).
+        quality (str, optional): "final" или "draft". Черновик использует более дешевый
+            ресемплинг и (по настройкам DRAFT_* профиля) пропускает карту нормалей и кайму.
+        source_size (tuple, optional): Исходный размер снимка, если он уже был уменьшен
+            при декодировании (см. process_path). Нужен, чтобы масштаб эффектов
+            считался от полного рендера. По умолчанию — размер image.
+        lean (bool, optional): Экономный по памяти режим: шаблон рамки не кэшируется,
+            а рамка накладывается полосами без полноразмерного временного буфера.
+            Результат совпадает с обычным режимом. Defaults to MEMORY_LEAN профиля.
+        memory_report (bool, optional): Замерять память во время каждого этапа. Отчет
+            (см. trace.StageTimer.memory_report) попадает в style_info["memory"].
+        **kwargs: Дополнительные параметры (seed, rotation_angle и др.). Без seed он
+            выбирается случайно и возвращается в style_info["seed"].
 
     Returns:
         PolaroidResult: Объект с финальным изображением и метаданными (маска, координаты).
+
+    Raises:
+        ImageValidationError: Если изображение не проходит валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
     """
+    if quality not in QUALITY_LEVELS:
+        raise ValueError(f"Unknown quality {quality!r}, expected one of {QUALITY_LEVELS}.")
+
+    compiled = profiles.get_profile(profile)
+
+    if lean is None:
+        lean = compiled.settings.MEMORY_LEAN
+
+    timer = StageTimer(tracer, memory=memory_report)
     debugger = Debugger(enabled=debug)
+    try:
+        return _render(image, compiled, generate_normal, target_size, quality, source_size, lean, timer, debugger,
+                       kwargs)
+    finally:
+        # Дожидаемся фоновой записи отладочных снимков
+        debugger.close()
+
+def _render(image: Image.Image, profile: profiles.CompiledProfile, generate_normal: bool, target_size: int, quality: str,
+            source_size: tuple, lean: bool, timer: StageTimer, debugger: Debugger, kwargs: dict) -> PolaroidResult:
+    """Тело пайплайна process_image. Все параметры берутся из снимка профиля."""
+    developed = _develop(image, profile, target_size, quality, source_size, timer, debugger)
+
+    # Все случайные решения вызова (поворот, зерно, карта нормалей) выводятся из одного
+    # сида через локальные генераторы: вызовы в параллельных потоках не влияют друг
+    # на друга. Без seed он выбирается здесь и сохраняется в style_info["seed"],
+    # поэтому любой результат можно воспроизвести.
+    seed = kwargs.get('seed', None)
+    if seed is None:
+        seed = _new_seed()
+
+    return _finish(developed, profile, seed, generate_normal, lean, timer, debugger, kwargs)
+
+@dataclass
+class _Developed:
+    """Фото после этапов, не зависящих от сида (проявка и оптика), и параметры рендера."""
+    photo: Image.Image
+    quality: str
+    source_size: tuple
+    full_size: tuple
+    render_scale: float
+
+def _develop(image: Image.Image, profile: profiles.CompiledProfile, target_size: int, quality: str,
+             source_size: tuple, timer: StageTimer, debugger: Debugger) -> _Developed:
+    """Валидация, уменьшение, проявка и оптика: общая для всех сидов часть пайплайна."""
+    settings = profile.settings
     debugger.save(image, "step0_original")
 
-    validation.validate_image_dimensions(image.width, image.height)
+    if source_size is None:
+        source_size = image.size
+
+    with timer.stage("validation"):
+        validation.validate_image_dimensions(*source_size, settings=settings)
+
+    draft = quality == "draft"
+    resample = _resample(settings.DRAFT_RESAMPLE) if draft else Image.LANCZOS
 
     # === ОПТИМИЗАЦИЯ: SMART CAP ===
-    # Ограничиваем максимальную сторону до 2500px для ускорения рендера,
-    # сохраняя качество за счет алгоритма LANCZOS.
-    max_dimension = 2500
-    if max(image.width, image.height) > max_dimension:
-        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
-
-    limit = config.PHOTO_ROTATION_LIMIT
-    rotation_angle = random.uniform(-limit, limit)
+    # Ограничиваем максимальную сторону до MAX_PHOTO_DIMENSION для ускорения рендера,
+    # сохраняя качество за счет алгоритма LANCZOS. При target_size рендерим сразу
+    # в запрошенном размере. Исходное изображение вызывающего не изменяется.
+    full_size = geometry.fit_size(source_size, settings.MAX_PHOTO_DIMENSION)
+    photo_size = full_size
+    if target_size is not None:
+        photo_size = _photo_size_for_target(full_size, target_size, settings)
+
+    if photo_size != image.size:
+        with timer.stage("resize") as span:
+            image = image.resize(photo_size, resample, reducing_gap=2.0)
+            span.pixels = _pixels(image)
+
+    # Абсолютные (в пикселях) параметры масштабируются относительно полного рендера
+    render_scale = photo_size[0] / full_size[0]
+
+    # Этапы фото идут через одну переменную: промежуточные полноразмерные
+    # буферы освобождаются сразу, как только следующий этап готов.
+    with timer.stage("chemistry") as span:
+        photo = chemistry.develop_image(image, lut=profile.chemistry_lut)
+        span.pixels = _pixels(photo)
+    del image
+
+    with timer.stage("optics") as span:
+        photo = optics.apply_optics(photo, blur_radius=settings.OPTICS_BLUR_STRENGTH * render_scale,
+                                    settings=settings)
+        span.pixels = _pixels(photo)
+
+    return _Developed(photo, quality, tuple(source_size), full_size, render_scale)
+
+def _finish(developed: _Developed, profile: profiles.CompiledProfile, seed: int, generate_normal: bool, lean: bool,
+            timer: StageTimer, debugger: Debugger, kwargs: dict) -> PolaroidResult:
+    """
+    Зависящая от сида часть пайплайна: зерно, фото-блок, поворот и сборка.
+
+    Забирает developed.photo (обнуляет ссылку), чтобы буфер освободился сразу после
+    зерна; для нескольких хвостов от одного фото передавайте dataclasses.replace(developed).
+    """
+    settings = profile.settings
+    quality = developed.quality
+    draft = quality == "draft"
+    resample = _resample(settings.DRAFT_RESAMPLE) if draft else Image.LANCZOS
+    if draft and settings.DRAFT_SKIP_NORMAL:
+        generate_normal = False
+
+    limit = settings.PHOTO_ROTATION_LIMIT
+    rotation_angle = random.Random(_stage_seed(seed, "rotation")).uniform(-limit, limit)
     
     if 'rotation_angle' in kwargs:
         rotation_angle = kwargs['rotation_angle']
 
-    developed_photo = chemistry.develop_image(image)
-    optical_photo = optics.apply_optics(developed_photo)
-    seed = kwargs.get('seed', None)
-    grainy_photo = filters.apply_grain(optical_photo, seed=seed)
+    photo_w, photo_h = developed.photo.size
+
+    with timer.stage("grain") as span:
+        photo = filters.apply_grain(developed.photo, seed=_stage_seed(seed, "grain"), reference_size=developed.full_size,
+                                    settings=settings)
+        developed.photo = None
+        span.pixels = _pixels(photo)
     
-    debugger.save(grainy_photo, "step3_grain")
+    debugger.save(photo, "step3_grain")
 
-    layout = geometry.calculate_layout(image.width, image.height)
+    layout = geometry.calculate_layout(photo_w, photo_h, settings)
 
-    cartridge_layer = chassis.create_chassis(
-        layout, 
-        image.width, 
-        (image.width, image.height),
-        rotation_angle=rotation_angle
-    )
+    fringe = not (draft and settings.DRAFT_SKIP_FRINGE)
+    photo_block = _build_photo_block(photo, photo_w, timer, fringe=fringe, settings=settings)
+    del photo
+
+    with timer.stage("rotation") as span:
+        rotation_resample = resample if draft else Image.BICUBIC
+        photo_block = _rotate_block(photo_block, rotation_angle, resample=rotation_resample)
+        span.pixels = _pixels(photo_block)
+
+    with timer.stage("chassis") as span:
+        # Шаблон только читается при сборке, поэтому копия не нужна.
+        # В экономном режиме шаблон не остается в кэше после вызова.
+        cartridge_layer = chassis.create_chassis(
+            layout, 
+            photo_w, 
+            (photo_w, photo_h),
+            rotation_angle=rotation_angle,
+            settings=settings,
+            colors=profile.chassis_colors,
+            copy=False,
+            cache=not lean
+        )
+        span.pixels = _pixels(cartridge_layer)
     debugger.save(cartridge_layer, "step4_chassis")
 
-    final_composite = Image.new("RGBA", layout.total_size, (0, 0, 0, 0))
+    with timer.stage("compositing") as span:
+        final_composite = Image.new("RGBA", layout.total_size, (0, 0, 0, 0))
+        final_composite.paste(photo_block, layout.photo_pos, photo_block)
+        debugger.save(final_composite, "step5_photo_block_rotated_cropped")
 
-    # === СБОРКА ФОТО-БЛОКА (С РАВНОМЕРНЫМ ОВЕРСКАНОМ) ===
-    
+        if lean:
+            _alpha_composite_bands(final_composite, cartridge_layer, settings.LEAN_COMPOSITE_BAND)
+        else:
+            final_composite.alpha_composite(cartridge_layer)
+        del cartridge_layer
+        span.pixels = _pixels(final_composite)
+
+    del photo_block
+
+    # Маска и карта нормалей строятся лениво, при первом обращении к результату
+    side_outputs = SideOutputs(
+        settings=settings, layout=layout, photo_size=(photo_w, photo_h), rotation_angle=rotation_angle,
+        rotation_resample=rotation_resample, seed=seed, generate_normal=generate_normal, tracer=timer.tracer
+    )
+
+    style_info = {
+        "profile": profile.name, "overrides": kwargs, "rotation": rotation_angle,
+        "quality": quality, "render_scale": developed.render_scale, "source_size": developed.source_size,
+        "seed": seed,
+    }
+    if timer.tracer is not None:
+        style_info["timings"] = timer.breakdown()
+    if timer.memory:
+        style_info["memory"] = timer.memory_report()
+
+    return PolaroidResult(
+        image=final_composite,
+        photo_mask=None,
+        photo_rect=(layout.photo_pos[0], layout.photo_pos[1], photo_w, photo_h),
+        border_rect=(0, 0, layout.total_size[0], layout.total_size[1]),
+        style_info=style_info,
+        side_outputs=side_outputs
+    )
+
+def process_path(fp: Union[str, BinaryIO], profile: Union[str, profiles.CompiledProfile] = "classic",
+                 target_size: int = None, **kwargs) -> PolaroidResult:
+    """
+    Обрабатывает изображение из файла, не декодируя лишние пиксели.
+
+    Размеры проверяются по заголовку файла (до декодирования). JPEG декодируется
+    сразу в уменьшенном масштабе, близком к размеру рендера (MAX_PHOTO_DIMENSION
+    или target_size), что сокращает время декодирования и пиковую память.
+
+    Args:
+        fp (str | BinaryIO): Путь к файлу или открытый бинарный файл.
+        profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+        target_size (int, optional): Максимальная сторона итогового снимка (см. process_image).
+        **kwargs: Остальные параметры process_image (seed, debug, quality и др.).
+
+    Returns:
+        PolaroidResult: Результат обработки.
+
+    Raises:
+        ImageValidationError: Если файл не является изображением или не проходит валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
+    """
+    compiled = profiles.get_profile(profile)
+
+    # Фото всегда меньше снимка с рамкой, поэтому target_size — достаточный размер декодирования
+    max_dimension = compiled.settings.MAX_PHOTO_DIMENSION
+    if target_size is not None:
+        max_dimension = min(max_dimension, target_size)
+
+    image, source_size = loader.open_image(fp, max_dimension=max_dimension, settings=compiled.settings)
+    return process_image(image, profile=compiled, target_size=target_size, source_size=source_size, **kwargs)
+
+@dataclass
+class SideOutputs:
+    """
+    Построитель побочных выходов снимка (маска фото и карта нормалей) по его геометрии.
+
+    Хранит только параметры (без пиксельных буферов), поэтому дешев и передается
+    через pickle. Альфа фото-блока — это скругленная маска фото (кайма и тень
+    ее не меняют), поэтому маска строится заново точно такой же, как при рендере.
+    """
+    settings: Any
+    layout: geometry.Layout
+    photo_size: tuple
+    rotation_angle: float
+    rotation_resample: int
+    seed: int
+    generate_normal: bool = True
+    tracer: Callable[[Span], None] = None
+
+    def photo_mask(self) -> Image.Image:
+        """Маска видимой области фото в масштабе MASK_OUTPUT_SCALE."""
+        settings = self.settings
+        photo_w, photo_h = self.photo_size
+        timer = StageTimer(self.tracer)
+        with timer.stage("photo_mask") as span:
+            bleed_px = int(max(photo_w, photo_h) * settings.PHOTO_EDGE_BLEED)
+            shape = chassis.create_photo_mask(self.photo_size, photo_w, bleed=bleed_px, settings=settings)
+            shape = _rotate_block(shape, self.rotation_angle, resample=self.rotation_resample)
+
+            final_mask_canvas = Image.new("L", self.layout.total_size, 0)
+            final_mask_canvas.paste(shape, self.layout.photo_pos)
+            final_mask_canvas = _scale_mask(final_mask_canvas, settings)
+            span.pixels = _pixels(final_mask_canvas)
+        return final_mask_canvas
+
+    def normal_map(self) -> Optional[Image.Image]:
+        """Карта нормалей или None, если она не строится (generate_normal=False)."""
+        if not self.generate_normal:
+            return None
+        timer = StageTimer(self.tracer)
+        with timer.stage("normal_map") as span:
+            normal_map_img = texture.create_combined_normal(
+                total_size=self.layout.total_size,
+                photo_rect=(self.layout.photo_pos[0], self.layout.photo_pos[1]) + tuple(self.photo_size),
+                scale_factor=0.5,
+                seed=_stage_seed(self.seed, "normal"),
+                settings=self.settings
+            )
+            span.pixels = _pixels(normal_map_img)
+        return normal_map_img
+
+    def __getstate__(self) -> dict:
+        # Трассировщик (с блокировками и накопленными замерами) в другой процесс не передается
+        state = self.__dict__.copy()
+        state["tracer"] = None
+        return state
+
+def _new_seed() -> int:
+    """Случайный сид для вызова без seed (из системного источника энтропии)."""
+    return random.SystemRandom().getrandbits(32)
+
+def _stage_seed(seed: int, stage: str, index: int = 0) -> int:
+    """
+    Независимый сид стадии (rotation, grain, normal), выведенный из сида вызова.
+
+    Стадии не делят один поток Mersenne Twister: иначе поворот, зерно и выбор
+    тайлов нормалей коррелируют между собой. index различает кадры/ключи
+    последовательности; нулевой index — одиночный снимок.
+    """
+    digest = hashlib.blake2b(f"{seed}:{stage}:{index}".encode("utf-8"), digest_size=8)
+    return int.from_bytes(digest.digest(), "big")
+
+def _pixels(image: Image.Image) -> int:
+    return image.width * image.height
+
+def _photo_size_for_target(full_size: tuple, target_size: int, settings) -> tuple:
+    """Размер фото, при котором итоговый снимок (с рамкой) вписывается в target_size."""
+    layout = geometry.calculate_layout(*full_size, settings)
+    factor = min(1.0, target_size / max(layout.total_size))
+    w = max(1, int(full_size[0] * factor))
+    h = max(1, int(full_size[1] * factor))
+
+    # Поля округляются вниз, но подстрахуемся от переполнения на 1px
+    while max(geometry.calculate_layout(w, h, settings).total_size) > target_size and min(w, h) > 1:
+        w = max(1, int(w * 0.995))
+        h = max(1, int(h * 0.995))
+    return (w, h)
+
+def _resample(name: str) -> int:
+    """Преобразует имя фильтра из config ("bilinear", "bicubic", ...) в константу PIL."""
+    return Image.Resampling[name.upper()]
+
+def _build_photo_block(grainy_photo: Image.Image, width_ref: int, timer: StageTimer, fringe: bool = True,
+                       settings=config) -> Image.Image:
+    """
+    Собирает фото-блок в целевом размере: фото, маска, фиолетовая кайма и внутренняя тень.
+
+    Args:
+        grainy_photo (Image.Image): Обработанное фото (RGB).
+        width_ref (int): Референсная ширина для расчета пропорций эффектов.
+        timer (StageTimer): Замер этапов.
+        fringe (bool, optional): Рисовать ли фиолетовую кайму. Defaults to True.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: RGBA фото-блок без поворота.
+    """
     target_w, target_h = grainy_photo.size
     
-    # Расчет увеличенных размеров для компенсации поворота (Oversize)
-    # Добавляем буфер равномерно ко всем сторонам.
-    oversize_factor = config.PHOTO_ROTATION_OVERSIZE
-    max_dim = max(target_w, target_h)
-    buffer_px = int(max_dim * (oversize_factor - 1.0))
+    # Край блока (и кольца тени/каймы) начинается за пределами видимого окна.
+    bleed_px = int(max(target_w, target_h) * settings.PHOTO_EDGE_BLEED)
     
-    if buffer_px % 2 != 0:
-        buffer_px += 1
-        
-    over_w = target_w + buffer_px
-    over_h = target_h + buffer_px
+    # Генерация маски и подложки сразу в целевом размере
+    photo_mask = chassis.create_photo_mask((target_w, target_h), width_ref, bleed=bleed_px, settings=settings)
     
-    oversized_photo = grainy_photo.resize((over_w, over_h), Image.BICUBIC)
+    photo_block = grainy_photo.convert("RGBA")
+    photo_block.putalpha(photo_mask)
     
-    # Генерация маски и подложки для увеличенного размера
-    photo_mask_over = chassis.create_photo_mask((over_w, over_h), image.width)
-    
-    photo_block_over = Image.new("RGBA", (over_w, over_h), (0, 0, 0, 0))
-    photo_content = oversized_photo.convert("RGBA")
-    photo_content.putalpha(photo_mask_over)
-    photo_block_over.paste(photo_content, (0, 0))
-    
-    def create_ring_mask(w, h, depth_ratio, radius_ratio):
-        """Вспомогательная функция для создания кольцевых масок (тень, кайма)."""
-        depth_px = int(image.width * depth_ratio)
-        mask_outer = photo_mask_over.copy()
-        mask_inner = Image.new("L", (w, h), 0)
-        draw_inner = ImageDraw.Draw(mask_inner)
-        
-        inner_x0 = depth_px
-        inner_y0 = depth_px
-        inner_x1 = w - depth_px
-        inner_y1 = h - depth_px
-        
-        r_photo = int(image.width * radius_ratio)
-        r_inner = max(0, r_photo - (depth_px // 2))
-
-        if inner_x1 > inner_x0 and inner_y1 > inner_y0:
-            draw_inner.rounded_rectangle(
-                (inner_x0, inner_y0, inner_x1, inner_y1),
-                radius=r_inner,
-                fill=255
-            )
-        return ImageChops.difference(mask_outer, mask_inner)
-
     # 4. Слой фиолетовой каймы (Purple Fringe)
-    if config.FRINGE_STRENGTH > 0:
-        fringe_ring = create_ring_mask(over_w, over_h, config.FRINGE_DEPTH, config.PHOTO_CORNER_RADIUS)
-        
-        fringe_blur_px = int(image.width * config.FRINGE_BLUR)
-        if fringe_blur_px > 0:
-            fringe_ring = fringe_ring.filter(ImageFilter.GaussianBlur(fringe_blur_px))
-        
-        fringe_alpha = ImageChops.multiply(fringe_ring, photo_mask_over)
-        
-        fringe_opacity = config.FRINGE_STRENGTH / 255.0
-        fringe_alpha = fringe_alpha.point(lambda x: int(x * fringe_opacity))
-        
-        fringe_color = config.FRINGE_COLOR
-        fringe_layer = Image.new("RGBA", (over_w, over_h), (fringe_color[0], fringe_color[1], fringe_color[2], 255))
-        fringe_layer.putalpha(fringe_alpha)
-        
-        photo_block_over.alpha_composite(fringe_layer)
+    # Кольцевые эффекты отличны от нуля только у краев: считаются полосами
+    # (кэшируются по размеру) и накладываются на края блока.
+    if fringe and settings.FRINGE_STRENGTH > 0:
+        with timer.stage("fringe") as span:
+            strips = edges.ring_strips(
+                (target_w, target_h), width_ref, settings.FRINGE_DEPTH, settings.FRINGE_BLUR,
+                settings.FRINGE_COLOR, settings.FRINGE_STRENGTH, bleed=bleed_px, settings=settings
+            )
+            edges.apply_ring(photo_block, strips)
+            span.pixels = sum(_pixels(strip) for strip, _ in strips)
 
     # 5. Слой внутренней тени (Shadow)
-    shadow_ring = create_ring_mask(over_w, over_h, config.SHADOW_DEPTH, config.PHOTO_CORNER_RADIUS)
-    
-    blur_px = int(image.width * config.SHADOW_BLUR)
-    if blur_px > 0:
-        shadow_ring = shadow_ring.filter(ImageFilter.GaussianBlur(blur_px))
-    
-    shadow_alpha = ImageChops.multiply(shadow_ring, photo_mask_over)
-    opacity = config.SHADOW_STRENGTH / 255.0
-    shadow_alpha = shadow_alpha.point(lambda x: int(x * opacity))
-    
-    shadow_fill = Image.new("RGBA", (over_w, over_h), (0, 0, 0, 255))
-    shadow_fill.putalpha(shadow_alpha)
-    
-    photo_block_over.alpha_composite(shadow_fill)
+    with timer.stage("shadow") as span:
+        strips = edges.ring_strips(
+            (target_w, target_h), width_ref, settings.SHADOW_DEPTH, settings.SHADOW_BLUR,
+            (0, 0, 0), settings.SHADOW_STRENGTH, bleed=bleed_px, settings=settings
+        )
+        edges.apply_ring(photo_block, strips)
+        span.pixels = sum(_pixels(strip) for strip, _ in strips)
 
-    # 6. Вращение всего блока (Фото + Эффекты)
-    if rotation_angle != 0:
-        rotated_block_over = photo_block_over.rotate(rotation_angle, resample=Image.BICUBIC)
-    else:
-        rotated_block_over = photo_block_over
-        
-    # 7. Финальная обрезка (Crop) до исходного размера
-    left = (over_w - target_w) // 2
-    top = (over_h - target_h) // 2
-    right = left + target_w
-    bottom = top + target_h
-    
-    final_photo_block = rotated_block_over.crop((left, top, right, bottom))
-    
-    final_composite.paste(final_photo_block, layout.photo_pos, final_photo_block)
-    debugger.save(final_composite, "step5_photo_block_rotated_cropped")
+    return photo_block
 
-    final_composite.alpha_composite(cartridge_layer)
+def _rotate_block(photo_block: Image.Image, rotation_angle: float, resample: int = Image.BICUBIC) -> Image.Image:
+    """
+    Поворачивает фото-блок одним аффинным преобразованием.
 
-    # Генерация маски видимой области для экспорта
-    final_mask_canvas = Image.new("L", layout.total_size, 0)
-    rotated_photo_shape = final_photo_block.split()[3]
-    final_mask_canvas.paste(rotated_photo_shape, layout.photo_pos)
-    
-    if config.MASK_OUTPUT_SCALE != 1.0:
-        new_w = int(layout.total_size[0] * config.MASK_OUTPUT_SCALE)
-        new_h = int(layout.total_size[1] * config.MASK_OUTPUT_SCALE)
+    Увеличение на минимально нужный для угла коэффициент, поворот и обрезка
+    до целевого окна выполняются за один ресемплинг. Без поворота ресемплинг не нужен.
+    """
+    if rotation_angle == 0:
+        return photo_block
+
+    size = photo_block.size
+    cover_scale = geometry.rotation_cover_scale(size[0], size[1], rotation_angle)
+    return photo_block.transform(
+        size,
+        Image.AFFINE,
+        geometry.rotation_transform(size, rotation_angle, cover_scale),
+        resample=resample
+    )
+
+def _scale_mask(final_mask_canvas: Image.Image, settings=config) -> Image.Image:
+    """Уменьшает маску полного размера до MASK_OUTPUT_SCALE."""
+    if settings.MASK_OUTPUT_SCALE != 1.0:
+        new_w = int(final_mask_canvas.width * settings.MASK_OUTPUT_SCALE)
+        new_h = int(final_mask_canvas.height * settings.MASK_OUTPUT_SCALE)
         
         final_mask_canvas = final_mask_canvas.resize((new_w, new_h), Image.LANCZOS)
 
-    normal_map_img = None
-    if generate_normal:
-        normal_map_img = texture.create_combined_normal(
-            total_size=layout.total_size,
-            photo_rect=(layout.photo_pos[0], layout.photo_pos[1], target_w, target_h),
-            scale_factor=0.5
-        )
+    return final_mask_canvas
 
-    return PolaroidResult(
-        image=final_composite,
-        photo_mask=final_mask_canvas,
-        photo_rect=(layout.photo_pos[0], layout.photo_pos[1], image.width, image.height),
-        border_rect=(0, 0, layout.total_size[0], layout.total_size[1]),
-        style_info={"profile": profile, "overrides": kwargs, "rotation": rotation_angle},
-        normal_map=normal_map_img
-    )
\ No newline at end of file
+def _alpha_composite_bands(base: Image.Image, layer: Image.Image, band: int) -> None:
+    """
+    Накладывает layer на base на месте горизонтальными полосами.
+
+    alpha_composite целиком создает временный буфер размером с холст; полосами
+    временный буфер не больше одной полосы, а результат тот же.
+    """
+    width, height = base.size
+    for top in range(0, height, band):
+        bottom = min(top + band, height)
+        base.alpha_composite(layer, dest=(0, top), source=(0, top, width, bottom))
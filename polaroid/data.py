@@ -1,26 +1,130 @@
-from dataclasses import dataclass
-from typing import Tuple, Dict, Any
+from dataclasses import dataclass, field
+from typing import Tuple, Dict, Any, Sequence
 from PIL import Image
 
+class _SideOutput:
+    """
+    Дескриптор побочного выхода (photo_mask, normal_map) с ленивым построением.
+
+    Значение хранится в поле-слоте "_<имя>"; если оно пустое и у результата есть
+    построитель (side_outputs), значение строится при первом чтении и кэшируется.
+    """
+    def __init__(self, optional: bool):
+        self.optional = optional
+
+    def __set_name__(self, owner, name: str) -> None:
+        self.name = name
+        self.slot = "_" + name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            # Обращение через класс: dataclass берет отсюда значение по умолчанию
+            if self.optional:
+                return None
+            raise AttributeError(self.name)
+        value = getattr(obj, self.slot)
+        if value is None and obj.side_outputs is not None:
+            value = getattr(obj.side_outputs, self.name)()
+            setattr(obj, self.slot, value)
+        return value
+
+    def __set__(self, obj, value) -> None:
+        setattr(obj, self.slot, value)
+
 @dataclass
 class PolaroidResult:
     """
     Контейнер для хранения результатов генерации снимка Polaroid.
 
+    Побочные выходы (photo_mask, normal_map) строятся лениво: при первом обращении
+    по сохраненной геометрии снимка (раскладка, угол поворота, seed) и кэшируются.
+    Вызывающий, которому нужен только image, за них не платит; drop_side_outputs()
+    освобождает закэшированные буферы, build_side_outputs() строит их заранее.
+
     Attributes:
         image (Image.Image): Итоговое композитное изображение (RGBA).
-        photo_mask (Image.Image): Маска видимой области фотографии (L-mode). 
+        photo_mask (Image.Image): Маска видимой области фотографии (L-mode).
                                   Белый пиксель = фото, Черный = рамка.
-        photo_rect (Tuple[int, int, int, int]): Координаты области фотографии внутри рамки 
+        photo_rect (Tuple[int, int, int, int]): Координаты области фотографии внутри рамки
                                                 в формате (x, y, width, height).
-        border_rect (Tuple[int, int, int, int]): Габариты всего изображения 
+        border_rect (Tuple[int, int, int, int]): Габариты всего изображения
                                                  в формате (x, y, width, height).
-        style_info (Dict[str, Any]): Словарь метаданных, содержащий имя профиля, 
+        style_info (Dict[str, Any]): Словарь метаданных, содержащий имя профиля,
                                      seed, угол поворота и переопределенные параметры.
+        normal_map (Image.Image): Карта нормалей (или None, если она не строится).
+        side_outputs (optional): Построитель побочных выходов — объект с методами
+                                 photo_mask() и normal_map() (см. core.SideOutputs),
+                                 поддерживающий pickle. Готовые photo_mask и normal_map
+                                 используются как есть; None — лениво строятся им.
     """
     image: Image.Image
-    photo_mask: Image.Image
+    photo_mask: Image.Image = _SideOutput(optional=False)
     photo_rect: Tuple[int, int, int, int]
     border_rect: Tuple[int, int, int, int]
     style_info: Dict[str, Any]
-    normal_map: Image.Image = None
\ No newline at end of file
+    normal_map: Image.Image = _SideOutput(optional=True)
+    side_outputs: Any = field(default=None, repr=False, compare=False)
+    # Слоты дескрипторов _SideOutput (заполняются в __init__ через photo_mask и normal_map)
+    _photo_mask: Image.Image = field(init=False, repr=False, compare=False)
+    _normal_map: Image.Image = field(init=False, repr=False, compare=False)
+
+    def build_side_outputs(self) -> None:
+        """
+        Строит маску и карту нормалей сейчас и отвязывает построитель.
+
+        Нужен, чтобы перенести построение туда, где оно дешевле (в воркер пакетной
+        обработки или пул потоков): после вызова буферы переживают pickle, а
+        drop_side_outputs() их больше не освобождает.
+        """
+        if self.side_outputs is not None:
+            # Чтение строит буфер; запись закрепляет его до отвязки построителя
+            self.photo_mask = self.photo_mask
+            self.normal_map = self.normal_map
+            self.side_outputs = None
+
+    def drop_side_outputs(self) -> None:
+        """
+        Освобождает закэшированные маску и карту нормалей.
+
+        При следующем обращении они строятся заново. Переданные в конструктор
+        готовые буферы (без построителя) не освобождаются — их не из чего восстановить.
+        """
+        if self.side_outputs is not None:
+            self._photo_mask = None
+            self._normal_map = None
+
+    def __getstate__(self) -> dict:
+        # Восстановимые буферы не передаем (например, из процессов пакетной обработки):
+        # получатель построит их сам, если они понадобятся
+        state = self.__dict__.copy()
+        if self.side_outputs is not None:
+            state["_photo_mask"] = None
+            state["_normal_map"] = None
+        return state
+
+    def __repr__(self) -> str:
+        return (f"PolaroidResult(size={self.image.size}, photo_rect={self.photo_rect}, "
+                f"border_rect={self.border_rect}, style_info={self.style_info!r})")
+
+    def encode(self, format: str = None, outputs: Sequence[str] = ("image", "mask", "normal"),
+               quality: int = None, compress_level: int = None, lossless: bool = False) -> Dict[str, Any]:
+        """
+        Кодирует снимок, маску и карту нормалей в байты (параллельно).
+
+        Args:
+            format (str, optional): "png", "webp", "avif" или "jpeg" (снимок + отдельная альфа).
+                                    Defaults to config.ENCODE_FORMAT.
+            outputs (Sequence[str], optional): Какие выходы кодировать. Defaults to все.
+            quality (int, optional): Качество для JPEG/WebP/AVIF. Defaults to config.ENCODE_QUALITY.
+            compress_level (int, optional): Уровень сжатия PNG. Defaults to config.ENCODE_COMPRESS_LEVEL.
+            lossless (bool, optional): Кодировать снимок WebP без потерь. Defaults to False.
+
+        Returns:
+            Dict[str, EncodedOutput]: Закодированные выходы (см. encode.encode_result).
+
+        Raises:
+            EncodingError: Если формат не поддерживается или кодирование не удалось.
+        """
+        from .encode import encode_result
+        return encode_result(self, format, outputs, quality=quality, compress_level=compress_level,
+                             lossless=lossless)
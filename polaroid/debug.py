@@ -1,37 +1,114 @@
+import logging
 import os
+import queue
+import threading
+import time
+import uuid
 from PIL import Image
+from . import config
+
+logger = logging.getLogger(__name__)
+
+# Параметры сохранения для поддерживаемых форматов
+_FORMATS = {
+    "png": ("PNG", "png"),
+    "jpeg": ("JPEG", "jpg"),
+    "jpg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
 
 class Debugger:
     """
     Помощник для сохранения промежуточных этапов обработки.
     Работает только если при инициализации передан флаг enabled=True.
+
+    Кодирование и запись файлов выполняются в фоновом потоке: save() только
+    копирует снимок и кладет его в ограниченную очередь (при переполнении
+    ждет, а не копит память). Каждый запуск пишет в свою подпапку, поэтому
+    параллельные вызовы не перезаписывают файлы друг друга.
     """
-    def __init__(self, enabled: bool = False, output_dir: str = "_debug"):
+    def __init__(self, enabled: bool = False, output_dir: str = "_debug", image_format: str = None,
+                 compress_level: int = None, quality: int = None, thumbnail_size: int = None,
+                 run_subdir: bool = True, queue_size: int = None):
         self.enabled = enabled
         self.output_dir = output_dir
         self.step_counter = 1
 
+        self.image_format = (image_format or config.DEBUG_IMAGE_FORMAT).lower()
+        if self.image_format not in _FORMATS:
+            raise ValueError(f"Unsupported debug image format: {self.image_format}")
+        self.compress_level = config.DEBUG_COMPRESS_LEVEL if compress_level is None else compress_level
+        self.quality = config.DEBUG_QUALITY if quality is None else quality
+        self.thumbnail_size = config.DEBUG_THUMBNAIL_SIZE if thumbnail_size is None else thumbnail_size
+
+        self._queue = None
+        self._thread = None
+
         if self.enabled:
+            if run_subdir:
+                run_name = f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{uuid.uuid4().hex[:6]}"
+                self.output_dir = os.path.join(output_dir, run_name)
             self._ensure_dir()
 
+            size = config.DEBUG_QUEUE_SIZE if queue_size is None else queue_size
+            self._queue = queue.Queue(maxsize=size)
+            self._thread = threading.Thread(target=self._writer, name="polaroid-debug-writer", daemon=True)
+            self._thread.start()
+
     def _ensure_dir(self):
         """Создает папку для дебага, если её нет."""
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
 
     def save(self, image: Image.Image, name: str):
         """
-        Сохраняет изображение с префиксом (номером шага).
+        Ставит снимок изображения в очередь на сохранение с префиксом (номером шага).
         Пример: 01_raw_input.png
         """
         if not self.enabled:
             return
 
         # Формируем имя: 01_name.png
-        filename = f"{self.step_counter:02d}_{name}.png"
+        extension = _FORMATS[self.image_format][1]
+        filename = f"{self.step_counter:02d}_{name}.{extension}"
         path = os.path.join(self.output_dir, filename)
-        
-        image.save(path)
-        print(f"[DEBUG] Saved: {path}")
-        
-        self.step_counter += 1
\ No newline at end of file
+
+        # Копия обязательна: пайплайн может изменить изображение до записи
+        self._queue.put((image.copy(), path))
+
+        self.step_counter += 1
+
+    def close(self):
+        """Дожидается записи всех снимков из очереди и останавливает фоновый поток."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _writer(self):
+        """Фоновый поток: уменьшает (опционально), кодирует и пишет снимки на диск."""
+        pil_format = _FORMATS[self.image_format][0]
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            image, path = item
+            try:
+                if self.thumbnail_size:
+                    image.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.BILINEAR)
+
+                if pil_format == "PNG":
+                    image.save(path, format=pil_format, compress_level=self.compress_level)
+                else:
+                    if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+                        image = image.convert("RGB")
+                    image.save(path, format=pil_format, quality=self.quality)
+                logger.debug("Saved: %s", path)
+            except Exception:
+                logger.exception("Failed to save debug image %s", path)
@@ -0,0 +1,169 @@
+from typing import List, Tuple
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+from . import config
+from .cache import LRUCache, CacheInfo
+
+# Размытие по Гауссу в PIL (три прохода box blur) не выходит дальше ~3 радиусов
+BLUR_EXTENT = 3
+
+_ring_cache = LRUCache(config.EDGE_RING_CACHE_SIZE)
+
+def ring_strips(size: tuple, width_ref: int, depth_ratio: float, blur_ratio: float,
+                color: tuple, strength: int, bleed: int = 0, settings=config) -> List[Tuple[Image.Image, tuple]]:
+    """
+    Возвращает кольцевой эффект (внутренняя тень, кайма) в виде четырех полос вдоль краев.
+
+    Эффект — размытое кольцо глубиной depth_ratio внутри скругленного края фото,
+    умноженное на маску фото. Дальше BLUR_EXTENT радиусов размытия от кольца он
+    равен нулю, поэтому считается только в полосах у краев (с запасом на размытие),
+    и стоимость растет с периметром, а не с площадью. Полосы кэшируются как
+    готовые RGBA-шаблоны по размеру и параметрам.
+
+    Args:
+        size (tuple): Размер видимого окна фото (ширина, высота).
+        width_ref (int): Референсная ширина для расчета пропорций.
+        depth_ratio (float): Глубина кольца в долях от width_ref.
+        blur_ratio (float): Радиус размытия в долях от width_ref.
+        color (tuple): Цвет эффекта (R, G, B).
+        strength (int): Непрозрачность эффекта (0..255).
+        bleed (int, optional): На сколько край фото выходит за окно с каждой стороны. Defaults to 0.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        List[Tuple[Image.Image, tuple]]: Пары (RGBA-полоса, позиция в окне) для
+        alpha_composite(strip, dest=pos). Не изменяйте полосы на месте — они общие.
+    """
+    corner_ratio = settings.PHOTO_CORNER_RADIUS
+    key = (tuple(size), width_ref, depth_ratio, blur_ratio, tuple(color), strength, bleed, corner_ratio)
+    return _ring_cache.get_or_create(
+        key, lambda: _build_ring_strips(size, width_ref, depth_ratio, blur_ratio, color, strength, bleed, corner_ratio)
+    )
+
+def apply_ring(image: Image.Image, strips: List[Tuple[Image.Image, tuple]], origin: tuple = (0, 0)) -> None:
+    """
+    Накладывает полосы кольцевого эффекта на RGBA-изображение (на месте).
+
+    origin — положение image в окне фото, если image — лишь фрагмент окна
+    (тайловый рендер): полосы обрезаются по фрагменту.
+    """
+    ox, oy = origin
+    for strip, (sx, sy) in strips:
+        x0, y0 = max(sx, ox), max(sy, oy)
+        x1, y1 = min(sx + strip.width, ox + image.width), min(sy + strip.height, oy + image.height)
+        if x1 > x0 and y1 > y0:
+            image.alpha_composite(strip, dest=(x0 - ox, y0 - oy), source=(x0 - sx, y0 - sy, x1 - sx, y1 - sy))
+
+def cache_info() -> CacheInfo:
+    """Возвращает статистику кэша кольцевых эффектов."""
+    return _ring_cache.info()
+
+def clear_cache() -> None:
+    """Очищает кэш кольцевых эффектов."""
+    _ring_cache.clear()
+
+def ring_region(size: tuple, width_ref: int, depth_ratio: float, blur_ratio: float, color: tuple, strength: int,
+                box: tuple, bleed: int = 0, settings=config) -> List[Tuple[Image.Image, tuple]]:
+    """
+    Кольцевой эффект (см. ring_strips) только в окне box, без кэширования.
+
+    Полосы ring_strips растут вместе с размером снимка; для тайлового рендера
+    эффект считается по окну тайла (с тем же запасом на размытие) и совпадает
+    с соответствующим участком полос.
+
+    Args:
+        size (tuple): Размер видимого окна фото (ширина, высота).
+        width_ref (int): Референсная ширина для расчета пропорций.
+        depth_ratio (float): Глубина кольца в долях от width_ref.
+        blur_ratio (float): Радиус размытия в долях от width_ref.
+        color (tuple): Цвет эффекта (R, G, B).
+        strength (int): Непрозрачность эффекта (0..255).
+        box (tuple): Окно (x0, y0, x1, y1) в координатах окна фото.
+        bleed (int, optional): На сколько край фото выходит за окно с каждой стороны. Defaults to 0.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        List[Tuple[Image.Image, tuple]]: Пары (RGBA-полоса, позиция в окне фото), см. apply_ring.
+    """
+    ring = _RingGeometry(size, width_ref, depth_ratio, blur_ratio, color, strength, bleed,
+                         settings.PHOTO_CORNER_RADIUS)
+    X0, Y0, X1, Y1 = box
+    strips = []
+    for x0, y0, x1, y1 in ring.boxes():
+        part = (max(x0, X0), max(y0, Y0), min(x1, X1), min(y1, Y1))
+        if part[2] > part[0] and part[3] > part[1]:
+            strips.append((ring.render(part), part[:2]))
+    return strips
+
+def _build_ring_strips(size, width_ref, depth_ratio, blur_ratio, color, strength, bleed, corner_ratio):
+    ring = _RingGeometry(size, width_ref, depth_ratio, blur_ratio, color, strength, bleed, corner_ratio)
+    return [(ring.render(box), box[:2]) for box in ring.boxes()]
+
+class _RingGeometry:
+    """Размеры кольца в пикселях и отрисовка его фрагментов."""
+    def __init__(self, size, width_ref, depth_ratio, blur_ratio, color, strength, bleed, corner_ratio):
+        self.w, self.h = size
+        self.bleed = bleed
+        self.color = color
+        self.pad_w, self.pad_h = self.w + bleed * 2, self.h + bleed * 2
+
+        self.depth_px = int(width_ref * depth_ratio)
+        self.blur_px = int(width_ref * blur_ratio)
+        self.r_photo = int(width_ref * corner_ratio)
+        self.r_inner = max(0, self.r_photo - (self.depth_px // 2))
+        self.halo = self.blur_px * BLUR_EXTENT
+
+        opacity = strength / 255.0
+        self.lut = [int(x * opacity) for x in range(256)]
+
+    def boxes(self) -> List[tuple]:
+        """Полосы вдоль краев (в координатах окна), где эффект отличен от нуля."""
+        w, h = self.w, self.h
+        # Толщина полосы в координатах окна: кольцо (со скруглением угла) плюс хвост размытия
+        band = self.depth_px + self.r_inner + self.halo - self.bleed
+        if band <= 0:
+            return []
+
+        if band * 2 >= min(w, h):
+            return [(0, 0, w, h)]
+        return [
+            (0, 0, w, band),
+            (0, h - band, w, h),
+            (0, band, band, h - band),
+            (w - band, band, w, h - band),
+        ]
+
+    def render(self, box: tuple) -> Image.Image:
+        """RGBA-фрагмент эффекта в окне box."""
+        x0, y0, x1, y1 = box
+        bleed, halo, depth_px = self.bleed, self.halo, self.depth_px
+        pad_w, pad_h = self.pad_w, self.pad_h
+
+        # Область на расширенном холсте: полоса + запас на размытие, в пределах холста
+        rx0 = max(0, x0 + bleed - halo)
+        ry0 = max(0, y0 + bleed - halo)
+        rx1 = min(pad_w, x1 + bleed + halo)
+        ry1 = min(pad_h, y1 + bleed + halo)
+        region = (rx1 - rx0, ry1 - ry0)
+
+        outer = Image.new("L", region, 0)
+        ImageDraw.Draw(outer).rounded_rectangle(
+            (-rx0, -ry0, pad_w - rx0, pad_h - ry0), radius=self.r_photo, fill=255
+        )
+        inner = Image.new("L", region, 0)
+        if pad_w - depth_px > depth_px and pad_h - depth_px > depth_px:
+            ImageDraw.Draw(inner).rounded_rectangle(
+                (depth_px - rx0, depth_px - ry0, pad_w - depth_px - rx0, pad_h - depth_px - ry0),
+                radius=self.r_inner, fill=255
+            )
+
+        ring = ImageChops.difference(outer, inner)
+        if self.blur_px > 0:
+            ring = ring.filter(ImageFilter.GaussianBlur(self.blur_px))
+
+        crop = (x0 + bleed - rx0, y0 + bleed - ry0, x1 + bleed - rx0, y1 + bleed - ry0)
+        alpha = ImageChops.multiply(ring, outer).crop(crop).point(self.lut)
+
+        color = self.color
+        strip = Image.new("RGBA", alpha.size, (color[0], color[1], color[2], 255))
+        strip.putalpha(alpha)
+        return strip
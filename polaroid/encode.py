@@ -0,0 +1,217 @@
+import io
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Sequence
+from PIL import Image, features
+from . import config
+from .core import process_image
+from .data import PolaroidResult
+from .exceptions import EncodingError
+
+# Формат -> (формат PIL, расширение, MIME-тип, модуль Pillow для проверки поддержки)
+FORMATS = {
+    "png": ("PNG", ".png", "image/png", None),
+    "webp": ("WEBP", ".webp", "image/webp", "webp"),
+    "avif": ("AVIF", ".avif", "image/avif", "avif"),
+    "jpeg": ("JPEG", ".jpg", "image/jpeg", None),
+}
+_ALIASES = {"jpg": "jpeg"}
+
+# Выходы результата: снимок, маска фото и карта нормалей
+OUTPUTS = ("image", "mask", "normal")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+@dataclass
+class EncodedOutput:
+    """
+    Закодированный выход результата, готовый к записи или загрузке.
+
+    Attributes:
+        data (bytes): Закодированный файл.
+        format (str): Формат ("png", "webp", "avif", "jpeg").
+        extension (str): Расширение файла с точкой.
+        mime_type (str): MIME-тип.
+    """
+    data: bytes
+    format: str
+    extension: str
+    mime_type: str
+
+def encode_result(result: PolaroidResult, format: str = None, outputs: Sequence[str] = OUTPUTS,
+                  quality: int = None, compress_level: int = None, lossless: bool = False,
+                  executor: Executor = None) -> Dict[str, EncodedOutput]:
+    """
+    Кодирует выходы результата в байты; выходы кодируются параллельно.
+
+    Снимок кодируется в format. Маска и карта нормалей — данные, а не картинки,
+    поэтому всегда кодируются без потерь: lossless WebP для "webp", иначе PNG.
+    JPEG не хранит прозрачность: снимок кладется на ENCODE_JPEG_BACKGROUND,
+    а его альфа-канал отдается отдельным выходом "alpha" (PNG).
+
+    Args:
+        result (PolaroidResult): Результат обработки.
+        format (str, optional): "png", "webp", "avif" или "jpeg". Defaults to config.ENCODE_FORMAT.
+        outputs (Sequence[str], optional): Какие выходы кодировать (из OUTPUTS). Defaults to все.
+        quality (int, optional): Качество для JPEG/WebP/AVIF (0-100). Defaults to config.ENCODE_QUALITY.
+        compress_level (int, optional): Уровень сжатия PNG (0-9). Defaults to config.ENCODE_COMPRESS_LEVEL.
+        lossless (bool, optional): Кодировать снимок WebP без потерь. Defaults to False.
+        executor (Executor, optional): Пул для кодирования. По умолчанию — общий пул
+                                       потоков на ENCODE_WORKERS потоков.
+
+    Returns:
+        Dict[str, EncodedOutput]: {"image": ..., "mask": ..., "normal": ..., "alpha": ...};
+        выходы, которых нет в результате (normal_map=None), пропускаются.
+
+    Raises:
+        EncodingError: Если формат не поддерживается или кодирование не удалось.
+        ValueError: Если запрошен неизвестный выход.
+    """
+    fmt = _resolve_format(format)
+    unknown = sorted(set(outputs) - set(OUTPUTS))
+    if unknown:
+        raise ValueError(f"Unknown outputs {unknown}, expected some of {OUTPUTS}.")
+
+    if quality is None:
+        quality = config.ENCODE_QUALITY
+    if compress_level is None:
+        compress_level = config.ENCODE_COMPRESS_LEVEL
+
+    side_fmt = "webp" if fmt == "webp" else "png"
+    side_params = {"compress_level": compress_level, "lossless": True, "quality": 100}
+    params = {"compress_level": compress_level, "lossless": lossless, "quality": quality}
+
+    jobs = {}
+    if "image" in outputs:
+        if fmt == "jpeg":
+            flat, alpha = _split_alpha(result.image, config.ENCODE_JPEG_BACKGROUND)
+            jobs["image"] = (flat, fmt, params)
+            jobs["alpha"] = (alpha, "png", side_params)
+        else:
+            jobs["image"] = (result.image, fmt, params)
+    # Маска и карта нормалей строятся лениво: задаем их именем атрибута, чтобы
+    # построение шло в задачах пула параллельно с кодированием, а не в вызывающем потоке
+    if "mask" in outputs:
+        jobs["mask"] = ("photo_mask", side_fmt, side_params)
+    if "normal" in outputs:
+        jobs["normal"] = ("normal_map", side_fmt, side_params)
+
+    pool = executor or _shared_executor()
+    futures = {
+        name: pool.submit(_encode_output, result, source, image_fmt, kw)
+        for name, (source, image_fmt, kw) in jobs.items()
+    }
+    encoded = {name: future.result() for name, future in futures.items()}
+    return {name: output for name, output in encoded.items() if output is not None}
+
+def encode_image(image: Image.Image, format: str = None, quality: int = None, compress_level: int = None,
+                 lossless: bool = False) -> EncodedOutput:
+    """
+    Кодирует одно изображение в байты.
+
+    Args:
+        image (Image.Image): Изображение.
+        format (str, optional): "png", "webp", "avif" или "jpeg". Defaults to config.ENCODE_FORMAT.
+        quality (int, optional): Качество для JPEG/WebP/AVIF. Defaults to config.ENCODE_QUALITY.
+        compress_level (int, optional): Уровень сжатия PNG. Defaults to config.ENCODE_COMPRESS_LEVEL.
+        lossless (bool, optional): WebP без потерь. Defaults to False.
+
+    Returns:
+        EncodedOutput: Закодированное изображение.
+
+    Raises:
+        EncodingError: Если формат не поддерживается или кодирование не удалось.
+    """
+    fmt = _resolve_format(format)
+    pil_format, extension, mime_type, _ = FORMATS[fmt]
+
+    if fmt == "png":
+        params = {"compress_level": config.ENCODE_COMPRESS_LEVEL if compress_level is None else compress_level}
+    else:
+        params = {"quality": config.ENCODE_QUALITY if quality is None else quality}
+        if fmt == "webp":
+            params["lossless"] = lossless
+        if fmt == "jpeg" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+    buffer = io.BytesIO()
+    try:
+        image.save(buffer, format=pil_format, **params)
+    except (OSError, ValueError, KeyError) as exc:
+        raise EncodingError(f"Failed to encode {image.mode} image as {fmt}: {exc}") from exc
+    return EncodedOutput(buffer.getvalue(), fmt, extension, mime_type)
+
+def render_to_bytes(image: Image.Image, format: str = None, outputs: Sequence[str] = OUTPUTS, quality: int = None,
+                    compress_level: int = None, lossless: bool = False, **kwargs) -> Dict[str, EncodedOutput]:
+    """
+    Обрабатывает изображение (process_image) и сразу кодирует выходы (encode_result).
+
+    Карта нормалей строится, только если она запрошена в outputs.
+
+    Args:
+        image (Image.Image): Исходное изображение.
+        format, outputs, quality, compress_level, lossless: См. encode_result.
+        **kwargs: Параметры process_image (profile, seed, target_size и др.).
+
+    Returns:
+        Dict[str, EncodedOutput]: Закодированные выходы.
+
+    Raises:
+        ImageValidationError: Если изображение не проходит валидацию.
+        EncodingError: Если формат не поддерживается или кодирование не удалось.
+    """
+    # Формат проверяем до рендера, чтобы не тратить его впустую
+    _resolve_format(format)
+    kwargs.setdefault("generate_normal", "normal" in outputs)
+    result = process_image(image, **kwargs)
+    return encode_result(result, format, outputs, quality=quality, compress_level=compress_level, lossless=lossless)
+
+def extensions(format: str = None) -> Dict[str, str]:
+    """
+    Расширения файлов всех выходов encode_result для формата.
+
+    Returns:
+        Dict[str, str]: {"image": ..., "mask": ..., "normal": ...} и "alpha" для JPEG.
+    """
+    fmt = _resolve_format(format)
+    side = FORMATS["webp" if fmt == "webp" else "png"][1]
+    result = {"image": FORMATS[fmt][1], "mask": side, "normal": side}
+    if fmt == "jpeg":
+        result["alpha"] = FORMATS["png"][1]
+    return result
+
+def _encode_output(result: PolaroidResult, source, format: str, params: dict):
+    """Задача пула: кодирует изображение или атрибут результата (None, если выхода нет)."""
+    image = getattr(result, source) if isinstance(source, str) else source
+    if image is None:
+        return None
+    return encode_image(image, format, **params)
+
+def _resolve_format(format: str) -> str:
+    fmt = (format or config.ENCODE_FORMAT).lower()
+    fmt = _ALIASES.get(fmt, fmt)
+    if fmt not in FORMATS:
+        raise EncodingError(f"Unsupported format {format!r}, expected one of {tuple(FORMATS)}.")
+    feature = FORMATS[fmt][3]
+    if feature is not None and not features.check(feature):
+        raise EncodingError(f"Format {fmt!r} is not supported by this Pillow build.")
+    return fmt
+
+def _split_alpha(image: Image.Image, background: tuple) -> tuple:
+    """Кладет RGBA-снимок на фон (для JPEG) и возвращает (RGB, альфа-канал)."""
+    if image.mode != "RGBA":
+        return image, Image.new("L", image.size, 255)
+    flat = Image.new("RGBA", image.size, tuple(background) + (255,))
+    flat.alpha_composite(image)
+    return flat.convert("RGB"), image.getchannel("A")
+
+def _shared_executor() -> Executor:
+    """Общий пул кодирования (создается при первом использовании)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=config.ENCODE_WORKERS, thread_name_prefix="polaroid-encode")
+    return _executor
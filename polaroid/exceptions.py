@@ -16,4 +16,18 @@ class InvalidProfileError(PolaroidError):
     """
     Исключение, возникающее при попытке использовать несуществующий профиль обработки.
     """
-    pass
\ No newline at end of file
+    pass
+
+class RendererOverloadedError(PolaroidError):
+    """
+    Исключение, возникающее, когда асинхронный рендерер перегружен:
+    очередь ожидания заполнена или запрос ждал слота дольше допустимого.
+    """
+    pass
+
+class EncodingError(PolaroidError):
+    """
+    Исключение, возникающее, когда результат не удается закодировать:
+    формат не поддерживается сборкой Pillow или кодировщик вернул ошибку.
+    """
+    pass
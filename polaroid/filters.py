@@ -1,43 +1,287 @@
+import math
+import os
 import random
+import threading
+from functools import lru_cache
 from PIL import Image, ImageChops, ImageEnhance
 from . import config
 
-def apply_grain(image: Image.Image, seed: int = None, intensity: float = None) -> Image.Image:
+# Все преобразования квадрата, сохраняющие бесшовность тайла
+_TILE_TRANSFORMS = (
+    None,
+    Image.Transpose.FLIP_LEFT_RIGHT,
+    Image.Transpose.FLIP_TOP_BOTTOM,
+    Image.Transpose.ROTATE_90,
+    Image.Transpose.ROTATE_180,
+    Image.Transpose.ROTATE_270,
+    Image.Transpose.TRANSPOSE,
+    Image.Transpose.TRANSVERSE,
+)
+
+_tile_banks = {}
+_tile_bank_lock = threading.Lock()
+
+def generate_noise(size: tuple, cutoff: int, seed: int = None) -> Image.Image:
+    """
+    Генерирует равномерный шум в диапазоне 0..cutoff целиком, без циклов Python.
+
+    Буфер заполняется случайными байтами за один вызов и отображается в нужный
+    диапазон через таблицу (LUT). С заданным seed результат побитово
+    воспроизводим; без seed используется os.urandom.
+
+    Args:
+        size (tuple): Размер шума (ширина, высота).
+        cutoff (int): Максимальное значение шума (0..255).
+        seed (int, optional): Сид для воспроизводимости.
+
+    Returns:
+        Image.Image: L-изображение с шумом.
+    """
+    w, h = size
+    if seed is not None:
+        data = random.Random(seed).randbytes(w * h)
+    else:
+        data = os.urandom(w * h)
+
+    noise = Image.frombytes("L", (w, h), data)
+    return noise.point(noise_lut(cutoff))
+
+@lru_cache(maxsize=None)
+def noise_lut(cutoff: int) -> tuple:
+    """Таблица, отображающая байт 0..255 в диапазон шума 0..cutoff (кэшируется)."""
+    return tuple(v * (cutoff + 1) // 256 for v in range(256))
+
+def grain_tile_bank(settings=config) -> list:
+    """
+    Возвращает банк заранее отрисованных бесшовных тайлов зерна.
+
+    Банк строится один раз на процесс (из GRAIN_TILE_SEED) для каждого набора
+    параметров зерна и далее переиспользуется. Каждый тайл — квадратное
+    RGB-изображение зерна той же мягкости (GRAIN_SCALE), что и у обычного пути.
+
+    Args:
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        list: Список RGB-тайлов.
+    """
+    key = (settings.GRAIN_TILE_SEED, settings.GRAIN_TILE_COUNT, settings.GRAIN_TILE_NOISE_SIZE,
+           settings.GRAIN_SCALE, settings.GRAIN_CUTOFF)
+    bank = _tile_banks.get(key)
+    if bank is None:
+        with _tile_bank_lock:
+            bank = _tile_banks.get(key)
+            if bank is None:
+                bank = [
+                    _render_grain_tile(settings.GRAIN_TILE_SEED + i, settings)
+                    for i in range(settings.GRAIN_TILE_COUNT)
+                ]
+                _tile_banks[key] = bank
+    return bank
+
+def _render_grain_tile(seed: int, settings=config) -> Image.Image:
+    """
+    Рисует один бесшовный тайл зерна.
+
+    Шум размножается 3x3, растягивается и обрезается по центральной клетке:
+    ядро BICUBIC видит периодическое продолжение, поэтому края тайла стыкуются.
+    """
+    small = settings.GRAIN_TILE_NOISE_SIZE
+    tile = int(round(small * settings.GRAIN_SCALE))
+
+    noise = generate_noise((small, small), settings.GRAIN_CUTOFF, seed=seed)
+    padded = Image.new("L", (small * 3, small * 3))
+    for ty in range(3):
+        for tx in range(3):
+            padded.paste(noise, (tx * small, ty * small))
+
+    padded = padded.resize((tile * 3, tile * 3), Image.BICUBIC)
+    return padded.crop((tile, tile, tile * 2, tile * 2)).convert("RGB")
+
+def _blit_grain(size: tuple, seed: int = None, settings=config, origin: tuple = (0, 0)) -> Image.Image:
+    """
+    Собирает слой зерна нужного размера из банка тайлов.
+
+    Тайл, его поворот/отражение и смещение выбираются детерминированно по seed.
+    origin — положение слоя в кадре (для фрагментов при тайловом рендере).
+    """
+    rng = random.Random(seed)
+    bank = grain_tile_bank(settings)
+
+    tile = bank[rng.randrange(len(bank))]
+    transform = _TILE_TRANSFORMS[rng.randrange(len(_TILE_TRANSFORMS))]
+    if transform is not None:
+        tile = tile.transpose(transform)
+
+    tile_w, tile_h = tile.size
+    offset_x = (rng.randrange(tile_w) + origin[0]) % tile_w
+    offset_y = (rng.randrange(tile_h) + origin[1]) % tile_h
+
+    w, h = size
+    layer = Image.new("RGB", (w, h))
+    for y in range(-offset_y, h, tile_h):
+        for x in range(-offset_x, w, tile_w):
+            layer.paste(tile, (x, y))
+    return layer
+
+def apply_grain(image: Image.Image, seed: int = None, intensity: float = None, use_tile_bank: bool = None,
+                reference_size: tuple = None, settings=config) -> Image.Image:
     """
     Накладывает "облачное" пленочное зерно (Grain 2.0).
 
     Генерирует шум в уменьшенном разрешении и растягивает его бикубическим методом,
     создавая мягкую, органичную текстуру, характерную для моментальной фотографии.
+    С банком тайлов (GRAIN_TILE_BANK) зерно не генерируется заново,
+    а собирается из готовых бесшовных тайлов.
 
     Args:
         image (Image.Image): Исходное изображение.
         seed (int, optional): Сид для генератора случайных чисел (для воспроизводимости).
-        intensity (float, optional): Сила наложения зерна. Если None, берется из config.
+        intensity (float, optional): Сила наложения зерна. Если None, берется из settings.
+        use_tile_bank (bool, optional): Использовать банк тайлов. Если None, берется из settings.
+        reference_size (tuple, optional): Размер, для которого строится поле шума. При рендере
+                                          в уменьшенном размере (черновик) шум (или слой из
+                                          банка тайлов) строится для полного размера и
+                                          масштабируется, поэтому рисунок зерна
+                                          пропорционально совпадает.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
 
     Returns:
         Image.Image: Изображение с наложенным зерном.
     """
     if intensity is None:
-        intensity = config.GRAIN_INTENSITY
+        intensity = settings.GRAIN_INTENSITY
         
     if intensity <= 0:
         return image
 
-    if seed is not None:
-        random.seed(seed)
+    if use_tile_bank is None:
+        use_tile_bank = settings.GRAIN_TILE_BANK
 
     w, h = image.size
-    
-    small_w = int(w / config.GRAIN_SCALE)
-    small_h = int(h / config.GRAIN_SCALE)
-    
-    noise_data = [random.randint(0, config.GRAIN_CUTOFF) for _ in range(small_w * small_h)]
-    
-    noise_layer = Image.new("L", (small_w, small_h))
-    noise_layer.putdata(noise_data)
-    
-    noise_layer = noise_layer.resize((w, h), Image.BICUBIC)
-    
-    noise_layer = noise_layer.convert("RGB")
-    
-    return Image.blend(image, noise_layer, alpha=intensity)
\ No newline at end of file
+    if reference_size is None:
+        reference_size = (w, h)
+
+    # Банк тайлов привязан к пиксельной сетке полного размера: в уменьшенном
+    # рендере слой собирается в полном размере и уменьшается, как и поле шума
+    if use_tile_bank:
+        grain = grain_tile_layer(reference_size, (w, h), seed=seed, settings=settings)
+        return Image.blend(image, grain, alpha=intensity)
+
+    noise = grain_noise(reference_size, seed=seed, settings=settings)
+    return Image.blend(image, grain_region((w, h), (0, 0, w, h), noise), alpha=intensity)
+
+def apply_grain_region(image: Image.Image, size: tuple, box: tuple, seed: int = None, intensity: float = None,
+                       noise: Image.Image = None, settings=config) -> Image.Image:
+    """
+    Накладывает зерно на фрагмент image — окно box кадра size — так же, как apply_grain на весь кадр.
+
+    Args:
+        image (Image.Image): Фрагмент кадра (размера окна box).
+        size (tuple): Размер полного кадра (ширина, высота).
+        box (tuple): Окно (x0, y0, x1, y1) в координатах кадра.
+        seed (int, optional): Сид зерна (тот же, что для всего кадра).
+        intensity (float, optional): Сила наложения зерна. Если None, берется из settings.
+        noise (Image.Image, optional): Готовое поле шума (см. grain_noise), общее для всех
+                                       фрагментов кадра. Если None, строится заново.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: Фрагмент с наложенным зерном.
+    """
+    if intensity is None:
+        intensity = settings.GRAIN_INTENSITY
+    if intensity <= 0:
+        return image
+
+    if settings.GRAIN_TILE_BANK:
+        grain = _blit_grain(image.size, seed=seed, settings=settings, origin=box[:2])
+    else:
+        if noise is None:
+            noise = grain_noise(size, seed=seed, settings=settings)
+        grain = grain_region(size, box, noise)
+    return Image.blend(image, grain, alpha=intensity)
+
+def grain_tile_layer(reference_size: tuple, size: tuple, seed: int = None, settings=config) -> Image.Image:
+    """
+    Слой зерна из банка тайлов для кадра reference_size, уменьшенный до size.
+
+    Args:
+        reference_size (tuple): Размер кадра (ширина, высота), для которого собирается слой.
+        size (tuple): Размер слоя на выходе (размер рендера).
+        seed (int, optional): Сид выбора тайла, его преобразования и смещения.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: RGB-слой зерна размера size.
+    """
+    grain = _blit_grain(tuple(reference_size), seed=seed, settings=settings)
+    if grain.size != tuple(size):
+        grain = grain.resize(tuple(size), Image.BICUBIC, reducing_gap=2.0)
+    return grain
+
+def grain_noise(reference_size: tuple, seed: int = None, settings=config) -> Image.Image:
+    """
+    Поле шума зерна в уменьшенном (GRAIN_SCALE) разрешении для кадра reference_size.
+
+    Args:
+        reference_size (tuple): Размер кадра (ширина, высота), для которого строится шум.
+        seed (int, optional): Сид для воспроизводимости.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: L-изображение шума.
+    """
+    small_w = max(1, int(reference_size[0] / settings.GRAIN_SCALE))
+    small_h = max(1, int(reference_size[1] / settings.GRAIN_SCALE))
+    return generate_noise((small_w, small_h), settings.GRAIN_CUTOFF, seed=seed)
+
+def crossfade_noise(first: Image.Image, second: Image.Image, t: float, cutoff: int) -> Image.Image:
+    """
+    Плавный переход между двумя полями шума зерна (для анимации).
+
+    Поля смешиваются с весами cos/sin вокруг среднего (cutoff / 2), поэтому
+    контраст зерна не проседает в середине перехода, как при линейном blend.
+
+    Args:
+        first (Image.Image): Поле шума в начале перехода (см. grain_noise).
+        second (Image.Image): Поле шума в конце перехода (того же размера).
+        t (float): Положение перехода, 0..1.
+        cutoff (int): Максимальное значение шума (GRAIN_CUTOFF).
+
+    Returns:
+        Image.Image: L-изображение шума.
+    """
+    if t <= 0:
+        return first
+    if t >= 1:
+        return second
+
+    center = cutoff / 2
+    offset = round(center)
+    w_first = math.cos(t * math.pi / 2)
+    w_second = math.sin(t * math.pi / 2)
+    first = first.point([round(center + (v - center) * w_first) for v in range(256)])
+    second = second.point([round(center + (v - center) * w_second) for v in range(256)])
+    return ImageChops.add(first, second, scale=1.0, offset=-offset)
+
+def grain_region(size: tuple, box: tuple, noise: Image.Image) -> Image.Image:
+    """
+    Фрагмент слоя зерна: поле шума (см. grain_noise), растянутое на кадр size, в окне box.
+
+    Растягивается только окно, поэтому фрагменты совпадают с соответствующими
+    участками полного слоя, а память не зависит от размера кадра.
+
+    Args:
+        size (tuple): Размер кадра (ширина, высота).
+        box (tuple): Область (x0, y0, x1, y1) в координатах кадра.
+        noise (Image.Image): Поле шума.
+
+    Returns:
+        Image.Image: RGB-слой зерна размера области box.
+    """
+    w, h = size
+    x0, y0, x1, y1 = box
+    nw, nh = noise.size
+    layer = noise.resize((x1 - x0, y1 - y0), Image.BICUBIC, box=(x0 * nw / w, y0 * nh / h, x1 * nw / w, y1 * nh / h))
+    return layer.convert("RGB")
@@ -1,3 +1,4 @@
+import math
 from dataclasses import dataclass
 from typing import Tuple
 from . import config
@@ -15,7 +16,7 @@ class Layout:
     total_size: Tuple[int, int]
     photo_pos: Tuple[int, int]
 
-def calculate_layout(image_width: int, image_height: int) -> Layout:
+def calculate_layout(image_width: int, image_height: int, settings=config) -> Layout:
     """
     Рассчитывает геометрию рамки Polaroid на основе размеров входного изображения.
 
@@ -25,13 +26,14 @@ def calculate_layout(image_width: int, image_height: int) -> Layout:
     Args:
         image_width (int): Ширина исходного изображения в пикселях.
         image_height (int): Высота исходного изображения в пикселях.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
 
     Returns:
         Layout: Объект с рассчитанными размерами рамки и позицией фото.
     """
-    margin_side = int(image_width * config.BORDER_SIDE_RATIO)
-    margin_top = int(image_width * config.BORDER_TOP_RATIO)
-    margin_bottom = int(image_width * config.BORDER_BOTTOM_RATIO)
+    margin_side = int(image_width * settings.BORDER_SIDE_RATIO)
+    margin_top = int(image_width * settings.BORDER_TOP_RATIO)
+    margin_bottom = int(image_width * settings.BORDER_BOTTOM_RATIO)
 
     total_width = image_width + (margin_side * 2)
     total_height = image_height + margin_top + margin_bottom
@@ -42,4 +44,72 @@ def calculate_layout(image_width: int, image_height: int) -> Layout:
     return Layout(
         total_size=(total_width, total_height),
         photo_pos=(photo_x, photo_y)
-    )
\ No newline at end of file
+    )
+
+def rotation_cover_scale(width: int, height: int, angle: float) -> float:
+    """
+    Минимальный коэффициент увеличения, при котором повернутый прямоугольник
+    полностью перекрывает исходное окно (без прозрачных углов).
+
+    Args:
+        width (int): Ширина окна.
+        height (int): Высота окна.
+        angle (float): Угол поворота в градусах.
+
+    Returns:
+        float: Коэффициент увеличения (1.0 при нулевом угле).
+    """
+    if angle == 0:
+        return 1.0
+    theta = math.radians(abs(angle))
+    aspect = max(width / height, height / width)
+    # +1px с каждой стороны, чтобы бикубическое ядро не выходило за край источника
+    return math.cos(theta) + aspect * math.sin(theta) + 2.0 / min(width, height)
+
+def rotation_transform(size: tuple, angle: float, scale: float = 1.0, offset: tuple = (0, 0)) -> tuple:
+    """
+    Возвращает коэффициенты аффинного преобразования (для Image.transform)
+    поворота с увеличением вокруг центра изображения.
+
+    Поворот совпадает по направлению с Image.rotate (против часовой стрелки).
+    Масштаб, поворот и обрезка по окну выполняются одним ресемплингом.
+
+    Args:
+        size (tuple): Размер исходного изображения (ширина, высота).
+        angle (float): Угол поворота в градусах.
+        scale (float, optional): Коэффициент увеличения. Defaults to 1.0.
+        offset (tuple, optional): Смещение выходного окна относительно исходного (x, y).
+                                  Позволяет получить отдельный фрагмент результата.
+
+    Returns:
+        tuple: Коэффициенты (a, b, c, d, e, f) для Image.AFFINE.
+    """
+    cx, cy = size[0] / 2, size[1] / 2
+    theta = -math.radians(angle)
+    cos_t = math.cos(theta) / scale
+    sin_t = math.sin(theta) / scale
+
+    # Вход = центр + R * (выход + offset - центр) / scale
+    ox = offset[0] - cx
+    oy = offset[1] - cy
+    return (
+        cos_t, sin_t, cos_t * ox + sin_t * oy + cx,
+        -sin_t, cos_t, -sin_t * ox + cos_t * oy + cy,
+    )
+
+def fit_size(size: tuple, max_dimension: int) -> tuple:
+    """
+    Вписывает размер в квадрат max_dimension с сохранением пропорций (без увеличения).
+
+    Args:
+        size (tuple): Исходный размер (ширина, высота).
+        max_dimension (int): Максимальная сторона.
+
+    Returns:
+        tuple: Новый размер (ширина, высота).
+    """
+    w, h = size
+    if max(w, h) <= max_dimension:
+        return (w, h)
+    factor = max_dimension / max(w, h)
+    return (max(1, round(w * factor)), max(1, round(h * factor)))
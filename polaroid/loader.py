@@ -0,0 +1,76 @@
+from typing import BinaryIO, Tuple, Union
+from PIL import Image, ImageOps, ExifTags, UnidentifiedImageError
+from . import config
+from . import geometry
+from . import validation
+from .exceptions import ImageValidationError
+
+# Значения EXIF Orientation, при которых ширина и высота меняются местами
+_TRANSPOSED_ORIENTATIONS = (5, 6, 7, 8)
+
+def read_size(image: Image.Image) -> tuple:
+    """
+    Возвращает размер изображения с учетом EXIF-ориентации, не декодируя пиксели.
+
+    Args:
+        image (Image.Image): Лениво открытое изображение (Image.open).
+
+    Returns:
+        tuple: (ширина, высота) в том виде, в котором снимок будет показан.
+    """
+    w, h = image.size
+    orientation = image.getexif().get(ExifTags.Base.Orientation, 1)
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        return (h, w)
+    return (w, h)
+
+def open_image(fp: Union[str, BinaryIO], max_dimension: int = None,
+               settings=config) -> Tuple[Image.Image, tuple]:
+    """
+    Открывает файл, проверяет размеры по заголовку и декодирует с уменьшением.
+
+    Валидация (validation.validate_image_dimensions) выполняется до декодирования
+    пикселей, поэтому битые и неподходящие файлы отсекаются дешево. Для JPEG
+    декодер сразу работает в уменьшенном масштабе (1/2, 1/4, 1/8), при котором
+    снимок все еще не меньше вписанного в max_dimension размера. Это экономит
+    время и пиковую память на больших снимках. EXIF-ориентация применяется к результату.
+
+    Args:
+        fp (str | BinaryIO): Путь к файлу или открытый бинарный файл.
+        max_dimension (int, optional): Сторона, до которой снимок будет уменьшен
+                                       при рендере. None — полный размер.
+        settings (optional): Параметры (модуль config или снимок профиля) для валидации
+                             размеров. Defaults to config.
+
+    Returns:
+        Tuple[Image.Image, tuple]: Декодированное изображение и исходный размер снимка
+                                   (с учетом ориентации, до уменьшения при декодировании).
+
+    Raises:
+        ImageValidationError: Если файл не распознан как изображение или не проходит валидацию.
+    """
+    try:
+        image = Image.open(fp)
+    except UnidentifiedImageError as exc:
+        raise ImageValidationError(f"Unsupported or corrupted image file: {exc}") from exc
+
+    try:
+        width, height = read_size(image)
+        validation.validate_image_dimensions(width, height, settings=settings)
+
+        if max_dimension is not None:
+            # draft() работает в ориентации файла; вписывание симметрично по осям
+            image.draft(image.mode if image.mode in ("L", "RGB") else "RGB",
+                        geometry.fit_size(image.size, max_dimension))
+
+        try:
+            image.load()
+        except (OSError, SyntaxError) as exc:
+            raise ImageValidationError(f"Failed to decode image: {exc}") from exc
+    except BaseException:
+        image.close()
+        raise
+
+    # После load() файл, открытый по пути, уже закрыт самим PIL
+    ImageOps.exif_transpose(image, in_place=True)
+    return image, (width, height)
@@ -0,0 +1,133 @@
+from PIL import Image, ImageMath
+from . import config
+from .cache import LRUCache, CacheInfo
+
+# Маски строятся в уменьшенном разрешении и растягиваются BICUBIC:
+# радиальный спад гладкий, поэтому потерь качества нет.
+MASK_DOWNSCALE = 4
+
+_distance_cache = LRUCache(config.RADIAL_MASK_CACHE_SIZE)
+_mask_cache = LRUCache(config.RADIAL_MASK_CACHE_SIZE)
+
+def distance_field(mask_size: tuple) -> Image.Image:
+    """
+    Возвращает нормированное поле расстояний от центра (F-mode).
+
+    Значение пикселя — евклидово расстояние до центра, деленное на расстояние
+    до угла (0.0 в центре, 1.0 в углу). Поле считается целиком средствами PIL
+    (без циклов по пикселям) и кэшируется по размеру.
+
+    Args:
+        mask_size (tuple): Размер поля (ширина, высота).
+
+    Returns:
+        Image.Image: F-изображение с нормированными расстояниями.
+    """
+    return _distance_cache.get_or_create(tuple(mask_size), lambda: _build_distance_field(mask_size))
+
+def radial_mask(size: tuple, radius: float, strength: float, invert: bool = False) -> Image.Image:
+    """
+    Строит радиальную маску спада для полного размера изображения.
+
+    Внутри радиуса `radius` (в долях от полудиагонали) маска равна 255,
+    дальше линейно спадает до 255 * (1 - strength) к углам.
+    При invert=True маска наоборот: 0 в центре и растет до 255 * strength.
+
+    Результат кэшируется по (size, radius, strength, invert); все маски одного
+    размера используют общее поле расстояний.
+
+    Args:
+        size (tuple): Размер изображения (ширина, высота).
+        radius (float): Радиус нетронутой центральной зоны (0..1).
+        strength (float): Сила спада к краям (0..1).
+        invert (bool, optional): Инвертировать маску. Defaults to False.
+
+    Returns:
+        Image.Image: L-маска размера size. Не изменяйте ее на месте — она общая.
+    """
+    key = (tuple(size), radius, strength, invert)
+    return _mask_cache.get_or_create(key, lambda: _build_radial_mask(size, radius, strength, invert))
+
+def radial_mask_region(size: tuple, radius: float, strength: float, invert: bool = False,
+                       box: tuple = None) -> Image.Image:
+    """
+    Фрагмент радиальной маски (см. radial_mask) без построения маски полного размера.
+
+    Уменьшенная маска общая с radial_mask; растягивается только окно box,
+    поэтому память не зависит от size.
+
+    Args:
+        size (tuple): Размер полного изображения (ширина, высота).
+        radius (float): Радиус нетронутой центральной зоны (0..1).
+        strength (float): Сила спада к краям (0..1).
+        invert (bool, optional): Инвертировать маску. Defaults to False.
+        box (tuple, optional): Область (x0, y0, x1, y1) в координатах полного изображения.
+                               Defaults to весь кадр.
+
+    Returns:
+        Image.Image: L-маска размера области box.
+    """
+    w, h = size
+    if box is None:
+        box = (0, 0, w, h)
+    small = _mask_cache.get_or_create(
+        ("small", tuple(size), radius, strength, invert),
+        lambda: _build_small_mask(size, radius, strength, invert)
+    )
+    x0, y0, x1, y1 = box
+    mw, mh = small.size
+    return small.resize((x1 - x0, y1 - y0), Image.BICUBIC, box=(x0 * mw / w, y0 * mh / h, x1 * mw / w, y1 * mh / h))
+
+def cache_info() -> CacheInfo:
+    """Возвращает статистику кэша радиальных масок."""
+    return _mask_cache.info()
+
+def clear_cache() -> None:
+    """Очищает кэши полей расстояний и масок."""
+    _distance_cache.clear()
+    _mask_cache.clear()
+
+def _build_distance_field(mask_size: tuple) -> Image.Image:
+    mw, mh = mask_size
+    cx, cy = mw / 2, mh / 2
+    max_dist = (cx**2 + cy**2) ** 0.5
+
+    # Квадраты смещений по осям считаются один раз на строку/столбец (O(W + H)),
+    # а затем размножаются на всю плоскость без интерполяции.
+    dx2 = Image.new("F", (mw, 1))
+    dx2.putdata([(x - cx)**2 for x in range(mw)])
+    dx2 = dx2.resize((mw, mh), Image.NEAREST)
+
+    dy2 = Image.new("F", (1, mh))
+    dy2.putdata([(y - cy)**2 for y in range(mh)])
+    dy2 = dy2.resize((mw, mh), Image.NEAREST)
+
+    return ImageMath.lambda_eval(
+        lambda args: (args["dx2"] + args["dy2"]) ** 0.5 / max_dist,
+        dx2=dx2, dy2=dy2
+    )
+
+def _build_radial_mask(size: tuple, radius: float, strength: float, invert: bool) -> Image.Image:
+    return _build_small_mask(size, radius, strength, invert).resize(tuple(size), Image.BICUBIC)
+
+def _build_small_mask(size: tuple, radius: float, strength: float, invert: bool) -> Image.Image:
+    """Маска в уменьшенном (MASK_DOWNSCALE) разрешении."""
+    w, h = size
+    mask_size = (max(1, int(w / MASK_DOWNSCALE)), max(1, int(h / MASK_DOWNSCALE)))
+    dist = distance_field(mask_size)
+
+    scale = 255 * strength / (1 - radius)
+
+    if invert:
+        values = ImageMath.lambda_eval(
+            lambda args: args["max"](args["d"] - radius, 0.0) * scale,
+            d=dist
+        )
+    else:
+        values = ImageMath.lambda_eval(
+            lambda args: 255.0 - args["max"](args["d"] - radius, 0.0) * scale,
+            d=dist
+        )
+
+    # F -> L обрезает значения в 0..255 и отбрасывает дробную часть
+    return values.convert("L")
@@ -1,8 +1,22 @@
+import math
 from PIL import Image, ImageEnhance, ImageChops, ImageFilter, ImageOps
 from . import config
-import math
+from . import masks
+from .cache import LRUCache, CacheInfo
+
+# Размытие по Гауссу в PIL — три прохода box blur; проход с дробным радиусом r
+# задевает int(r) + 1 соседей, поэтому влияние пикселя не выходит дальше
+# BLUR_EXTENT * (int(r) + 1) пикселей (при малых r это больше, чем 3 радиуса)
+BLUR_EXTENT = 3
+# Запас внутрь резкого круга: маска строится в уменьшенном размере и при
+# апсемплинге BICUBIC может "натечь" на пару пикселей сетки маски
+_SHARP_MARGIN = 2 * masks.MASK_DOWNSCALE
+# Запас вокруг окна исходника под опору ядра ресемплинга (BICUBIC — 2px)
+_RESAMPLE_MARGIN = 3
 
-def apply_optics(image: Image.Image) -> Image.Image:
+_lens_cache = LRUCache(config.LENS_CACHE_SIZE)
+
+def apply_optics(image: Image.Image, blur_radius: float = None, settings=config) -> Image.Image:
     """
     Применяет оптические искажения, имитирующие несовершенство пластиковой линзы.
 
@@ -15,87 +29,328 @@ def apply_optics(image: Image.Image) -> Image.Image:
 
     Args:
         image (Image.Image): Исходное изображение.
+        blur_radius (float, optional): Радиус мягкого фокуса в пикселях. Если None,
+                                       берется settings.OPTICS_BLUR_STRENGTH. При рендере
+                                       в уменьшенном размере радиус масштабируется.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
 
     Returns:
         Image.Image: Изображение с примененными оптическими эффектами.
     """
-    # 1. Хроматическая аберрация
-    r, g, b = image.split()
-    
+    if blur_radius is None:
+        blur_radius = settings.OPTICS_BLUR_STRENGTH
+
+    # 1. Хроматическая аберрация (и дисторсия линзы)
     w, h = image.size
-    offset = config.ABERRATION_OFFSET
-    new_w = int(w * (1 + offset))
-    new_h = int(h * (1 + offset))
-    
-    # Увеличиваем красный канал (имитация разной длины волны)
-    r_channel = r.resize((new_w, new_h), Image.BICUBIC)
-    
-    # Обрезаем по центру до исходного размера
-    left = (new_w - w) // 2
-    top = (new_h - h) // 2
-    r_channel = r_channel.crop((left, top, left + w, top + h))
-    
-    image = Image.merge("RGB", (r_channel, g, b))
+    image = apply_lens(image, settings.ABERRATION_OFFSET, settings.LENS_DISTORTION, settings=settings)
 
     # 2. Мягкий фокус (Blur)
-    if config.OPTICS_BLUR_STRENGTH > 0:
-        blurred_image = image.filter(ImageFilter.GaussianBlur(radius=config.OPTICS_BLUR_STRENGTH))
-        
-        # Генерация маски размытия (резкий центр, размытые края)
-        # Работаем в уменьшенном разрешении для скорости
-        mask_size = (int(w/4), int(h/4))
-        blur_mask = Image.new("L", mask_size, 0)
-        
-        cx, cy = mask_size[0] / 2, mask_size[1] / 2
-        max_dist = math.sqrt(cx**2 + cy**2)
-        
-        pixel_data = []
-        sharp_radius = config.OPTICS_BLUR_SHARP_AREA
-        
-        for y in range(mask_size[1]):
-            for x in range(mask_size[0]):
-                dist = math.sqrt((x - cx)**2 + (y - cy)**2)
-                norm_dist = dist / max_dist
-                
-                if norm_dist < sharp_radius:
-                    val = 0
-                else:
-                    factor = (norm_dist - sharp_radius) / (1 - sharp_radius)
-                    val = int(255 * factor)
-                
-                pixel_data.append(val)
-        
-        blur_mask.putdata(pixel_data)
-        blur_mask = blur_mask.resize((w, h), Image.BICUBIC)
-        
-        image = Image.composite(blurred_image, image, blur_mask)
+    if blur_radius > 0:
+        image = _soft_focus(image, blur_radius, settings.OPTICS_BLUR_SHARP_AREA)
         
     # 3. Виньетирование
-    mask_size = (int(w/4), int(h/4)) 
-    vignette_mask = Image.new("L", mask_size, 255)
-    
-    cx, cy = mask_size[0] / 2, mask_size[1] / 2
-    max_dist = math.sqrt(cx**2 + cy**2)
-    
-    pixel_data = []
-    for y in range(mask_size[1]):
-        for x in range(mask_size[0]):
-            dist = math.sqrt((x - cx)**2 + (y - cy)**2)
-            norm_dist = dist / max_dist
-            
-            if norm_dist < config.VIGNETTE_RADIUS:
-                val = 255
-            else:
-                factor = (norm_dist - config.VIGNETTE_RADIUS) / (1 - config.VIGNETTE_RADIUS)
-                darkness = int(255 * (1 - (factor * config.VIGNETTE_STRENGTH)))
-                val = max(0, min(255, darkness))
-            
-            pixel_data.append(val)
-            
-    vignette_mask.putdata(pixel_data)
-    vignette_mask = vignette_mask.resize((w, h), Image.BICUBIC)
+    vignette_mask = masks.radial_mask((w, h), settings.VIGNETTE_RADIUS, settings.VIGNETTE_STRENGTH)
     
     black_layer = Image.new("RGB", (w, h), (0, 0, 0))
     image = Image.composite(image, black_layer, vignette_mask)
 
-    return image
\ No newline at end of file
+    return image
+
+def optics_source_box(size: tuple, box: tuple, blur_radius: float = None, settings=config) -> tuple:
+    """
+    Область проявленного кадра, нужная apply_optics_region для окна box.
+
+    Окно расширяется на хвост мягкого фокуса и на смещение каналов линзы
+    (с запасом на опору фильтра ресемплинга).
+
+    Args:
+        size (tuple): Размер полного кадра (ширина, высота).
+        box (tuple): Окно результата (x0, y0, x1, y1).
+        blur_radius (float, optional): Радиус мягкого фокуса. Defaults to settings.OPTICS_BLUR_STRENGTH.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        tuple: Область (x0, y0, x1, y1) в координатах кадра.
+    """
+    lens_box = _blur_box(size, box, blur_radius, settings)
+    boxes = [lens_box]
+    if settings.LENS_DISTORTION == 0:
+        if settings.ABERRATION_OFFSET != 0:
+            boxes.append(_scaled_region(size, lens_box, 1 + settings.ABERRATION_OFFSET))
+    else:
+        for scale in {1.0, 1 + settings.ABERRATION_OFFSET}:
+            model = lens_model(size, scale, settings.LENS_DISTORTION, settings.LENS_MESH_STEP)
+            quads = [quad for _, quad in _clip_mesh(model, lens_box)]
+            xs = [v for quad in quads for v in quad[0::2]]
+            ys = [v for quad in quads for v in quad[1::2]]
+            boxes.append((min(xs), min(ys), max(xs), max(ys)))
+
+    margin = _RESAMPLE_MARGIN
+    return (
+        max(0, int(math.floor(min(b[0] for b in boxes))) - margin),
+        max(0, int(math.floor(min(b[1] for b in boxes))) - margin),
+        min(size[0], int(math.ceil(max(b[2] for b in boxes))) + margin),
+        min(size[1], int(math.ceil(max(b[3] for b in boxes))) + margin),
+    )
+
+def apply_optics_region(source: Image.Image, origin: tuple, size: tuple, box: tuple, blur_radius: float = None,
+                        settings=config) -> Image.Image:
+    """
+    Фрагмент apply_optics: результат для окна box кадра size без обработки всего кадра.
+
+    Совпадает (в пределах округления ресемплинга) с тем же окном результата
+    apply_optics для всего кадра, поэтому кадр можно обрабатывать тайлами.
+
+    Args:
+        source (Image.Image): Фрагмент проявленного кадра (RGB), покрывающий optics_source_box.
+        origin (tuple): Положение source в кадре (x, y).
+        size (tuple): Размер полного кадра (ширина, высота).
+        box (tuple): Окно результата (x0, y0, x1, y1).
+        blur_radius (float, optional): Радиус мягкого фокуса. Defaults to settings.OPTICS_BLUR_STRENGTH.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: RGB-фрагмент размера окна box.
+    """
+    if blur_radius is None:
+        blur_radius = settings.OPTICS_BLUR_STRENGTH
+
+    lens_box = _blur_box(size, box, blur_radius, settings)
+    image = _lens_region(source, origin, size, lens_box, settings)
+
+    x0, y0, x1, y1 = box
+    inner = (x0 - lens_box[0], y0 - lens_box[1], x1 - lens_box[0], y1 - lens_box[1])
+    sharp = image.crop(inner)
+
+    if blur_radius > 0:
+        blur_mask = masks.radial_mask_region(size, settings.OPTICS_BLUR_SHARP_AREA, 1.0, invert=True, box=box)
+        # Внутри резкого круга маска нулевая — размывать нечего
+        if blur_mask.getextrema()[1] > 0:
+            blurred = image.filter(ImageFilter.GaussianBlur(radius=blur_radius)).crop(inner)
+            sharp = Image.composite(blurred, sharp, blur_mask)
+
+    vignette_mask = masks.radial_mask_region(size, settings.VIGNETTE_RADIUS, settings.VIGNETTE_STRENGTH, box=box)
+    return Image.composite(sharp, Image.new("RGB", sharp.size, (0, 0, 0)), vignette_mask)
+
+def apply_lens(image: Image.Image, aberration: float = None, distortion: float = None,
+               settings=config) -> Image.Image:
+    """
+    Модель линзы: поканальное радиальное масштабирование и дисторсия за одну выборку.
+
+    Красный канал увеличивается относительно центра в (1 + aberration) раз
+    (разная длина волны — разное увеличение), зеленый и синий остаются
+    в масштабе 1. Каждый канал переносится одним преобразованием прямо
+    в исходный размер, без промежуточного увеличенного буфера. Без дисторсии
+    это resize центрального окна красного канала на весь кадр (раздельный
+    BICUBIC), с дисторсией — сетка Image.MESH (BILINEAR): один проход по всему
+    RGB-кадру (из него берутся зеленый и синий) и, при аберрации, отдельный
+    проход по красному каналу.
+    Коэффициенты и сетки кэшируются по размеру.
+
+    Args:
+        image (Image.Image): RGB-изображение.
+        aberration (float, optional): Относительное увеличение красного канала.
+                                      Defaults to settings.ABERRATION_OFFSET.
+        distortion (float, optional): Коэффициент радиальной дисторсии k.
+                                      Defaults to settings.LENS_DISTORTION.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        Image.Image: Новое RGB-изображение.
+    """
+    if aberration is None:
+        aberration = settings.ABERRATION_OFFSET
+    if distortion is None:
+        distortion = settings.LENS_DISTORTION
+    step = settings.LENS_MESH_STEP
+
+    r, g, b = image.split()
+
+    if distortion == 0:
+        if aberration == 0:
+            return image.copy()
+        # Окно исходника, которое после растяжения на весь кадр дает увеличение
+        r = r.resize(image.size, Image.BICUBIC, box=lens_model(image.size, 1 + aberration, 0.0))
+        return Image.merge("RGB", (r, g, b))
+
+    # Зеленый и синий делят одну сетку — переносим их одним RGB-преобразованием.
+    # Красный в этом проходе лишний при аберрации, но отдельный проход только по G+B
+    # не дешевле: PIL хранит и RGB, и двухканальные пиксели в 4 байтах, а два
+    # прохода по L-каналам медленнее одного RGB (~1.25x на 2000x1500).
+    base = image.transform(image.size, Image.MESH, lens_model(image.size, 1.0, distortion, step), Image.BILINEAR)
+    if aberration != 0:
+        r = r.transform(image.size, Image.MESH, lens_model(image.size, 1 + aberration, distortion, step), Image.BILINEAR)
+    else:
+        r = base.getchannel("R")
+    return Image.merge("RGB", (r, base.getchannel("G"), base.getchannel("B")))
+
+def lens_model(size: tuple, scale: float, distortion: float, mesh_step: int = None):
+    """
+    Возвращает данные преобразования канала: окно исходника для resize(box=...)
+    (без дисторсии) или сетку для Image.MESH. Результат кэшируется по (size, scale, distortion).
+
+    Args:
+        size (tuple): Размер изображения (ширина, высота).
+        scale (float): Увеличение канала относительно центра.
+        distortion (float): Коэффициент радиальной дисторсии k.
+        mesh_step (int, optional): Шаг сетки, px. Defaults to config.LENS_MESH_STEP.
+
+    Returns:
+        tuple | list: Окно (x0, y0, x1, y1) или список (box, quad) для MESH.
+    """
+    if distortion == 0:
+        return _lens_cache.get_or_create((tuple(size), scale), lambda: _scale_box(size, scale))
+    if mesh_step is None:
+        mesh_step = config.LENS_MESH_STEP
+    key = (tuple(size), scale, distortion, mesh_step)
+    return _lens_cache.get_or_create(key, lambda: _distortion_mesh(size, scale, distortion, mesh_step))
+
+def lens_cache_info() -> CacheInfo:
+    """Возвращает статистику кэша моделей линзы."""
+    return _lens_cache.info()
+
+def _blur_box(size: tuple, box: tuple, blur_radius: float, settings) -> tuple:
+    """Окно box, расширенное на хвост мягкого фокуса (в пределах кадра)."""
+    if blur_radius is None:
+        blur_radius = settings.OPTICS_BLUR_STRENGTH
+    halo = _blur_halo(blur_radius) if blur_radius > 0 else 0
+    return (max(0, box[0] - halo), max(0, box[1] - halo), min(size[0], box[2] + halo), min(size[1], box[3] + halo))
+
+def _blur_halo(blur_radius: float) -> int:
+    """Сколько пикселей вокруг окна нужно, чтобы GaussianBlur окна совпал с размытием кадра."""
+    return BLUR_EXTENT * (int(blur_radius) + 1)
+
+def _scaled_region(size: tuple, box: tuple, scale: float) -> tuple:
+    """Окно исходника, из которого канал с увеличением scale попадает в окно box."""
+    bx0, by0, bx1, by1 = lens_model(size, scale, 0.0)
+    sx, sy = (bx1 - bx0) / size[0], (by1 - by0) / size[1]
+    return (bx0 + box[0] * sx, by0 + box[1] * sy, bx0 + box[2] * sx, by0 + box[3] * sy)
+
+def _lens_region(source: Image.Image, origin: tuple, size: tuple, box: tuple, settings) -> Image.Image:
+    """apply_lens для окна box кадра size по фрагменту source в позиции origin."""
+    aberration, distortion = settings.ABERRATION_OFFSET, settings.LENS_DISTORTION
+    ox, oy = origin
+    x0, y0, x1, y1 = box
+    out_size = (x1 - x0, y1 - y0)
+    local = (x0 - ox, y0 - oy, x1 - ox, y1 - oy)
+
+    if distortion == 0:
+        if aberration == 0:
+            return source.crop(local)
+        r, g, b = source.crop(local).split()
+        sx0, sy0, sx1, sy1 = _scaled_region(size, box, 1 + aberration)
+        r = source.getchannel("R").resize(out_size, Image.BICUBIC, box=(sx0 - ox, sy0 - oy, sx1 - ox, sy1 - oy))
+        return Image.merge("RGB", (r, g, b))
+
+    def mesh(scale):
+        model = lens_model(size, scale, distortion, settings.LENS_MESH_STEP)
+        return [
+            ((cx0 - x0, cy0 - y0, cx1 - x0, cy1 - y0), tuple(v - (ox, oy)[i % 2] for i, v in enumerate(quad)))
+            for (cx0, cy0, cx1, cy1), quad in _clip_mesh(model, box)
+        ]
+
+    base = source.transform(out_size, Image.MESH, mesh(1.0), Image.BILINEAR)
+    if aberration != 0:
+        r = source.getchannel("R").transform(out_size, Image.MESH, mesh(1 + aberration), Image.BILINEAR)
+    else:
+        r = base.getchannel("R")
+    return Image.merge("RGB", (r, base.getchannel("G"), base.getchannel("B")))
+
+def _clip_mesh(mesh: list, box: tuple) -> list:
+    """
+    Клетки сетки MESH, обрезанные по окну box.
+
+    Image.MESH отсчитывает четырехугольник от угла клетки, поэтому клетку нельзя
+    просто обрезать: четырехугольник пересчитывается билинейно для обрезанных углов.
+    """
+    X0, Y0, X1, Y1 = box
+    clipped = []
+    for (x0, y0, x1, y1), quad in mesh:
+        cx0, cy0, cx1, cy1 = max(x0, X0), max(y0, Y0), min(x1, X1), min(y1, Y1)
+        if cx0 >= cx1 or cy0 >= cy1:
+            continue
+
+        def at(x, y):
+            u, v = (x - x0) / (x1 - x0), (y - y0) / (y1 - y0)
+            # Углы четырехугольника: NW, SW, SE, NE
+            return tuple(
+                quad[i] * (1 - u) * (1 - v) + quad[2 + i] * (1 - u) * v
+                + quad[4 + i] * u * v + quad[6 + i] * u * (1 - v)
+                for i in range(2)
+            )
+
+        clipped.append(((cx0, cy0, cx1, cy1), at(cx0, cy0) + at(cx0, cy1) + at(cx1, cy1) + at(cx1, cy0)))
+    return clipped
+
+def _scale_box(size: tuple, scale: float) -> tuple:
+    """Окно исходника (в float-координатах), соответствующее увеличению scale от центра."""
+    cx, cy = size[0] / 2, size[1] / 2
+    return (cx - cx / scale, cy - cy / scale, cx + cx / scale, cy + cy / scale)
+
+def _distortion_mesh(size: tuple, scale: float, distortion: float, step: int) -> list:
+    """Сетка четырехугольников: выходная клетка -> четырехугольник в исходнике."""
+    w, h = size
+    cx, cy = w / 2, h / 2
+    half_diag = math.hypot(cx, cy)
+    # При "подушке" нормируем, чтобы углы кадра не выходили за исходник
+    norm = scale * max(1.0, 1 + distortion)
+
+    def source(x, y):
+        dx, dy = x - cx, y - cy
+        r2 = (dx * dx + dy * dy) / (half_diag * half_diag)
+        factor = (1 + distortion * r2) / norm
+        return (cx + dx * factor, cy + dy * factor)
+
+    xs = list(range(0, w, step)) + [w]
+    ys = list(range(0, h, step)) + [h]
+    mesh = []
+    for y0, y1 in zip(ys, ys[1:]):
+        for x0, x1 in zip(xs, xs[1:]):
+            quad = source(x0, y0) + source(x0, y1) + source(x1, y1) + source(x1, y0)
+            mesh.append(((x0, y0, x1, y1), quad))
+    return mesh
+
+def _soft_focus(image: Image.Image, blur_radius: float, sharp_area: float = None) -> Image.Image:
+    """
+    Размывает только периферию: внутри круга sharp_area (по умолчанию
+    config.OPTICS_BLUR_SHARP_AREA) маска равна нулю.
+
+    Центральный прямоугольник, вписанный в резкий круг (с запасом на
+    сглаживание маски при апсемплинге), пропускается целиком. Остальное
+    обрабатывается четырьмя полосами: каждая размывается с запасом на полную
+    опору размытия (см. _blur_halo), поэтому результат побитово совпадает
+    с размытием всего кадра при любом, в том числе дробном, радиусе.
+    """
+    if sharp_area is None:
+        sharp_area = config.OPTICS_BLUR_SHARP_AREA
+
+    w, h = image.size
+    blur_mask = masks.radial_mask((w, h), sharp_area, 1.0, invert=True)
+
+    # Вписанный в круг квадрат: полусторона R / sqrt(2)
+    radius_px = sharp_area * math.hypot(w / 2, h / 2)
+    inset = int(radius_px / math.sqrt(2)) - _SHARP_MARGIN
+    if inset <= 0:
+        return Image.composite(image.filter(ImageFilter.GaussianBlur(radius=blur_radius)), image, blur_mask)
+
+    ix0, iy0 = max(0, w // 2 - inset), max(0, h // 2 - inset)
+    ix1, iy1 = min(w, w // 2 + inset), min(h, h // 2 + inset)
+    strips = [
+        (0, 0, w, iy0),
+        (0, iy1, w, h),
+        (0, iy0, ix0, iy1),
+        (ix1, iy0, w, iy1),
+    ]
+
+    halo = _blur_halo(blur_radius)
+    result = image.copy()
+    for x0, y0, x1, y1 in strips:
+        if x1 <= x0 or y1 <= y0:
+            continue
+        region = (max(0, x0 - halo), max(0, y0 - halo), min(w, x1 + halo), min(h, y1 + halo))
+        blurred = image.crop(region).filter(ImageFilter.GaussianBlur(radius=blur_radius))
+        blurred = blurred.crop((x0 - region[0], y0 - region[1], x1 - region[0], y1 - region[1]))
+
+        box = (x0, y0, x1, y1)
+        result.paste(Image.composite(blurred, image.crop(box), blur_mask.crop(box)), box)
+    return result
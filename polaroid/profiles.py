@@ -0,0 +1,174 @@
+import dataclasses
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple, Union
+from . import config
+from . import chemistry
+from . import chassis
+from . import filters
+from .exceptions import InvalidProfileError
+
+# Все параметры config (ВЕРХНИЙ_РЕГИСТР) становятся полями неизменяемого снимка
+SETTING_NAMES = tuple(name for name in vars(config) if name.isupper())
+
+Settings = dataclasses.make_dataclass("Settings", SETTING_NAMES, frozen=True)
+# Нужен для pickle (передача профиля в процессы пакетной обработки)
+Settings.__module__ = __name__
+Settings.__doc__ = """
+Неизменяемый снимок параметров config.
+
+Поля повторяют имена из polaroid.config, поэтому снимок можно передать
+в любую функцию пайплайна вместо модуля config (параметр settings).
+"""
+
+DEFAULT_PROFILE = "classic"
+
+@dataclass(frozen=True)
+class CompiledProfile:
+    """
+    Профиль обработки, скомпилированный один раз при регистрации.
+
+    Attributes:
+        name (str): Имя профиля.
+        settings (Settings): Неизменяемый снимок параметров.
+        chemistry_lut (tuple): Готовые кривые проявки (R + G + B) для Image.point.
+        chassis_colors (tuple): Цвета рамки: (бумага, верх хваталки, низ хваталки).
+    """
+    name: str
+    settings: Settings
+    chemistry_lut: tuple
+    chassis_colors: Tuple[tuple, tuple, tuple]
+
+_registry: Dict[str, CompiledProfile] = {}
+_registry_lock = threading.Lock()
+
+def snapshot(**overrides) -> Settings:
+    """
+    Снимает текущие значения config в неизменяемый Settings.
+
+    Args:
+        **overrides: Значения, заменяющие параметры config (например, GRAIN_INTENSITY=0.2).
+
+    Returns:
+        Settings: Снимок параметров.
+
+    Raises:
+        InvalidProfileError: Если передан неизвестный параметр.
+    """
+    values = {name: _freeze(getattr(config, name)) for name in SETTING_NAMES}
+    return _with_overrides(Settings(**values), overrides)
+
+def compile_profile(name: str, settings: Settings) -> CompiledProfile:
+    """
+    Компилирует профиль: заранее считает все, что не зависит от размера снимка.
+
+    Радиальные маски, кольца и шаблоны рамок зависят от размера, поэтому
+    они кэшируются при первом рендере по ключу, включающему значения снимка.
+
+    Args:
+        name (str): Имя профиля.
+        settings (Settings): Снимок параметров.
+
+    Returns:
+        CompiledProfile: Скомпилированный профиль.
+    """
+    filters.noise_lut(settings.GRAIN_CUTOFF)
+    return CompiledProfile(
+        name=name,
+        settings=settings,
+        chemistry_lut=tuple(chemistry.build_lut(settings)),
+        chassis_colors=chassis.chassis_colors(settings),
+    )
+
+def register_profile(name: str, base: str = None, **overrides) -> CompiledProfile:
+    """
+    Регистрирует (или заменяет) профиль обработки.
+
+    Пример:
+        register_profile("warm", GRAIN_INTENSITY=0.15, FRINGE_STRENGTH=0)
+        process_image(image, profile="warm")
+
+    Args:
+        name (str): Имя профиля.
+        base (str, optional): Профиль, от которого наследуются параметры.
+                              Если None — текущие значения config.
+        **overrides: Параметры (имена из config), отличающиеся от базы.
+
+    Returns:
+        CompiledProfile: Скомпилированный профиль.
+
+    Raises:
+        InvalidProfileError: Если базовый профиль не найден или передан неизвестный параметр.
+    """
+    if base is None:
+        settings = snapshot(**overrides)
+    else:
+        settings = _with_overrides(get_profile(base).settings, overrides)
+
+    compiled = compile_profile(name, settings)
+    with _registry_lock:
+        _registry[name] = compiled
+    return compiled
+
+def get_profile(profile: Union[str, CompiledProfile]) -> CompiledProfile:
+    """
+    Возвращает скомпилированный профиль по имени.
+
+    Встроенный профиль "classic" компилируется из config при первом обращении.
+
+    Args:
+        profile (str | CompiledProfile): Имя профиля или уже скомпилированный профиль.
+
+    Returns:
+        CompiledProfile: Скомпилированный профиль.
+
+    Raises:
+        InvalidProfileError: Если профиль с таким именем не зарегистрирован.
+    """
+    if isinstance(profile, CompiledProfile):
+        return profile
+
+    compiled = _registry.get(profile)
+    if compiled is not None:
+        return compiled
+
+    if profile == DEFAULT_PROFILE:
+        with _registry_lock:
+            if profile not in _registry:
+                _registry[profile] = compile_profile(profile, snapshot())
+            return _registry[profile]
+
+    raise InvalidProfileError(
+        f"Unknown profile {profile!r}. Available: {', '.join(list_profiles())}."
+    )
+
+def unregister_profile(name: str) -> None:
+    """
+    Удаляет профиль из реестра (неизвестное имя игнорируется).
+
+    Встроенный "classic" после удаления снова компилируется из config при первом обращении.
+
+    Args:
+        name (str): Имя профиля.
+    """
+    with _registry_lock:
+        _registry.pop(name, None)
+
+def list_profiles() -> List[str]:
+    """Возвращает имена доступных профилей."""
+    with _registry_lock:
+        names = set(_registry)
+    names.add(DEFAULT_PROFILE)
+    return sorted(names)
+
+def _with_overrides(settings: Settings, overrides: dict) -> Settings:
+    unknown = sorted(set(overrides) - set(SETTING_NAMES))
+    if unknown:
+        raise InvalidProfileError(f"Unknown settings: {', '.join(unknown)}.")
+    return dataclasses.replace(settings, **{k: _freeze(v) for k, v in overrides.items()})
+
+def _freeze(value):
+    """Списки превращаются в кортежи, чтобы снимок был хешируемым."""
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
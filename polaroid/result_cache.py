@@ -0,0 +1,370 @@
+import hashlib
+import io
+import json
+import os
+import threading
+from typing import BinaryIO, NamedTuple, Optional, Union
+from PIL import Image, PngImagePlugin
+from . import config
+from . import geometry
+from . import profiles
+from .core import SideOutputs, process_image, process_path
+from .data import PolaroidResult
+
+# Версия формата записей: меняется, когда старые записи становятся несовместимыми
+_FORMAT_VERSION = 2
+_ENTRY_SUFFIX = ".png"
+# Текстовый блок PNG с метаданными записи (JSON)
+_METADATA_KEY = "polaroid"
+# Записи пишутся быстро, а не компактно: кэш — ускорение, а не архив
+_COMPRESS_LEVEL = 1
+
+# Параметры, не влияющие на пиксели результата: в ключ не входят
+_NON_KEY_PARAMS = ("tracer", "memory_report", "lean")
+
+
+class ResultCacheInfo(NamedTuple):
+    """
+    Статистика дискового кэша результатов.
+
+    Attributes:
+        hits (int): Количество попаданий.
+        misses (int): Количество промахов (полных рендеров с записью в кэш).
+        bypassed (int): Вызовов мимо кэша (без seed или с debug).
+        evictions (int): Количество вытесненных записей.
+        max_bytes (int): Максимальный суммарный размер записей, байт.
+        currsize (int): Текущий суммарный размер записей, байт.
+    """
+    hits: int
+    misses: int
+    bypassed: int
+    evictions: int
+    max_bytes: int
+    currsize: int
+
+
+class ResultCache:
+    """
+    Дисковый кэш результатов, адресуемый содержимым.
+
+    Ключ — хэш пикселей изображения (или байтов файла для process_path),
+    параметров профиля, seed и остальных параметров вызова. Повторный запрос
+    с теми же данными читается с диска вместо полного рендера.
+
+    Запись — PNG снимка с JSON-метаданными (геометрия, поворот, seed, профиль)
+    в текстовом блоке: чтение не исполняет код, даже если папку кэша делят
+    с недоверенными процессами. В ключ входит версия библиотеки, поэтому
+    записи старого кода не читаются новым.
+
+    Записи пишутся атомарно (через временный файл), поэтому кэш можно делить
+    между потоками и процессами. При превышении max_bytes вытесняются записи,
+    которые дольше всего не читались (время доступа хранится в mtime файла).
+    Маска и карта нормалей в записи не хранятся: они строятся лениво по
+    геометрии (см. PolaroidResult).
+
+    Вызовы без seed (результат случаен) и с debug идут мимо кэша.
+
+    Пример:
+        cache = ResultCache("/var/cache/polaroid", max_bytes=2 * 1024**3)
+        result = cache.process_image(image, profile="classic", seed=42)
+        cache.info().hits
+    """
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        """
+        Args:
+            directory (str, optional): Папка кэша. Defaults to config.RESULT_CACHE_DIR.
+            max_bytes (int, optional): Максимальный размер кэша, байт. Defaults to config.RESULT_CACHE_MAX_BYTES.
+        """
+        self.directory = directory if directory is not None else config.RESULT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.RESULT_CACHE_MAX_BYTES
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._size = None
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+
+    def process_image(self, image: Image.Image, profile: Union[str, profiles.CompiledProfile] = "classic",
+                      **kwargs) -> PolaroidResult:
+        """
+        process_image с кэшированием результата.
+
+        Args:
+            image (Image.Image): Исходное изображение.
+            profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+            **kwargs: Параметры process_image (seed, target_size, quality и др.).
+
+        Returns:
+            PolaroidResult: Результат из кэша (style_info["cached"] = True) или новый рендер.
+
+        Raises:
+            ImageValidationError: Если изображение не проходит валидацию.
+            InvalidProfileError: Если профиль не зарегистрирован.
+        """
+        compiled = profiles.get_profile(profile)
+        if not self._cacheable(kwargs):
+            return process_image(image, profile=compiled, **kwargs)
+
+        content = hashlib.blake2b(digest_size=20)
+        content.update(f"pixels:{image.mode}:{image.size}".encode("utf-8"))
+        content.update(image.tobytes())
+        key = self.key(content.hexdigest(), compiled, kwargs)
+        return self._get_or_render(key, compiled, lambda: process_image(image, profile=compiled, **kwargs))
+
+    def process_path(self, fp: Union[str, BinaryIO], profile: Union[str, profiles.CompiledProfile] = "classic",
+                     **kwargs) -> PolaroidResult:
+        """
+        process_path с кэшированием результата; ключ считается по байтам файла.
+
+        При попадании файл не декодируется.
+
+        Args:
+            fp (str | BinaryIO): Путь к файлу или открытый бинарный файл.
+            profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+            **kwargs: Параметры process_path (seed, target_size и др.).
+
+        Returns:
+            PolaroidResult: Результат из кэша (style_info["cached"] = True) или новый рендер.
+
+        Raises:
+            ImageValidationError: Если файл не является изображением или не проходит валидацию.
+            InvalidProfileError: Если профиль не зарегистрирован.
+        """
+        compiled = profiles.get_profile(profile)
+        if not self._cacheable(kwargs):
+            return process_path(fp, profile=compiled, **kwargs)
+
+        if isinstance(fp, (str, os.PathLike)):
+            with open(fp, "rb") as f:
+                data = f.read()
+        else:
+            data = fp.read()
+
+        content = hashlib.blake2b(b"file:", digest_size=20)
+        content.update(data)
+        key = self.key(content.hexdigest(), compiled, kwargs)
+        return self._get_or_render(key, compiled, lambda: process_path(io.BytesIO(data), profile=compiled, **kwargs))
+
+    @staticmethod
+    def key(content_hash: str, profile: profiles.CompiledProfile, kwargs: dict) -> str:
+        """
+        Ключ записи: хэш содержимого, профиля, параметров вызова и версии библиотеки.
+
+        Args:
+            content_hash (str): Хэш входных пикселей или байтов файла.
+            profile (CompiledProfile): Скомпилированный профиль.
+            kwargs (dict): Параметры вызова (без profile).
+
+        Returns:
+            str: Шестнадцатеричный ключ.
+        """
+        from . import __version__
+
+        params = sorted((name, value) for name, value in kwargs.items() if name not in _NON_KEY_PARAMS)
+        digest = hashlib.blake2b(digest_size=20)
+        for part in (_FORMAT_VERSION, __version__, content_hash, profile.name, profile.settings,
+                     profile.chemistry_lut, profile.chassis_colors, params):
+            digest.update(repr(part).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def info(self) -> ResultCacheInfo:
+        """Возвращает текущую статистику кэша."""
+        size = self._current_size()
+        with self._lock:
+            return ResultCacheInfo(self._hits, self._misses, self._bypassed, self._evictions, self.max_bytes, size)
+
+    def clear(self) -> None:
+        """Удаляет все записи и сбрасывает статистику."""
+        with self._lock:
+            for path, _, _ in self._scan():
+                _remove(path)
+            self._size = 0
+            self._hits = 0
+            self._misses = 0
+            self._bypassed = 0
+            self._evictions = 0
+
+    def _cacheable(self, kwargs: dict) -> bool:
+        if kwargs.get("seed") is None or kwargs.get("debug"):
+            with self._lock:
+                self._bypassed += 1
+            return False
+        return True
+
+    def _get_or_render(self, key: str, profile: profiles.CompiledProfile, render) -> PolaroidResult:
+        path = self._path(key)
+        result = self._load(path, profile)
+        if result is not None:
+            with self._lock:
+                self._hits += 1
+            result.style_info["cached"] = True
+            return result
+
+        with self._lock:
+            self._misses += 1
+        result = render()
+        self._store(path, result)
+        return result
+
+    def _path(self, key: str) -> str:
+        # Записи раскладываются по подпапкам, чтобы не держать тысячи файлов в одной
+        return os.path.join(self.directory, key[:2], key + _ENTRY_SUFFIX)
+
+    def _load(self, path: str, profile: profiles.CompiledProfile) -> Optional[PolaroidResult]:
+        try:
+            with Image.open(path, formats=["PNG"]) as entry:
+                entry.load()
+                metadata = json.loads(entry.text[_METADATA_KEY])
+                result = _from_entry(entry.copy(), metadata, profile)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Поврежденная или несовместимая запись считается промахом и перезаписывается
+            self._discard(path)
+            return None
+
+        # Время доступа для LRU-вытеснения
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return result
+
+    def _store(self, path: str, result: PolaroidResult) -> None:
+        data = _to_entry(result)
+        if data is None or len(data) > self.max_bytes:
+            return
+
+        # Размер считаем до записи: иначе первый обход папки уже увидит новую запись
+        self._current_size()
+        try:
+            old_size = os.stat(path).st_size
+        except OSError:
+            old_size = 0
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Кэш — лишь ускорение: ошибка записи не должна ронять рендер
+            return
+        finally:
+            _remove(tmp_path)
+
+        with self._lock:
+            # Перезапись ключа заменяет старую запись, а не добавляется к ней
+            self._size += len(data) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _discard(self, path: str) -> None:
+        """Удаляет запись и вычитает ее размер из учтенного."""
+        try:
+            size = os.stat(path).st_size
+        except OSError:
+            return
+        _remove(path)
+        with self._lock:
+            if self._size is not None:
+                self._size = max(0, self._size - size)
+
+    def _current_size(self) -> int:
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._scan())
+            return self._size
+
+    def _evict(self) -> None:
+        """Удаляет давно не читавшиеся записи, пока кэш не уложится в max_bytes (под блокировкой)."""
+        # Пересчитываем по диску: кэш могут наполнять и другие процессы
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(path)
+            total -= size
+            self._evictions += 1
+        self._size = total
+
+    def _scan(self) -> list:
+        """Записи кэша как (путь, размер, mtime)."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(_ENTRY_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+
+def _to_entry(result: PolaroidResult) -> Optional[bytes]:
+    """PNG снимка с метаданными в текстовом блоке; None, если результат не сериализуется."""
+    side_outputs = result.side_outputs
+    if side_outputs is None:
+        return None
+    # Замеры описывают исходный рендер, а не чтение из кэша
+    style_info = {k: v for k, v in result.style_info.items() if k not in ("timings", "memory", "cached")}
+    metadata = {
+        "format": _FORMAT_VERSION,
+        "photo_rect": list(result.photo_rect),
+        "border_rect": list(result.border_rect),
+        "rotation_resample": int(side_outputs.rotation_resample),
+        "generate_normal": bool(side_outputs.generate_normal),
+        "style_info": style_info,
+    }
+    try:
+        text = json.dumps(metadata)
+    except (TypeError, ValueError):
+        return None
+
+    info = PngImagePlugin.PngInfo()
+    info.add_text(_METADATA_KEY, text, zip=True)
+    buffer = io.BytesIO()
+    result.image.save(buffer, format="PNG", pnginfo=info, compress_level=_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+def _from_entry(image: Image.Image, metadata: dict, profile: profiles.CompiledProfile) -> PolaroidResult:
+    """Восстанавливает результат; маска и нормали строятся лениво по геометрии из метаданных."""
+    if metadata["format"] != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported cache entry format {metadata['format']!r}.")
+    photo_rect = tuple(metadata["photo_rect"])
+    border_rect = tuple(metadata["border_rect"])
+    style_info = metadata["style_info"]
+    style_info["source_size"] = tuple(style_info["source_size"])
+
+    # Ключ записи включает параметры профиля, поэтому профиль вызова совпадает с профилем рендера
+    side_outputs = SideOutputs(
+        settings=profile.settings,
+        layout=geometry.Layout(total_size=border_rect[2:], photo_pos=photo_rect[:2]),
+        photo_size=photo_rect[2:],
+        rotation_angle=style_info["rotation"],
+        rotation_resample=metadata["rotation_resample"],
+        seed=style_info["seed"],
+        generate_normal=metadata["generate_normal"],
+    )
+    return PolaroidResult(
+        image=image,
+        photo_mask=None,
+        photo_rect=photo_rect,
+        border_rect=border_rect,
+        style_info=style_info,
+        side_outputs=side_outputs
+    )
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,321 @@
+import os
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Callable, Iterable, Iterator, Union
+from PIL import Image
+from . import validation
+from . import geometry
+from . import config
+from . import filters
+from . import chemistry
+from . import optics
+from . import chassis
+from . import edges
+from . import profiles
+from .cache import LRUCache
+from .core import SideOutputs, _new_seed, _photo_size_for_target, _pixels, _rotate_block, _stage_seed
+from .data import PolaroidResult
+from .trace import Span, StageTimer
+
+# Формат анимации -> формат PIL
+ANIMATION_FORMATS = {"webp": "WEBP", "gif": "GIF", "png": "PNG", "apng": "PNG"}
+
+def process_sequence(frames: Iterable[Image.Image], profile: Union[str, profiles.CompiledProfile] = "classic",
+                     seed: int = None, fixed_rotation: bool = True, grain_period: int = None,
+                     target_size: int = None, workers: int = None, generate_normal: bool = True,
+                     tracer: Callable[[Span], None] = None) -> Iterator[PolaroidResult]:
+    """
+    Обрабатывает последовательность кадров (GIF, короткий клип) в снимки Polaroid.
+
+    Все, что зависит только от размера (раскладка, маска фото, кайма и тень,
+    маски оптики, рамка), считается один раз на всю последовательность; для
+    каждого кадра выполняются только проявка, оптика, зерно и сборка.
+    Кадры обрабатываются потоком: одновременно в работе не больше 2 * workers
+    кадров, поэтому память не зависит от длины клипа.
+
+    Зерно меняется во времени плавно: каждые grain_period кадров берется новый
+    ключевой рисунок, а между ключами поля шума перетекают друг в друга.
+    Одиночный кадр совпадает с process_image того же seed (и с банком тайлов зерна).
+
+    Args:
+        frames (Iterable[Image.Image]): Кадры одного размера (например, ImageSequence.Iterator(gif)).
+        profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+        seed (int, optional): Сид последовательности (поворот и зерно). Без seed выбирается случайно
+                              и возвращается в style_info["seed"].
+        fixed_rotation (bool, optional): Один угол поворота на все кадры. False — свой угол у каждого
+                                         кадра (эффект дрожания). Defaults to True.
+        grain_period (int, optional): Кадров между ключевыми рисунками зерна.
+                                      Defaults to SEQUENCE_GRAIN_PERIOD профиля.
+        target_size (int, optional): Максимальная сторона снимка (см. process_image).
+        workers (int, optional): Число потоков. Defaults to SEQUENCE_WORKERS профиля (по числу ядер).
+        generate_normal (bool, optional): Доступна ли карта нормалей (строится лениво). Defaults to True.
+        tracer (Callable[[Span], None], optional): Трассировщик этапов (см. process_image).
+
+    Yields:
+        PolaroidResult: Результат для каждого кадра, по порядку (style_info["frame"] — номер кадра).
+
+    Raises:
+        ImageValidationError: Если кадры не проходят валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
+        ValueError: Если кадры разного размера.
+    """
+    frames = iter(frames)
+    first = next(frames, None)
+    if first is None:
+        return
+
+    if seed is None:
+        seed = _new_seed()
+    compiled = profiles.get_profile(profile)
+    if workers is None:
+        workers = compiled.settings.SEQUENCE_WORKERS or os.cpu_count() or 1
+    job = _SequenceJob(first.size, compiled, seed, fixed_rotation, grain_period,
+                       target_size, generate_normal, tracer, workers)
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="polaroid-frame") as pool:
+        for index, frame in enumerate(_chain(first, frames)):
+            # Кадры итераторов вроде ImageSequence — один и тот же объект, который
+            # перематывается дальше; в поток передается независимая копия
+            pending.append(pool.submit(job.render, index, frame.convert("RGB")))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def save_animation(frames: Iterable[Union[PolaroidResult, Image.Image]], fp: Union[str, BinaryIO],
+                   format: str = None, duration: Union[int, list] = None, loop: int = 0,
+                   quality: int = None, lossless: bool = False) -> None:
+    """
+    Сохраняет кадры (например, из process_sequence) в анимированный WebP, GIF или APNG.
+
+    Кадры читаются потоком, но кодировщики Pillow собирают файл целиком в конце:
+    WebP и APNG держат в памяти все кадры, GIF — кадры после квантования
+    (байт на пиксель). Для длинных клипов обрабатывайте кадры process_sequence
+    по одному.
+
+    Args:
+        frames (Iterable[PolaroidResult | Image.Image]): Кадры анимации.
+        fp (str | BinaryIO): Путь или открытый бинарный файл.
+        format (str, optional): "webp", "gif" или "png"/"apng". По умолчанию — по расширению пути.
+        duration (int | list, optional): Длительность кадра (или список длительностей), мс.
+                                         Defaults to config.SEQUENCE_FRAME_DURATION.
+        loop (int, optional): Число повторов (0 — бесконечно). Defaults to 0.
+        quality (int, optional): Качество WebP (0-100). Defaults to config.ENCODE_QUALITY.
+        lossless (bool, optional): WebP без потерь. Defaults to False.
+
+    Raises:
+        ValueError: Если формат не поддерживается или кадров нет.
+    """
+    if format is None:
+        if not isinstance(fp, (str, os.PathLike)):
+            raise ValueError("format is required when saving to a file object.")
+        format = os.path.splitext(os.fspath(fp))[1].lstrip(".")
+    fmt = format.lower()
+    if fmt not in ANIMATION_FORMATS:
+        raise ValueError(f"Unsupported animation format {format!r}, expected one of {tuple(ANIMATION_FORMATS)}.")
+
+    images = (frame.image if isinstance(frame, PolaroidResult) else frame for frame in frames)
+    first = next(images, None)
+    if first is None:
+        raise ValueError("No frames to save.")
+
+    params = {
+        "save_all": True,
+        "append_images": images,
+        "duration": config.SEQUENCE_FRAME_DURATION if duration is None else duration,
+        "loop": loop,
+    }
+    if fmt == "webp":
+        params["quality"] = config.ENCODE_QUALITY if quality is None else quality
+        params["lossless"] = lossless
+    elif fmt == "gif":
+        params["disposal"] = 2
+    else:
+        # APNG обходит кадры дважды (размер холста, затем запись)
+        params["append_images"] = list(images)
+        params["default_image"] = False
+    first.save(fp, format=ANIMATION_FORMATS[fmt], **params)
+
+class _SequenceJob:
+    """
+    Общее состояние обработки последовательности: все, что не зависит от содержимого кадра.
+    """
+    def __init__(self, frame_size: tuple, profile: profiles.CompiledProfile, seed: int, fixed_rotation: bool,
+                 grain_period: int, target_size: int, generate_normal: bool, tracer: Callable[[Span], None],
+                 workers: int = 1):
+        settings = profile.settings
+        self.profile = profile
+        self.settings = settings
+        self.seed = seed
+        self.fixed_rotation = fixed_rotation
+        self.generate_normal = generate_normal
+        self.tracer = tracer
+        self.frame_size = tuple(frame_size)
+        self.grain_period = max(1, grain_period or settings.SEQUENCE_GRAIN_PERIOD)
+
+        validation.validate_image_dimensions(*frame_size, settings=settings)
+
+        full_size = geometry.fit_size(frame_size, settings.MAX_PHOTO_DIMENSION)
+        self.full_size = full_size
+        self.photo_size = full_size
+        if target_size is not None:
+            self.photo_size = _photo_size_for_target(full_size, target_size, settings)
+        self.render_scale = self.photo_size[0] / full_size[0]
+
+        photo_w, photo_h = self.photo_size
+        self.layout = geometry.calculate_layout(photo_w, photo_h, settings)
+
+        # Маска фото и полосы каймы и тени — как в core._build_photo_block
+        bleed_px = int(max(photo_w, photo_h) * settings.PHOTO_EDGE_BLEED)
+        self.photo_mask = chassis.create_photo_mask(self.photo_size, photo_w, bleed=bleed_px, settings=settings)
+        self.strips = []
+        if settings.FRINGE_STRENGTH > 0:
+            self.strips.extend(edges.ring_strips(
+                self.photo_size, photo_w, settings.FRINGE_DEPTH, settings.FRINGE_BLUR,
+                settings.FRINGE_COLOR, settings.FRINGE_STRENGTH, bleed=bleed_px, settings=settings
+            ))
+        self.shadow_strips = edges.ring_strips(
+            self.photo_size, photo_w, settings.SHADOW_DEPTH, settings.SHADOW_BLUR,
+            (0, 0, 0), settings.SHADOW_STRENGTH, bleed=bleed_px, settings=settings
+        )
+
+        # Ключевые поля шума нужны только кадрам в работе (до 2 * workers подряд)
+        # и следующему ключу для перехода
+        self._noise = LRUCache(maxsize=-(-2 * workers // self.grain_period) + 2)
+
+        self.rotation_angle = self._rotation(0)
+        self.chassis_layer = None
+        if fixed_rotation:
+            self.chassis_layer = self._chassis(self.rotation_angle)
+
+    def render(self, index: int, frame: Image.Image) -> PolaroidResult:
+        """Обрабатывает один кадр последовательности."""
+        if frame.size != self.frame_size:
+            raise ValueError(f"Frame {index} has size {frame.size}, expected {self.frame_size}.")
+
+        settings = self.settings
+        timer = StageTimer(self.tracer)
+        photo_w, photo_h = self.photo_size
+
+        if self.photo_size != frame.size:
+            with timer.stage("resize") as span:
+                frame = frame.resize(self.photo_size, Image.LANCZOS, reducing_gap=2.0)
+                span.pixels = _pixels(frame)
+
+        with timer.stage("chemistry") as span:
+            photo = chemistry.develop_image(frame, lut=self.profile.chemistry_lut)
+            span.pixels = _pixels(photo)
+
+        with timer.stage("optics") as span:
+            photo = optics.apply_optics(photo, blur_radius=settings.OPTICS_BLUR_STRENGTH * self.render_scale,
+                                        settings=settings)
+            span.pixels = _pixels(photo)
+
+        with timer.stage("grain") as span:
+            photo = self._apply_grain(photo, index)
+            span.pixels = _pixels(photo)
+
+        with timer.stage("shadow") as span:
+            photo_block = photo.convert("RGBA")
+            photo_block.putalpha(self.photo_mask)
+            edges.apply_ring(photo_block, self.strips)
+            edges.apply_ring(photo_block, self.shadow_strips)
+            span.pixels = _pixels(photo_block)
+        del photo
+
+        rotation_angle = self.rotation_angle
+        chassis_layer = self.chassis_layer
+        if not self.fixed_rotation:
+            rotation_angle = self._rotation(index)
+            chassis_layer = self._chassis(rotation_angle)
+
+        with timer.stage("rotation") as span:
+            photo_block = _rotate_block(photo_block, rotation_angle)
+            span.pixels = _pixels(photo_block)
+
+        with timer.stage("compositing") as span:
+            final_composite = Image.new("RGBA", self.layout.total_size, (0, 0, 0, 0))
+            final_composite.paste(photo_block, self.layout.photo_pos, photo_block)
+            final_composite.alpha_composite(chassis_layer)
+            span.pixels = _pixels(final_composite)
+
+        side_outputs = SideOutputs(
+            settings=settings, layout=self.layout, photo_size=self.photo_size, rotation_angle=rotation_angle,
+            rotation_resample=Image.BICUBIC, seed=self.seed, generate_normal=self.generate_normal,
+            tracer=self.tracer
+        )
+        style_info = {
+            "profile": self.profile.name, "overrides": {}, "rotation": rotation_angle,
+            "quality": "final", "render_scale": self.render_scale, "source_size": self.frame_size,
+            "seed": self.seed, "frame": index,
+        }
+        if timer.tracer is not None:
+            style_info["timings"] = timer.breakdown()
+
+        return PolaroidResult(
+            image=final_composite,
+            photo_mask=None,
+            photo_rect=(self.layout.photo_pos[0], self.layout.photo_pos[1], photo_w, photo_h),
+            border_rect=(0, 0, self.layout.total_size[0], self.layout.total_size[1]),
+            style_info=style_info,
+            side_outputs=side_outputs
+        )
+
+    def _apply_grain(self, photo: Image.Image, index: int) -> Image.Image:
+        """
+        Зерно кадра: переход между ключевыми полями шума соседних ключей.
+
+        С банком тайлов (GRAIN_TILE_BANK) ключ — слой зерна из тайлов, как в process_image;
+        переход между слоями идет по их яркости (тайлы серые).
+        """
+        settings = self.settings
+        if settings.GRAIN_INTENSITY <= 0:
+            return photo
+
+        key, step = divmod(index, self.grain_period)
+        t = step / self.grain_period
+        if settings.GRAIN_TILE_BANK:
+            grain = self._key_grain(key)
+            if step:
+                noise = filters.crossfade_noise(grain.convert("L"), self._key_grain(key + 1).convert("L"), t,
+                                                settings.GRAIN_CUTOFF)
+                grain = noise.convert("RGB")
+        else:
+            noise = self._key_grain(key)
+            if step:
+                noise = filters.crossfade_noise(noise, self._key_grain(key + 1), t, settings.GRAIN_CUTOFF)
+            w, h = photo.size
+            grain = filters.grain_region((w, h), (0, 0, w, h), noise)
+        return Image.blend(photo, grain, alpha=settings.GRAIN_INTENSITY)
+
+    def _key_grain(self, key: int) -> Image.Image:
+        """Ключевое поле шума (или слой из банка тайлов) ключа key."""
+        # Сид ключа — хэш (seed, "grain", key): соседние сиды последовательности не дают
+        # сдвинутых рисунков; нулевой ключ совпадает с зерном process_image
+        seed = _stage_seed(self.seed, "grain", key)
+        if self.settings.GRAIN_TILE_BANK:
+            return self._noise.get_or_create(
+                key, lambda: filters.grain_tile_layer(self.full_size, self.photo_size, seed=seed,
+                                                      settings=self.settings)
+            )
+        return self._noise.get_or_create(
+            key, lambda: filters.grain_noise(self.full_size, seed=seed, settings=self.settings)
+        )
+
+    def _rotation(self, index: int) -> float:
+        # Нулевой кадр совпадает с поворотом process_image того же seed
+        limit = self.settings.PHOTO_ROTATION_LIMIT
+        return random.Random(_stage_seed(self.seed, "rotation", index)).uniform(-limit, limit)
+
+    def _chassis(self, rotation_angle: float) -> Image.Image:
+        # Шаблон только читается при сборке, поэтому копия не нужна
+        return chassis.create_chassis(
+            self.layout, self.photo_size[0], self.photo_size, rotation_angle=rotation_angle,
+            settings=self.settings, colors=self.profile.chassis_colors, copy=False
+        )
+
+def _chain(first: Image.Image, rest: Iterator[Image.Image]) -> Iterator[Image.Image]:
+    yield first
+    yield from rest
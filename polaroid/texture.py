@@ -1,54 +1,62 @@
 from PIL import Image, ImageChops, ImageFilter, ImageEnhance
+from statistics import NormalDist
+import os
 import random
+import threading
+from . import config
 
-def generate_noise_layer(width: int, height: int, roughness: int) -> Image.Image:
+_tile_bank = {}
+_tile_bank_lock = threading.Lock()
+
+# Тип тайла -> (roughness, смещение сида)
+_TILE_KINDS = {
+    # sigma=20 - выраженные волокна
+    "cardboard": (20, 0),
+    # sigma=5 - мелкое зерно
+    "photo": (5, 1000),
+}
+
+def generate_noise_layer(width: int, height: int, roughness: int, seed: int = None) -> Image.Image:
     """
     Генерирует карту высот (Height Map) из шума.
     roughness: сила шума (чем больше, тем грубее поверхность).
+    seed: сид для воспроизводимости (None — случайный шум).
     """
     # 1. Генерируем случайный шум
-    # Используем L (Grayscale). 128 - это "ноль" высоты.
-    noise = Image.effect_noise((width, height), sigma=roughness)
-    
+    noise = _gaussian_noise(width, height, roughness, seed)
+
     # 2. Размываем, чтобы получить "холмы", а не просто битые пиксели.
     # Это имитирует волокна бумаги.
     noise = noise.filter(ImageFilter.GaussianBlur(radius=1.0))
-    
+
     return noise
 
+def _gaussian_noise(width: int, height: int, roughness: int, seed: int = None) -> Image.Image:
+    """
+    Гауссов шум вокруг 128 (L), полученный из равномерных байтов через
+    обратную функцию распределения (LUT). 128 - это "ноль" высоты.
+    """
+    if seed is not None:
+        data = random.Random(seed).randbytes(width * height)
+    else:
+        data = os.urandom(width * height)
+
+    dist = NormalDist(128, roughness)
+    lut = [max(0, min(255, int(dist.inv_cdf((v + 0.5) / 256)))) for v in range(256)]
+    return Image.frombytes("L", (width, height), data).point(lut)
+
 def height_to_normal(height_map: Image.Image, intensity: float = 1.0) -> Image.Image:
     """
     Превращает черно-белую карту высот в фиолетовую карту нормалей (Normal Map).
-    
+
     Математика (упрощенная для скорости):
     dX = Pixel(x+1) - Pixel(x)
     dY = Pixel(y+1) - Pixel(y)
     Normal = (dX, dY, Z) -> RGB mapping
     """
-    # Сдвигаем картинку на 1 пиксель влево и вверх
-    x_shifted = ImageChops.offset(height_map, -1, 0)
-    y_shifted = ImageChops.offset(height_map, 0, -1)
-    
-    # Вычисляем разницу (производную)
-    # 128 + (Original - Shifted) * intensity
-    
-    # R channel (X slope)
-    diff_x = ImageChops.difference(height_map, x_shifted)
-    # Инвертируем половину, чтобы получить отрицательные значения через наложение...
-    # Простой хак PIL для Normal Map:
-    
-    pixels = height_map.load()
     w, h = height_map.size
-    
-    normal_img = Image.new("RGB", (w, h))
-    normal_pixels = normal_img.load()
-    
-    # ВАЖНО: Питон медленный в циклах. Но для разрешения / 2 (1000px) это займет ~0.2 сек.
-    # Если нужно быстрее - придется подключать NumPy, но мы договорились без лишних либ.
-    
-    # Оптимизация: работаем не с каждым пикселем, а используем матричные фильтры PIL.
+
     # Kernel Filter для поиска краев (Sobel lite)
-    
     kernel_x = (
         -1, 0, 1,
         -2, 0, 2,
@@ -59,70 +67,136 @@ def height_to_normal(height_map: Image.Image, intensity: float = 1.0) -> Image.I
          0,  0,  0,
          1,  2,  1
     )
-    
+
     dx = height_map.filter(ImageFilter.Kernel((3, 3), kernel_x, scale=1))
     dy = height_map.filter(ImageFilter.Kernel((3, 3), kernel_y, scale=1))
-    
-    # Собираем каналы
-    # R = dx, G = dy, B = 255 (Z-up)
-    # Нам нужно маппить (-255..255) в (0..255), где 0 = 128.
-    
+
     # Усиление нормали
     dx = ImageEnhance.Contrast(dx).enhance(intensity)
     dy = ImageEnhance.Contrast(dy).enhance(intensity)
-    
-    # Инвертируем и смешиваем для получения правильного бампа
-    # Но самый быстрый способ собрать Normal Map в PIL без циклов:
-    
-    blue = Image.new("L", (w, h), 255) # Z всегда смотрит вверх
-    
-    # Смещение серого (128)
+
+    # R = 128 + dx, G = 128 - dy, B = 255 (Z всегда смотрит вверх)
+    blue = Image.new("L", (w, h), 255)
     gray = Image.new("L", (w, h), 128)
-    
-    # R channel: 128 + dx
+
     r = ImageChops.add(gray, dx, scale=0.5) # scale приглушает
-    # G channel: 128 - dy (Y в текстурах часто инвертирован, пробуем так)
+    # Y в текстурах часто инвертирован
     g = ImageChops.subtract(gray, dy, scale=0.5)
 
     return Image.merge("RGB", (r, g, blue))
 
+def normal_tiles(kind: str, settings=config) -> list:
+    """
+    Возвращает банк бесшовных тайлов карты нормалей заданного типа.
+
+    Тайлы строятся один раз на процесс из NORMAL_TILE_SEED для каждого набора
+    параметров NORMAL_TILE_* и далее переиспользуются, поэтому сборка карты
+    нормалей сводится к копированию.
+
+    Args:
+        kind (str): "cardboard" (грубые волокна картона) или "photo" (мелкое зерно фото).
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        list: Список RGB-тайлов карты нормалей.
+    """
+    if kind not in _TILE_KINDS:
+        raise ValueError(f"Unknown normal tile kind: {kind!r}")
+
+    key = (kind, settings.NORMAL_TILE_SEED, settings.NORMAL_TILE_COUNT, settings.NORMAL_TILE_SIZE)
+    tiles = _tile_bank.get(key)
+    if tiles is None:
+        with _tile_bank_lock:
+            tiles = _tile_bank.get(key)
+            if tiles is None:
+                roughness, seed_offset = _TILE_KINDS[kind]
+                tiles = [
+                    _render_normal_tile(roughness, settings.NORMAL_TILE_SEED + seed_offset + i,
+                                        settings.NORMAL_TILE_SIZE)
+                    for i in range(settings.NORMAL_TILE_COUNT)
+                ]
+                _tile_bank[key] = tiles
+    return tiles
+
+def _render_normal_tile(roughness: int, seed: int, size: int) -> Image.Image:
+    """
+    Рисует один бесшовный тайл нормалей.
+
+    Шум размножается 3x3 до размытия и фильтров производных, а затем
+    обрезается по центральной клетке: все фильтры видят периодическое
+    продолжение, и края тайла стыкуются без шва.
+    """
+    noise = _tile_3x3(_gaussian_noise(size, size, roughness, seed))
+
+    # Те же "холмы", что и в generate_noise_layer, но уже на периодическом шуме
+    height_map = noise.filter(ImageFilter.GaussianBlur(radius=1.0))
+
+    # intensity=2.0 - сила рельефа
+    normal = height_to_normal(height_map, intensity=2.0)
+    return normal.crop((size, size, size * 2, size * 2))
+
+def _tile_3x3(image: Image.Image) -> Image.Image:
+    w, h = image.size
+    padded = Image.new(image.mode, (w * 3, h * 3))
+    for ty in range(3):
+        for tx in range(3):
+            padded.paste(image, (tx * w, ty * h))
+    return padded
+
+def _fill_tiled(size: tuple, tile: Image.Image, offset: tuple) -> Image.Image:
+    """Заполняет холст заданного размера повторением тайла со смещением."""
+    w, h = size
+    tile_w, tile_h = tile.size
+    canvas = Image.new(tile.mode, (w, h))
+    for y in range(-offset[1], h, tile_h):
+        for x in range(-offset[0], w, tile_w):
+            canvas.paste(tile, (x, y))
+    return canvas
+
 def create_combined_normal(
-    total_size: tuple, 
-    photo_rect: tuple, 
-    scale_factor: float = 0.5
+    total_size: tuple,
+    photo_rect: tuple,
+    scale_factor: float = 0.5,
+    seed: int = None,
+    settings=config
 ) -> Image.Image:
     """
     Собирает итоговую карту нормалей.
-    
+
     total_size: (W, H) полного снимка.
     photo_rect: (x, y, w, h) зоны фото.
     scale_factor: во сколько раз уменьшать карту (0.5 = в 2 раза меньше).
+    seed: выбор тайлов и их смещений (одинаковый seed — одинаковая карта).
+    settings: параметры (модуль config или снимок профиля), из них берутся NORMAL_TILE_*.
+
+    Карта собирается из заранее посчитанных бесшовных тайлов (normal_tiles),
+    поэтому ее стоимость близка к копированию памяти.
     """
     w, h = total_size
-    
+
     # Целевой размер карты
     target_w = int(w * scale_factor)
     target_h = int(h * scale_factor)
-    
+
     # Координаты фото в уменьшенном масштабе
     px = int(photo_rect[0] * scale_factor)
     py = int(photo_rect[1] * scale_factor)
     pw = int(photo_rect[2] * scale_factor)
     ph = int(photo_rect[3] * scale_factor)
-    
-    # 1. Генерируем Шум КАРТОНА (Грубый)
-    # sigma=15 - выраженные волокна
-    base_height = generate_noise_layer(target_w, target_h, roughness=20)
-    
-    # 2. Генерируем Шум ФОТО (Мелкий, химический)
-    # sigma=5 - мелкое зерно
-    photo_height = generate_noise_layer(pw, ph, roughness=5)
-    
-    # Вклеиваем фото-шум в базу
-    base_height.paste(photo_height, (px, py))
-    
-    # 3. Конвертируем в Normal Map (Фиолетовый)
-    # intensity=2.0 - сила рельефа
-    normal_map = height_to_normal(base_height, intensity=2.0)
-    
-    return normal_map
\ No newline at end of file
+
+    rng = random.Random(seed)
+
+    # 1. Рельеф КАРТОНА (Грубый)
+    cardboard = normal_tiles("cardboard", settings)
+    tile = cardboard[rng.randrange(len(cardboard))]
+    offset = (rng.randrange(tile.width), rng.randrange(tile.height))
+    normal_map = _fill_tiled((target_w, target_h), tile, offset)
+
+    # 2. Рельеф ФОТО (Мелкий, химический), вклеивается в зону фото
+    photo = normal_tiles("photo", settings)
+    tile = photo[rng.randrange(len(photo))]
+    offset = (rng.randrange(tile.width), rng.randrange(tile.height))
+    if pw > 0 and ph > 0:
+        normal_map.paste(_fill_tiled((pw, ph), tile, offset), (px, py))
+
+    return normal_map
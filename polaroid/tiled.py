@@ -0,0 +1,284 @@
+import math
+import os
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Tuple, Union
+from PIL import Image
+from . import validation
+from . import geometry
+from . import config
+from . import filters
+from . import chemistry
+from . import optics
+from . import chassis
+from . import edges
+from . import profiles
+from .core import SideOutputs, _new_seed, _pixels, _stage_seed
+from .data import PolaroidResult
+from .trace import Span, StageTimer
+
+# Запас вокруг окна фото-блока под опору BICUBIC при повороте
+_ROTATION_MARGIN = 3
+
+def process_image_tiled(image: Image.Image, profile: Union[str, profiles.CompiledProfile] = "classic",
+                        tile_size: int = None, workers: int = None, max_dimension: int = None,
+                        generate_normal: bool = True, tracer: Callable[[Span], None] = None,
+                        **kwargs) -> PolaroidResult:
+    """
+    Тайловый рендер в полном разрешении, без ограничения MAX_PHOTO_DIMENSION.
+
+    Снимок собирается тайлами (см. iter_tiles): каждый этап (проявка, оптика,
+    зерно, кайма и тень, поворот, рамка) считается только для окна тайла
+    с запасом под размытие и ресемплинг, поэтому рабочая память зависит от
+    размера тайла, а не снимка. Тайлы рендерятся параллельно в потоках.
+    Результат совпадает с process_image того же размера и seed в пределах
+    округления ресемплинга (±1-2 уровня).
+
+    Args:
+        image (Image.Image): Исходное изображение.
+        profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+        tile_size (int, optional): Сторона тайла, px. Defaults to TILE_SIZE профиля.
+        workers (int, optional): Число потоков. Defaults to TILED_WORKERS профиля (по числу ядер).
+        max_dimension (int, optional): Максимальная сторона фото. Defaults to TILED_MAX_DIMENSION профиля
+                                       (исходное разрешение).
+        generate_normal (bool, optional): Строить ли карту нормалей. Defaults to True.
+        tracer (Callable[[Span], None], optional): Трассировщик этапов (см. process_image).
+        **kwargs: seed, rotation_angle (см. process_image).
+
+    Returns:
+        PolaroidResult: Результат обработки.
+
+    Raises:
+        ImageValidationError: Если изображение не проходит валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
+    """
+    job = _TiledJob(image, profiles.get_profile(profile), max_dimension, kwargs)
+    settings = job.settings
+    timer = StageTimer(tracer)
+
+    final_composite = Image.new("RGBA", job.layout.total_size, (0, 0, 0, 0))
+
+    with timer.stage("tiles") as span:
+        boxes = tile_boxes(job.layout.total_size, tile_size, settings=settings)
+        for box, tile in _run(job, boxes, workers):
+            final_composite.paste(tile, box[:2])
+        span.pixels = _pixels(final_composite)
+
+    photo_w, photo_h = job.photo_size
+    photo_rect = (job.layout.photo_pos[0], job.layout.photo_pos[1], photo_w, photo_h)
+
+    # Маска и карта нормалей строятся лениво, при первом обращении к результату
+    side_outputs = SideOutputs(
+        settings=settings, layout=job.layout, photo_size=job.photo_size, rotation_angle=job.rotation_angle,
+        rotation_resample=Image.BICUBIC, seed=job.seed, generate_normal=generate_normal, tracer=tracer
+    )
+
+    style_info = {
+        "profile": job.profile.name, "overrides": kwargs, "rotation": job.rotation_angle,
+        "quality": "final", "render_scale": 1.0, "source_size": tuple(image.size),
+        "seed": job.seed, "tiles": len(boxes),
+    }
+    if timer.enabled:
+        style_info["timings"] = timer.breakdown()
+
+    return PolaroidResult(
+        image=final_composite,
+        photo_mask=None,
+        photo_rect=photo_rect,
+        border_rect=(0, 0, job.layout.total_size[0], job.layout.total_size[1]),
+        style_info=style_info,
+        side_outputs=side_outputs
+    )
+
+def iter_tiles(image: Image.Image, profile: Union[str, profiles.CompiledProfile] = "classic",
+               tile_size: int = None, workers: int = None, max_dimension: int = None,
+               **kwargs) -> Iterator[Tuple[tuple, Image.Image]]:
+    """
+    Рендерит снимок тайлами и отдает их по мере готовности (построчно, слева направо).
+
+    Снимок целиком в памяти не собирается: одновременно живут только тайлы
+    в работе, поэтому тайлы можно сразу писать в файл или отправлять дальше.
+    Чтобы результат был воспроизводим, передайте seed.
+
+    Args:
+        image (Image.Image): Исходное изображение.
+        profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+        tile_size (int, optional): Сторона тайла, px. Defaults to TILE_SIZE профиля.
+        workers (int, optional): Число потоков. Defaults to TILED_WORKERS профиля.
+        max_dimension (int, optional): Максимальная сторона фото. Defaults to TILED_MAX_DIMENSION профиля.
+        **kwargs: seed, rotation_angle (см. process_image).
+
+    Yields:
+        Tuple[tuple, Image.Image]: Окно тайла (x0, y0, x1, y1) в итоговом снимке и RGBA-тайл.
+
+    Raises:
+        ImageValidationError: Если изображение не проходит валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
+    """
+    job = _TiledJob(image, profiles.get_profile(profile), max_dimension, kwargs)
+    yield from _run(job, tile_boxes(job.layout.total_size, tile_size, settings=job.settings), workers)
+
+def tile_boxes(size: tuple, tile_size: int = None, settings=config) -> List[tuple]:
+    """
+    Разбивает холст на тайлы (построчно, слева направо).
+
+    Args:
+        size (tuple): Размер холста (ширина, высота).
+        tile_size (int, optional): Сторона тайла, px. Если None, берется TILE_SIZE из settings.
+        settings (optional): Параметры (модуль config или снимок профиля). Defaults to config.
+
+    Returns:
+        List[tuple]: Окна (x0, y0, x1, y1).
+    """
+    if tile_size is None:
+        tile_size = settings.TILE_SIZE
+    if tile_size < 1:
+        raise ValueError("tile_size must be at least 1")
+    w, h = size
+    return [
+        (x, y, min(x + tile_size, w), min(y + tile_size, h))
+        for y in range(0, h, tile_size)
+        for x in range(0, w, tile_size)
+    ]
+
+class _TiledJob:
+    """
+    Общее состояние тайлового рендера одного снимка.
+
+    Все, что не зависит от окна тайла (геометрия, поворот, поля шума, параметры
+    колец каймы и тени), считается один раз; render(box) затем строит любой тайл
+    независимо от остальных. Маска и полосы каймы и тени считаются по окну тайла.
+    """
+    def __init__(self, image: Image.Image, profile: profiles.CompiledProfile, max_dimension: int, kwargs: dict):
+        settings = profile.settings
+        self.profile = profile
+        self.settings = settings
+
+        validation.validate_image_dimensions(*image.size, settings=settings)
+
+        if max_dimension is None:
+            max_dimension = settings.TILED_MAX_DIMENSION
+        if max_dimension is not None and max(image.size) > max_dimension:
+            image = image.resize(geometry.fit_size(image.size, max_dimension), Image.LANCZOS, reducing_gap=2.0)
+        # Тайлы читают исходник из нескольких потоков: декодируем заранее
+        image.load()
+        self.image = image
+        self.photo_size = image.size
+        photo_w, photo_h = image.size
+
+        self.seed = kwargs.get('seed', None)
+        if self.seed is None:
+            self.seed = _new_seed()
+        self.grain_seed = _stage_seed(self.seed, "grain")
+        limit = settings.PHOTO_ROTATION_LIMIT
+        self.rotation_angle = random.Random(_stage_seed(self.seed, "rotation")).uniform(-limit, limit)
+        if 'rotation_angle' in kwargs:
+            self.rotation_angle = kwargs['rotation_angle']
+
+        self.layout = geometry.calculate_layout(photo_w, photo_h, settings)
+        self.cover_scale = geometry.rotation_cover_scale(photo_w, photo_h, self.rotation_angle)
+        self.chassis_angle = chassis.quantize_angle(self.rotation_angle, settings.CHASSIS_ROTATION_STEP)
+        self.chassis_noise = chassis.chassis_noise(self.layout, photo_w, settings)
+
+        self.grain_noise = None
+        if settings.GRAIN_INTENSITY > 0 and not settings.GRAIN_TILE_BANK:
+            self.grain_noise = filters.grain_noise(self.photo_size, seed=self.grain_seed, settings=settings)
+
+        # Кайма и тень считаются по окну тайла: их полосы целиком растут вместе со снимком
+        self.bleed = int(max(photo_w, photo_h) * settings.PHOTO_EDGE_BLEED)
+        self.rings = []
+        if settings.FRINGE_STRENGTH > 0:
+            self.rings.append((settings.FRINGE_DEPTH, settings.FRINGE_BLUR, settings.FRINGE_COLOR,
+                               settings.FRINGE_STRENGTH))
+        self.rings.append((settings.SHADOW_DEPTH, settings.SHADOW_BLUR, (0, 0, 0), settings.SHADOW_STRENGTH))
+
+    def render(self, box: tuple) -> Image.Image:
+        """
+        Рендерит один тайл итогового снимка.
+
+        Returns:
+            Image.Image: RGBA-тайл.
+        """
+        x0, y0, x1, y1 = box
+        px, py = self.layout.photo_pos
+        photo_w, photo_h = self.photo_size
+
+        tile = Image.new("RGBA", (x1 - x0, y1 - y0), (0, 0, 0, 0))
+
+        # Часть тайла, попадающая в окно фото (в координатах фото-блока)
+        window = (max(x0, px) - px, max(y0, py) - py, min(x1, px + photo_w) - px, min(y1, py + photo_h) - py)
+        if window[2] > window[0] and window[3] > window[1]:
+            block = self._rotated_block(window)
+            tile.paste(block, (window[0] + px - x0, window[1] + py - y0), block)
+
+        tile.alpha_composite(chassis.render_chassis_region(
+            self.layout, photo_w, self.photo_size, self.chassis_angle, box,
+            settings=self.settings, colors=self.profile.chassis_colors, noise=self.chassis_noise
+        ))
+        return tile
+
+    def _rotated_block(self, window: tuple) -> Image.Image:
+        """Окно window повернутого фото-блока (см. core._rotate_block)."""
+        if self.rotation_angle == 0:
+            return self._block(window)
+
+        out_w, out_h = window[2] - window[0], window[3] - window[1]
+        a, b, c, d, e, f = geometry.rotation_transform(
+            self.photo_size, self.rotation_angle, self.cover_scale, offset=window[:2]
+        )
+        corners = [(a * x + b * y + c, d * x + e * y + f) for x in (0, out_w) for y in (0, out_h)]
+        photo_w, photo_h = self.photo_size
+        region = (
+            max(0, int(math.floor(min(x for x, _ in corners))) - _ROTATION_MARGIN),
+            max(0, int(math.floor(min(y for _, y in corners))) - _ROTATION_MARGIN),
+            min(photo_w, int(math.ceil(max(x for x, _ in corners))) + _ROTATION_MARGIN),
+            min(photo_h, int(math.ceil(max(y for _, y in corners))) + _ROTATION_MARGIN),
+        )
+        block = self._block(region)
+        return block.transform(
+            (out_w, out_h),
+            Image.AFFINE,
+            (a, b, c - region[0], d, e, f - region[1]),
+            resample=Image.BICUBIC
+        )
+
+    def _block(self, box: tuple) -> Image.Image:
+        """Окно box неповернутого фото-блока: проявка, оптика, зерно, маска, кайма и тень."""
+        settings = self.settings
+        source_box = optics.optics_source_box(self.photo_size, box, settings=settings)
+
+        photo = chemistry.develop_image(self.image.crop(source_box), lut=self.profile.chemistry_lut)
+        photo = optics.apply_optics_region(photo, source_box[:2], self.photo_size, box, settings=settings)
+        photo = filters.apply_grain_region(photo, self.photo_size, box, seed=self.grain_seed, noise=self.grain_noise,
+                                           settings=settings)
+
+        block = photo.convert("RGBA")
+        block.putalpha(chassis.create_photo_mask(self.photo_size, self.photo_size[0], bleed=self.bleed,
+                                                 settings=settings, box=box))
+        for depth, blur, color, strength in self.rings:
+            strips = edges.ring_region(self.photo_size, self.photo_size[0], depth, blur, color, strength, box,
+                                       bleed=self.bleed, settings=settings)
+            edges.apply_ring(block, strips, origin=box[:2])
+        return block
+
+def _run(job: _TiledJob, boxes: List[tuple], workers: int = None) -> Iterator[tuple]:
+    """
+    Рендерит тайлы в пуле потоков и отдает их по порядку.
+
+    В работе одновременно не больше 2 * workers тайлов, поэтому память
+    ограничена независимо от размера снимка.
+    """
+    if workers is None:
+        workers = job.settings.TILED_WORKERS or os.cpu_count() or 1
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="polaroid-tile") as pool:
+        for box in boxes:
+            pending.append((box, pool.submit(job.render, box)))
+            if len(pending) >= workers * 2:
+                done_box, future = pending.popleft()
+                yield done_box, future.result()
+        while pending:
+            done_box, future = pending.popleft()
+            yield done_box, future.result()
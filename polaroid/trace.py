@@ -0,0 +1,251 @@
+import gc
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from PIL import Image
+from . import config
+
+# Сколько байт на пиксель Pillow хранит для режима (остальные режимы — 4)
+_BYTES_PER_PIXEL = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16B": 2, "I;16L": 2}
+
+@dataclass
+class Span:
+    """
+    Замер одного этапа пайплайна.
+
+    Attributes:
+        name (str): Имя этапа (chemistry, optics, grain, chassis, ...).
+        start (float): Момент начала (time.perf_counter), секунды.
+        wall (float): Длительность по настенным часам, секунды.
+        cpu (float): Процессорное время текущего потока, секунды.
+        pixels (int): Количество пикселей на выходе этапа.
+        thread_id (int): Идентификатор потока, выполнявшего этап.
+        image_bytes (int): Объем всех живых буферов PIL в процессе на конце этапа
+                           (только при замере памяти).
+        rss (int): Резидентная память процесса на конце этапа, байт (только при замере памяти).
+        peak_image_bytes (int): Максимум объема буферов PIL за время этапа (только при замере памяти).
+        peak_rss (int): Максимум резидентной памяти за время этапа, байт (только при замере памяти).
+    """
+    name: str
+    start: float = 0.0
+    wall: float = 0.0
+    cpu: float = 0.0
+    pixels: int = 0
+    thread_id: int = 0
+    image_bytes: int = 0
+    rss: int = 0
+    peak_image_bytes: int = 0
+    peak_rss: int = 0
+
+class StageTimer:
+    """
+    Замеряет этапы одного вызова process_image и передает их трассировщику.
+
+    Трассировщик — любой callable, принимающий Span. Без трассировщика
+    (и без замера памяти) замеры не выполняются и накладных расходов почти нет.
+    С memory=True объем живых буферов PIL (обход gc) и RSS процесса дополнительно
+    замеряются фоновым потоком каждые sample_interval секунд внутри этапа и на его
+    конце — это заметно медленнее, только для профилирования.
+    """
+    def __init__(self, tracer: Optional[Callable[[Span], None]] = None, memory: bool = False,
+                 sample_interval: float = None):
+        self.tracer = tracer
+        self.memory = memory
+        self.sample_interval = config.MEMORY_SAMPLE_INTERVAL if sample_interval is None else sample_interval
+        self.spans: List[Span] = []
+
+    @property
+    def enabled(self) -> bool:
+        return self.tracer is not None or self.memory
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Контекстный менеджер для замера этапа. Внутри можно заполнить span.pixels.
+
+        Args:
+            name (str): Имя этапа.
+        """
+        span = Span(name)
+        if not self.enabled:
+            yield span
+            return
+
+        sampler = _MemorySampler(self.sample_interval) if self.memory else None
+        span.thread_id = threading.get_ident()
+        span.start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield span
+        finally:
+            span.wall = time.perf_counter() - span.start
+            span.cpu = time.thread_time() - cpu_start
+            if sampler is not None:
+                sampler.stop()
+                span.image_bytes = live_image_bytes()
+                span.rss = current_rss()
+                span.peak_image_bytes = max(sampler.peak_image_bytes, span.image_bytes)
+                span.peak_rss = max(sampler.peak_rss, span.rss)
+            self.spans.append(span)
+            if self.tracer is not None:
+                self.tracer(span)
+
+    def breakdown(self) -> Dict[str, dict]:
+        """Возвращает разбивку по этапам этого вызова: {имя: {wall, cpu, pixels}}."""
+        return _summarize(self.spans)
+
+    def memory_report(self) -> dict:
+        """
+        Возвращает отчет о памяти этого вызова.
+
+        Буферы PIL считаются обходом gc.get_objects() по всему процессу, поэтому в
+        замер попадают изображения всех потоков и кэшей: при параллельной пакетной
+        обработке (потоки, AsyncRenderer) цифры относятся к процессу, а не к вызову.
+
+        Returns:
+            dict: {"stages": {имя: {"image_bytes", "rss", "peak_image_bytes", "peak_rss"}},
+                   "peak_image_bytes", "peak_rss", "max_rss"}. image_bytes и rss — значения
+                   на конце этапа, пики — максимум фоновых замеров внутри этапов (с периодом
+                   sample_interval, поэтому кратковременный пик может быть пропущен),
+                   max_rss — пик RSS процесса за все время жизни (если доступен).
+        """
+        stages = {}
+        for span in self.spans:
+            entry = stages.setdefault(span.name, {"image_bytes": 0, "rss": 0, "peak_image_bytes": 0, "peak_rss": 0})
+            for field in entry:
+                entry[field] = max(entry[field], getattr(span, field))
+        return {
+            "stages": stages,
+            "peak_image_bytes": max((s.peak_image_bytes for s in self.spans), default=0),
+            "peak_rss": max((s.peak_rss for s in self.spans), default=0),
+            "max_rss": max_rss(),
+        }
+
+class _MemorySampler:
+    """Фоновый поток, замеряющий буферы PIL и RSS каждые interval секунд до stop()."""
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.peak_image_bytes = 0
+        self.peak_rss = 0
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="polaroid-memory", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            self.peak_image_bytes = max(self.peak_image_bytes, live_image_bytes())
+            self.peak_rss = max(self.peak_rss, current_rss())
+            if self._stopped.wait(self.interval):
+                return
+
+class TraceCollector:
+    """
+    Встроенный трассировщик: накапливает замеры всех вызовов (потокобезопасно).
+
+    Пример:
+        collector = TraceCollector()
+        result = process_image(image, tracer=collector)
+        result.style_info["timings"]      # разбивка этого вызова
+        collector.dump_chrome_trace("trace.json")  # открыть в chrome://tracing
+    """
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> Dict[str, dict]:
+        """Суммарная разбивка по этапам за все вызовы."""
+        with self._lock:
+            return _summarize(self.spans)
+
+    def to_chrome_trace(self) -> dict:
+        """
+        Возвращает замеры в формате Chrome Trace Event (complete events, "ph": "X").
+
+        Returns:
+            dict: Объект {"traceEvents": [...]} для chrome://tracing или Perfetto.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": span.name,
+                    "cat": "polaroid",
+                    "ph": "X",
+                    "ts": span.start * 1e6,
+                    "dur": span.wall * 1e6,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": {"cpu_ms": round(span.cpu * 1e3, 3), "pixels": span.pixels},
+                }
+                for span in self.spans
+            ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump_chrome_trace(self, path: str) -> None:
+        """Сохраняет замеры в JSON-файл формата Chrome Trace."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def clear(self) -> None:
+        """Удаляет накопленные замеры."""
+        with self._lock:
+            self.spans.clear()
+
+def _summarize(spans: List[Span]) -> Dict[str, dict]:
+    summary = {}
+    for span in spans:
+        entry = summary.setdefault(span.name, {"wall": 0.0, "cpu": 0.0, "pixels": 0, "count": 0})
+        entry["wall"] += span.wall
+        entry["cpu"] += span.cpu
+        entry["pixels"] += span.pixels
+        entry["count"] += 1
+    return summary
+
+def live_image_bytes() -> int:
+    """
+    Суммарный объем пиксельных буферов всех загруженных изображений PIL в процессе.
+
+    tracemalloc не видит память Pillow (она выделяется в C), поэтому буферы
+    считаются обходом объектов gc. Включает изображения всех потоков и кэшей.
+    """
+    total = 0
+    for obj in gc.get_objects():
+        if isinstance(obj, Image.Image) and _is_loaded(obj):
+            total += obj.width * obj.height * _BYTES_PER_PIXEL.get(obj.mode, 4)
+    return total
+
+def current_rss() -> int:
+    """Текущая резидентная память процесса, байт (0, если недоступна)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return 0
+
+def max_rss() -> int:
+    """Пиковая резидентная память процесса за время жизни, байт (0, если недоступна)."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux отдает килобайты, macOS — байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def _is_loaded(image: Image.Image) -> bool:
+    # Лениво открытые файлы еще не держат буфер
+    attrs = vars(image)
+    return attrs.get("_im", attrs.get("im")) is not None
@@ -0,0 +1,77 @@
+import dataclasses
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Sequence, Union
+from PIL import Image
+from . import profiles
+from .core import QUALITY_LEVELS, _develop, _finish, _new_seed
+from .data import PolaroidResult
+from .debug import Debugger
+from .trace import Span, StageTimer
+
+def process_variants(image: Image.Image, seeds: Sequence[int], profile: Union[str, profiles.CompiledProfile] = "classic",
+                     generate_normal: bool = True, tracer: Callable[[Span], None] = None, target_size: int = None,
+                     quality: str = "final", source_size: tuple = None, lean: bool = None,
+                     memory_report: bool = False, workers: int = None, **kwargs) -> List[PolaroidResult]:
+    """
+    Рендерит несколько вариантов одного снимка с разными сидами.
+
+    Этапы, не зависящие от сида (валидация, уменьшение, проявка, оптика),
+    выполняются один раз; для каждого сида достраиваются только зерно,
+    фото-блок, поворот и рамка. Каждый вариант совпадает с
+    process_image(image, seed=seed, ...) побитово.
+
+    Args:
+        image (Image.Image): Исходное изображение.
+        seeds (Sequence[int]): Сиды вариантов; None в списке — случайный сид
+                               (возвращается в style_info["seed"]).
+        profile (str | CompiledProfile, optional): Профиль обработки. Defaults to "classic".
+        generate_normal, tracer, target_size, quality, source_size, lean, memory_report: См. process_image.
+            Варианты достраиваются параллельно, поэтому отчет о памяти учитывает буферы
+            всех потоков (см. trace.StageTimer.memory_report).
+        workers (int, optional): Сколько вариантов достраивать параллельно (в потоках).
+                                 Defaults to VARIANT_WORKERS профиля (по числу ядер).
+        **kwargs: Общие для всех вариантов параметры (например, rotation_angle).
+                  debug не поддерживается: шаги отладки всех вариантов писались бы в одни файлы.
+
+    Returns:
+        List[PolaroidResult]: Результаты в порядке seeds.
+
+    Raises:
+        ImageValidationError: Если изображение не проходит валидацию.
+        InvalidProfileError: Если профиль не зарегистрирован.
+        TypeError: Если передан seed= или debug=.
+    """
+    if quality not in QUALITY_LEVELS:
+        raise ValueError(f"Unknown quality {quality!r}, expected one of {QUALITY_LEVELS}.")
+    if "seed" in kwargs:
+        raise TypeError("process_variants() takes seeds=[...], not seed=.")
+    if "debug" in kwargs:
+        raise TypeError("process_variants() does not support debug=; use process_image for debug output.")
+
+    compiled = profiles.get_profile(profile)
+    if lean is None:
+        lean = compiled.settings.MEMORY_LEAN
+
+    seeds = [_new_seed() if seed is None else seed for seed in seeds]
+    if not seeds:
+        return []
+
+    debugger = Debugger(enabled=False)
+    shared_timer = StageTimer(tracer, memory=memory_report)
+    developed = _develop(image, compiled, target_size, quality, source_size, shared_timer, debugger)
+
+    def finish(seed: int) -> PolaroidResult:
+        # Разбивка каждого варианта включает общие этапы
+        timer = StageTimer(tracer, memory=memory_report)
+        timer.spans = list(shared_timer.spans)
+        return _finish(dataclasses.replace(developed), compiled, seed, generate_normal, lean, timer, debugger,
+                       dict(kwargs, seed=seed))
+
+    if workers is None:
+        workers = compiled.settings.VARIANT_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or len(seeds) == 1:
+        return [finish(seed) for seed in seeds]
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(seeds)), thread_name_prefix="polaroid-variant") as pool:
+        return list(pool.map(finish, seeds))
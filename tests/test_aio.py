@@ -0,0 +1,113 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from PIL import Image
+from polaroid import process_image
+from polaroid.aio import AsyncRenderer, process_image_async
+from polaroid.exceptions import RendererOverloadedError
+
+
+def test_process_image_async_matches_sync():
+    """Асинхронный вызов дает тот же результат, что и синхронный."""
+    img = Image.new("RGB", (150, 120), "teal")
+
+    result = asyncio.run(process_image_async(img, seed=9, generate_normal=False))
+
+    assert result.image.tobytes() == process_image(img, seed=9, generate_normal=False).image.tobytes()
+
+
+class _BlockingExecutor:
+    """Пул, задачи которого ждут сигнала: позволяет держать слоты занятыми."""
+    def __init__(self):
+        self.gate = threading.Event()
+        self.pool = ThreadPoolExecutor(max_workers=4)
+
+    def submit(self, fn, *args, **kwargs):
+        def run():
+            self.gate.wait(5)
+            return fn(*args, **kwargs)
+        return self.pool.submit(run)
+
+    def shutdown(self, wait=True, **kwargs):
+        self.pool.shutdown(wait=wait)
+
+
+def test_renderer_rejects_when_queue_is_full():
+    """При заполненной очереди новый запрос сразу получает отказ, а не ждет."""
+    img = Image.new("RGB", (100, 100), "navy")
+    executor = _BlockingExecutor()
+
+    async def scenario():
+        renderer = AsyncRenderer(concurrency=1, max_queue=1, executor=executor)
+        running = asyncio.ensure_future(renderer.render(img, seed=1, generate_normal=False))
+        waiting = asyncio.ensure_future(renderer.render(img, seed=2, generate_normal=False))
+        await asyncio.sleep(0.05)
+
+        assert renderer.stats.in_flight == 1
+        assert renderer.stats.queue_depth == 1
+        with pytest.raises(RendererOverloadedError):
+            await renderer.render(img, seed=3)
+
+        executor.gate.set()
+        results = await asyncio.gather(running, waiting)
+        await renderer.close()
+        return renderer.stats, results
+
+    stats, results = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert stats.rejected == 1
+    assert stats.completed == 2
+    assert stats.queue_depth == 0 and stats.in_flight == 0
+    assert results[1].style_info["queue_wait"] > 0
+
+
+def test_renderer_sheds_requests_waiting_too_long():
+    """Запрос, прождавший дольше queue_timeout, снимается с очереди."""
+    img = Image.new("RGB", (100, 100), "maroon")
+    executor = _BlockingExecutor()
+
+    async def scenario():
+        renderer = AsyncRenderer(concurrency=1, max_queue=4, queue_timeout=0.05, executor=executor)
+        running = asyncio.ensure_future(renderer.render(img, seed=1, generate_normal=False))
+        await asyncio.sleep(0.01)
+        with pytest.raises(RendererOverloadedError):
+            await renderer.render(img, seed=2)
+        executor.gate.set()
+        await running
+        return renderer.stats
+
+    stats = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert stats.timed_out == 1
+    assert stats.completed == 1
+
+
+def test_renderer_keeps_slot_until_cancelled_job_finishes():
+    """Отмена запроса не освобождает слот, пока рендер в пуле не завершится."""
+    img = Image.new("RGB", (100, 100), "olive")
+    executor = _BlockingExecutor()
+
+    async def scenario():
+        renderer = AsyncRenderer(concurrency=1, max_queue=4, executor=executor)
+        running = asyncio.ensure_future(renderer.render(img, seed=1, generate_normal=False))
+        await asyncio.sleep(0.05)
+        running.cancel()
+        await asyncio.sleep(0.05)
+
+        assert renderer.stats.in_flight == 1
+        waiting = asyncio.ensure_future(renderer.render(img, seed=2, generate_normal=False))
+        await asyncio.sleep(0.05)
+        assert renderer.stats.queue_depth == 1
+
+        executor.gate.set()
+        await waiting
+        return renderer.stats
+
+    stats = asyncio.run(scenario())
+    executor.shutdown()
+
+    assert stats.completed == 2
+    assert stats.queue_depth == 0 and stats.in_flight == 0
@@ -0,0 +1,115 @@
+import threading
+import time
+import pytest
+from PIL import Image
+from polaroid import batch, texture
+from polaroid.batch import init_worker, process_batch
+from polaroid.core import process_image
+from polaroid.exceptions import ImageValidationError
+
+
+def test_batch_matches_serial_run():
+    """
+    С одинаковыми сидами результат пакета в пуле процессов совпадает с последовательным.
+    """
+    images = [Image.new("RGB", (120, 100), color) for color in ("red", "green", "blue")]
+    seeds = [1, 2, 3]
+
+    run = process_batch(images, workers=2, seeds=seeds, generate_normal=False)
+    items = list(run)
+
+    assert [item.index for item in items] == [0, 1, 2]
+    for item, image, seed in zip(items, images, seeds):
+        assert item.ok
+        serial = process_image(image.copy(), seed=seed, generate_normal=False)
+        assert item.result.image.tobytes() == serial.image.tobytes()
+
+    assert run.stats.images == 3
+    assert run.stats.images_per_second > 0
+
+
+def test_batch_reports_errors_per_item():
+    """
+    Ошибка одного элемента не прерывает пакет.
+    """
+    images = [Image.new("RGB", (10, 10)), Image.new("RGB", (120, 100))]
+
+    items = sorted(process_batch(images, workers=0, ordered=False, generate_normal=False), key=lambda i: i.index)
+
+    assert isinstance(items[0].error, ImageValidationError)
+    assert items[1].ok
+
+
+def test_thread_batch_matches_serial_run():
+    """
+    Пул потоков дает те же результаты, что и последовательные вызовы.
+    """
+    images = [Image.new("RGB", (120, 100), color) for color in ("red", "green", "blue", "white")]
+    seeds = [5, 6, 7, 8]
+
+    items = list(process_batch(images, workers=3, seeds=seeds, executor="thread", generate_normal=False))
+
+    for item, image, seed in zip(items, images, seeds):
+        assert item.ok
+        serial = process_image(image, seed=seed, generate_normal=False)
+        assert item.result.image.tobytes() == serial.image.tobytes()
+
+
+def test_ordered_batch_bounds_results_behind_slow_item(monkeypatch):
+    """В упорядоченном режиме медленный элемент не дает накопить весь остаток пакета."""
+    gate = threading.Event()
+    slow = Image.new("RGB", (120, 100))
+    render = batch.process_image
+
+    def stalled(image, **kwargs):
+        if image is slow:
+            gate.wait(5)
+        return render(image, **kwargs)
+
+    monkeypatch.setattr(batch, "process_image", stalled)
+    pulled = []
+
+    def source():
+        for i in range(40):
+            pulled.append(i)
+            yield slow if i == 0 else Image.new("RGB", (120, 100))
+
+    items = []
+    consumer = threading.Thread(target=lambda: items.extend(
+        process_batch(source(), workers=2, executor="thread", generate_normal=False)
+    ))
+    consumer.start()
+    time.sleep(0.5)
+    assert len(pulled) <= 2 * 2
+    gate.set()
+    consumer.join(30)
+
+    assert [item.index for item in items] == list(range(40))
+
+
+def test_batch_rejects_too_few_seeds():
+    """Если сидов меньше, чем элементов, возникает понятная ошибка, а не StopIteration."""
+    images = [Image.new("RGB", (120, 100)) for _ in range(3)]
+
+    with pytest.raises(ValueError, match="fewer entries"):
+        list(process_batch(images, workers=0, seeds=[1, 2], generate_normal=False))
+
+
+def test_batch_eager_side_outputs_built_in_worker():
+    """С eager_side_outputs маска и нормали строятся в воркере и приходят из пула процессов готовыми."""
+    images = [Image.new("RGB", (120, 100), color) for color in ("olive", "navy")]
+
+    items = list(process_batch(images, workers=2, seeds=[4, 5], eager_side_outputs=True))
+
+    for item, image, seed in zip(items, images, (4, 5)):
+        assert item.result.side_outputs is None
+        serial = process_image(image.copy(), seed=seed)
+        assert item.result.photo_mask.tobytes() == serial.photo_mask.tobytes()
+        assert item.result.normal_map.tobytes() == serial.normal_map.tobytes()
+
+
+def test_init_worker_warms_normal_tile_bank():
+    """Прогрев воркера собирает и банк тайлов нормалей."""
+    texture._tile_bank.clear()
+    init_worker()
+    assert len(texture._tile_bank) == len(texture._TILE_KINDS)
@@ -0,0 +1,51 @@
+from PIL import ImageChops
+from polaroid import chassis
+from polaroid.geometry import calculate_layout
+
+
+def test_chassis_template_cache_hit():
+    """
+    Повторный вызов с тем же размером и близким углом должен брать шаблон из кэша.
+    """
+    chassis.clear_cache()
+    layout = calculate_layout(200, 150)
+
+    first = chassis.create_chassis(layout, 200, (200, 150), rotation_angle=0.02)
+    second = chassis.create_chassis(layout, 200, (200, 150), rotation_angle=0.0201)
+
+    info = chassis.cache_info()
+    assert info.misses == 1
+    assert info.hits == 1
+    assert first.tobytes() == second.tobytes()
+
+    # Вызывающий код получает копию, а не сам шаблон
+    assert first is not second
+
+
+def test_chassis_grip_gradient():
+    """
+    Градиент хваталки темнеет сверху вниз и одинаков по ширине.
+    """
+    chassis.clear_cache()
+    layout = calculate_layout(200, 150)
+    frame = chassis.create_chassis(layout, 200, (200, 150))
+
+    w, h = layout.total_size
+    top = frame.getpixel((w // 2, h - 40))
+    bottom = frame.getpixel((w // 2, h - 5))
+    assert sum(bottom[:3]) < sum(top[:3])
+
+
+def test_chassis_region_matches_template():
+    """
+    Фрагмент рамки совпадает с тем же окном полного шаблона (с точностью до округления).
+    """
+    layout = calculate_layout(300, 220)
+    full = chassis.create_chassis(layout, 300, (300, 220), rotation_angle=1.3)
+    angle = chassis.quantize_angle(1.3)
+    w, h = layout.total_size
+
+    for box in [(0, 0, 100, 100), (20, 30, 200, 180), (0, h - 90, w, h)]:
+        part = chassis.render_chassis_region(layout, 300, (300, 220), angle, box)
+        diff = ImageChops.difference(part, full.crop(box))
+        assert max(high for _, high in diff.getextrema()) <= 1
@@ -0,0 +1,54 @@
+import os
+from PIL import Image
+from polaroid.cli import main
+
+
+def test_cli_processes_folder_and_resumes(tmp_path, capsys):
+    """
+    CLI обрабатывает папку, пишет побочные файлы и пропускает уже готовое при повторном запуске.
+    """
+    src = tmp_path / "in"
+    out = tmp_path / "out"
+    src.mkdir()
+    Image.new("RGB", (120, 100), "red").save(src / "a.jpg")
+    Image.new("RGB", (10, 10)).save(src / "tiny.png")
+
+    code = main([str(src), str(out), "--workers", "0", "--seed", "1", "-q"])
+
+    assert code == 1  # tiny.png не проходит валидацию
+    assert sorted(os.listdir(out)) == ["a.png", "a_mask.png", "a_normal.png"]
+
+    capsys.readouterr()
+    main([str(src), str(out), "--workers", "0", "-q"])
+    assert "skipped (already done): 1" in capsys.readouterr().out
+
+
+def test_cli_jpeg_format_writes_alpha(tmp_path):
+    """В формате JPEG рядом со снимком пишется альфа-канал, маска и нормали остаются PNG."""
+    src = tmp_path / "in"
+    out = tmp_path / "out"
+    src.mkdir()
+    Image.new("RGB", (120, 100), "blue").save(src / "b.png")
+
+    code = main([str(src), str(out), "--workers", "0", "--format", "jpeg", "--quality", "80", "-q"])
+
+    assert code == 0
+    assert sorted(os.listdir(out)) == ["b.jpg", "b_alpha.png", "b_mask.png", "b_normal.png"]
+
+
+def test_cli_suffixes_colliding_output_names(tmp_path, capsys):
+    """a.jpg и a.png не перезаписывают друг друга: второй получает суффикс по расширению."""
+    src = tmp_path / "in"
+    out = tmp_path / "out"
+    src.mkdir()
+    Image.new("RGB", (120, 100), "red").save(src / "a.jpg")
+    Image.new("RGB", (120, 100), "green").save(src / "a.png")
+
+    code = main([str(src), str(out), "--workers", "0", "--no-normal", "--no-mask", "-q"])
+
+    assert code == 0
+    assert sorted(os.listdir(out)) == ["a.png", "a_png.png"]
+    assert "collides" in capsys.readouterr().err
+
+    main([str(src), str(out), "--workers", "0", "--no-normal", "--no-mask", "-q"])
+    assert "skipped (already done): 2" in capsys.readouterr().out
@@ -1,8 +1,11 @@
+import dataclasses
+import pickle
 import pytest
 from PIL import Image
-from polaroid.core import process_image
+from polaroid.core import _stage_seed, process_image
 from polaroid.exceptions import ImageValidationError
 from polaroid.data import PolaroidResult
+from polaroid.trace import TraceCollector
 
 def test_core_validates_bad_image():
     """
@@ -35,4 +38,102 @@ def test_core_process_success():
     # Проверяем точку (0, 0) - это левый верхний угол рамки
     pixel_color = result.image.getpixel((0, 0))
     # Должен быть наш "PAPER_BASE_COLOR" из конфига (254, 252, 247)
-    assert pixel_color == (254, 252, 247)
\ No newline at end of file
+    assert pixel_color == (254, 252, 247)
+
+def test_core_target_size_draft():
+    """
+    Черновик в заданном размере: снимок вписан в target_size, поворот тот же, что у полного рендера.
+    """
+    img = Image.new("RGB", (1200, 900), color="blue")
+
+    full = process_image(img, seed=3, generate_normal=False)
+    draft = process_image(img, seed=3, target_size=300, quality="draft")
+
+    assert max(draft.image.size) <= 300
+    assert draft.normal_map is None
+    assert draft.style_info["rotation"] == full.style_info["rotation"]
+
+    # Исходное изображение вызывающего не изменяется
+    assert img.size == (1200, 900)
+
+
+def test_core_rejects_unknown_quality():
+    with pytest.raises(ValueError):
+        process_image(Image.new("RGB", (100, 100)), quality="ultra")
+
+
+def test_core_unseeded_call_is_reproducible():
+    """Без seed сид выбирается случайно, сохраняется в style_info и воспроизводит результат."""
+    img = Image.new("RGB", (200, 160), color="green")
+
+    first = process_image(img)
+    again = process_image(img, seed=first.style_info["seed"])
+
+    assert first.style_info["rotation"] == again.style_info["rotation"]
+    assert first.image.tobytes() == again.image.tobytes()
+    assert first.normal_map.tobytes() == again.normal_map.tobytes()
+
+
+def test_core_stage_seeds_are_independent():
+    """Стадии получают разные сиды; соседние сиды вызова не дают сдвинутых потоков."""
+    seeds = {_stage_seed(seed, stage) for seed in (41, 42, 43) for stage in ("rotation", "grain", "normal")}
+    assert len(seeds) == 9
+    assert _stage_seed(42, "grain") == _stage_seed(42, "grain")
+    assert _stage_seed(42, "grain", 1) != _stage_seed(43, "grain")
+
+
+def test_core_lean_mode_matches_default():
+    """Экономный режим дает тот же результат, а отчет о памяти содержит этапы и пик."""
+    img = Image.new("RGB", (300, 220), color="orange")
+
+    default = process_image(img, seed=5, generate_normal=False)
+    lean = process_image(img, seed=5, generate_normal=False, lean=True, memory_report=True)
+
+    assert lean.image.tobytes() == default.image.tobytes()
+    assert lean.photo_mask.tobytes() == default.photo_mask.tobytes()
+    assert "memory" not in default.style_info
+    assert "timings" not in lean.style_info
+
+    report = lean.style_info["memory"]
+    assert {"chemistry", "compositing"} <= set(report["stages"])
+    assert report["peak_image_bytes"] >= 300 * 220 * 4
+
+
+def test_core_side_outputs_are_lazy():
+    """Маска и карта нормалей строятся при первом обращении, сбрасываются и переживают pickle."""
+    img = Image.new("RGB", (300, 220), color="purple")
+    collector = TraceCollector()
+
+    result = process_image(img, seed=9, tracer=collector)
+    names = {span.name for span in collector.spans}
+    assert "photo_mask" not in names and "normal_map" not in names
+
+    mask = result.photo_mask.tobytes()
+    normal = result.normal_map.tobytes()
+    assert result.photo_mask.getextrema() == (0, 255)
+
+    result.drop_side_outputs()
+    assert result.photo_mask.tobytes() == mask
+    assert result.normal_map.tobytes() == normal
+
+    restored = pickle.loads(pickle.dumps(result))
+    assert restored.image.tobytes() == result.image.tobytes()
+    assert restored.photo_mask.tobytes() == mask
+    assert restored.normal_map.tobytes() == normal
+
+    assert process_image(img, seed=9, generate_normal=False).normal_map is None
+
+
+def test_core_result_is_dataclass():
+    """PolaroidResult остается dataclass: replace, asdict и == видят ленивые выходы."""
+    result = process_image(Image.new("RGB", (200, 160), color="navy"), seed=4)
+    again = process_image(Image.new("RGB", (200, 160), color="navy"), seed=4)
+
+    assert result == again
+    copy = dataclasses.replace(result, style_info={})
+    assert copy.photo_mask.tobytes() == result.photo_mask.tobytes()
+    assert dataclasses.asdict(result)["normal_map"].tobytes() == result.normal_map.tobytes()
+
+    result.build_side_outputs()
+    assert result.side_outputs is None
+    assert pickle.loads(pickle.dumps(result)).photo_mask.tobytes() == again.photo_mask.tobytes()
@@ -0,0 +1,40 @@
+import os
+from PIL import Image
+from polaroid.debug import Debugger
+
+
+def test_debugger_writes_in_background(tmp_path):
+    """
+    Снимки пишутся фоновым потоком в подпапку запуска; close() дожидается записи.
+    """
+    debugger = Debugger(enabled=True, output_dir=str(tmp_path), thumbnail_size=32)
+    image = Image.new("RGB", (200, 100), "red")
+
+    debugger.save(image, "first")
+    image.paste((0, 0, 255), (0, 0, 200, 100))  # изменение после save() не влияет на снимок
+    debugger.save(image, "second")
+    debugger.close()
+
+    runs = os.listdir(tmp_path)
+    assert len(runs) == 1
+    run_dir = tmp_path / runs[0]
+    assert sorted(os.listdir(run_dir)) == ["01_first.png", "02_second.png"]
+
+    with Image.open(run_dir / "01_first.png") as first:
+        assert first.size == (32, 16)
+        assert first.convert("RGB").getpixel((5, 5)) == (255, 0, 0)
+
+
+def test_debugger_runs_do_not_clobber(tmp_path):
+    for _ in range(2):
+        with Debugger(enabled=True, output_dir=str(tmp_path)) as debugger:
+            debugger.save(Image.new("L", (10, 10)), "step")
+
+    assert len(os.listdir(tmp_path)) == 2
+
+
+def test_disabled_debugger_is_noop(tmp_path):
+    debugger = Debugger(enabled=False, output_dir=str(tmp_path / "never"))
+    debugger.save(Image.new("L", (10, 10)), "step")
+    debugger.close()
+    assert not (tmp_path / "never").exists()
@@ -0,0 +1,45 @@
+from PIL import Image, ImageChops, ImageDraw, ImageFilter
+from polaroid import edges
+from polaroid import config
+
+
+def _full_ring(size, width_ref, depth_ratio, blur_ratio, strength, bleed):
+    """Эталон: кольцо на всем расширенном холсте, как до перехода на полосы."""
+    w, h = size
+    pad_w, pad_h = w + bleed * 2, h + bleed * 2
+    depth_px = int(width_ref * depth_ratio)
+    r_photo = int(width_ref * config.PHOTO_CORNER_RADIUS)
+
+    outer = Image.new("L", (pad_w, pad_h), 0)
+    ImageDraw.Draw(outer).rounded_rectangle((0, 0, pad_w, pad_h), radius=r_photo, fill=255)
+    inner = Image.new("L", (pad_w, pad_h), 0)
+    ImageDraw.Draw(inner).rounded_rectangle(
+        (depth_px, depth_px, pad_w - depth_px, pad_h - depth_px),
+        radius=max(0, r_photo - depth_px // 2), fill=255
+    )
+    ring = ImageChops.difference(outer, inner).filter(ImageFilter.GaussianBlur(int(width_ref * blur_ratio)))
+    alpha = ImageChops.multiply(ring, outer).crop((bleed, bleed, bleed + w, bleed + h))
+    return alpha.point(lambda x: int(x * strength / 255.0))
+
+
+def test_ring_strips_match_full_canvas():
+    """Полосы у краев дают ту же альфу, что и кольцо на всем холсте."""
+    size, width_ref, bleed = (900, 700), 900, 27
+    strips = edges.ring_strips(size, width_ref, 0.01, 0.02, (0, 0, 0), 230, bleed=bleed)
+
+    canvas = Image.new("RGBA", size, (0, 0, 0, 0))
+    edges.apply_ring(canvas, strips)
+    expected = _full_ring(size, width_ref, 0.01, 0.02, 230, bleed)
+
+    assert len(strips) == 4
+    assert ImageChops.difference(canvas.getchannel("A"), expected).getbbox() is None
+
+
+def test_ring_strips_are_cached():
+    """Повторный запрос с теми же параметрами берется из кэша."""
+    edges.clear_cache()
+    first = edges.ring_strips((300, 200), 300, 0.02, 0.03, (200, 50, 255), 130)
+    second = edges.ring_strips((300, 200), 300, 0.02, 0.03, (200, 50, 255), 130)
+
+    assert first is second
+    assert edges.cache_info().hits == 1
@@ -0,0 +1,59 @@
+import io
+import threading
+import pytest
+from PIL import Image
+from polaroid import process_image, render_to_bytes
+from polaroid.exceptions import EncodingError
+from polaroid.trace import TraceCollector
+
+
+@pytest.fixture(scope="module")
+def result():
+    return process_image(Image.new("RGB", (160, 120), color="teal"), seed=1)
+
+
+def test_encode_png_roundtrip(result):
+    """PNG кодируется без потерь; все три выхода закодированы."""
+    encoded = result.encode("png", compress_level=1)
+
+    assert set(encoded) == {"image", "mask", "normal"}
+    assert encoded["image"].mime_type == "image/png"
+    assert Image.open(io.BytesIO(encoded["image"].data)).tobytes() == result.image.tobytes()
+    assert Image.open(io.BytesIO(encoded["mask"].data)).tobytes() == result.photo_mask.tobytes()
+
+
+def test_encode_jpeg_has_separate_alpha(result):
+    """JPEG не хранит прозрачность: альфа отдается отдельным PNG, маска остается без потерь."""
+    encoded = result.encode("jpg", outputs=("image", "mask"), quality=80)
+
+    assert set(encoded) == {"image", "alpha", "mask"}
+    assert Image.open(io.BytesIO(encoded["image"].data)).mode == "RGB"
+    alpha = Image.open(io.BytesIO(encoded["alpha"].data))
+    assert alpha.tobytes() == result.image.getchannel("A").tobytes()
+    assert encoded["mask"].format == "png"
+
+
+def test_encode_builds_side_outputs_in_pool():
+    """Ленивые маска и карта нормалей строятся в задачах пула кодирования, а не в вызывающем потоке."""
+    collector = TraceCollector()
+    result = process_image(Image.new("RGB", (160, 120), color="plum"), seed=3, tracer=collector)
+
+    encoded = result.encode("png", compress_level=1)
+
+    side_spans = [span for span in collector.spans if span.name in ("photo_mask", "normal_map")]
+    assert len(side_spans) == 2
+    assert all(span.thread_id != threading.get_ident() for span in side_spans)
+    assert Image.open(io.BytesIO(encoded["normal"].data)).tobytes() == result.normal_map.tobytes()
+
+
+def test_render_to_bytes_skips_unrequested_outputs():
+    """render_to_bytes не строит карту нормалей, если она не запрошена."""
+    encoded = render_to_bytes(Image.new("RGB", (160, 120)), format="webp", outputs=("image",), seed=2)
+
+    assert set(encoded) == {"image"}
+    assert encoded["image"].extension == ".webp"
+
+
+def test_encode_rejects_unknown_format(result):
+    with pytest.raises(EncodingError):
+        result.encode("bmp")
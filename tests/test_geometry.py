@@ -1,4 +1,5 @@
-from polaroid.geometry import calculate_layout
+from PIL import Image
+from polaroid.geometry import calculate_layout, rotation_cover_scale, rotation_transform
 from polaroid import config
 
 
@@ -21,3 +22,21 @@ def test_layout_calculation():
 
     assert layout.total_size == (1120, 1240)
     assert layout.photo_pos == (60, 60)  # Фото сдвинуто на side и top
+
+
+def test_rotation_transform_covers_window():
+    """
+    Поворот с коэффициентом rotation_cover_scale не оставляет прозрачных углов,
+    а нулевой угол не требует увеличения.
+    """
+    assert rotation_cover_scale(300, 200, 0) == 1.0
+
+    block = Image.new("RGBA", (300, 200), (255, 0, 0, 255))
+    scale = rotation_cover_scale(300, 200, 0.5)
+    rotated = block.transform(
+        (300, 200), Image.AFFINE,
+        rotation_transform((300, 200), 0.5, scale),
+        resample=Image.BICUBIC
+    )
+
+    assert rotated.getchannel("A").getextrema() == (255, 255)
@@ -0,0 +1,66 @@
+import io
+import pytest
+from PIL import Image
+from polaroid.core import process_path
+from polaroid.exceptions import ImageValidationError
+from polaroid.loader import open_image
+from polaroid.profiles import compile_profile, snapshot
+
+
+def _jpeg_bytes(size, exif_orientation=None):
+    buffer = io.BytesIO()
+    options = {}
+    if exif_orientation is not None:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        options["exif"] = exif
+    Image.new("RGB", size, "green").save(buffer, format="JPEG", **options)
+    buffer.seek(0)
+    return buffer
+
+
+def test_open_image_decodes_jpeg_reduced():
+    """
+    JPEG декодируется в уменьшенном масштабе, но не меньше запрошенного размера.
+    """
+    image, source_size = open_image(_jpeg_bytes((1600, 1200)), max_dimension=300)
+
+    assert source_size == (1600, 1200)
+    assert image.size == (400, 300)  # масштаб 1/4 — ближайший, не меньший 300px
+
+
+def test_open_image_applies_exif_orientation():
+    image, source_size = open_image(_jpeg_bytes((400, 200), exif_orientation=6))
+
+    assert source_size == (200, 400)
+    assert image.size == (200, 400)
+
+
+def test_open_image_rejects_before_decoding():
+    with pytest.raises(ImageValidationError):
+        open_image(_jpeg_bytes((1000, 100)))
+
+    with pytest.raises(ImageValidationError):
+        open_image(io.BytesIO(b"not an image"))
+
+
+def test_process_path_matches_full_render_proportions():
+    result = process_path(_jpeg_bytes((1600, 1200)), seed=1, target_size=400, quality="draft")
+
+    assert max(result.image.size) <= 400
+    assert result.style_info["source_size"] == (1600, 1200)
+
+
+def test_process_path_uses_profile_size_limits():
+    """Проверка размеров по заголовку берет лимиты из профиля, а не из config."""
+    profile = compile_profile("test-small", snapshot(MIN_IMAGE_SIZE=20))
+    buffer = io.BytesIO()
+    Image.new("RGB", (30, 30), "green").save(buffer, format="PNG")
+
+    buffer.seek(0)
+    result = process_path(buffer, profile=profile, seed=1, generate_normal=False)
+    assert result.style_info["source_size"] == (30, 30)
+
+    buffer.seek(0)
+    with pytest.raises(ImageValidationError):
+        process_path(buffer, seed=1)
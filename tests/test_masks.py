@@ -0,0 +1,38 @@
+from polaroid import masks
+
+
+def test_radial_mask_center_and_corners():
+    """
+    Виньетка: центр нетронут (255), углы затемнены на strength.
+    """
+    masks.clear_cache()
+    mask = masks.radial_mask((400, 300), radius=0.5, strength=0.4)
+
+    assert mask.size == (400, 300)
+    assert mask.getpixel((200, 150)) == 255
+    assert 150 <= mask.getpixel((2, 2)) < 200
+
+
+def test_radial_mask_inverted():
+    """
+    Инвертированная маска (размытие): 0 в центре, растет к краям.
+    """
+    masks.clear_cache()
+    mask = masks.radial_mask((400, 300), radius=0.6, strength=1.0, invert=True)
+
+    assert mask.getpixel((200, 150)) == 0
+    assert mask.getpixel((2, 2)) > 200
+
+
+def test_radial_masks_share_distance_field():
+    """
+    Повторный запрос берется из кэша, разные маски одного размера делят поле расстояний.
+    """
+    masks.clear_cache()
+    first = masks.radial_mask((400, 300), 0.5, 0.4)
+    masks.radial_mask((400, 300), 0.6, 1.0, invert=True)
+    again = masks.radial_mask((400, 300), 0.5, 0.4)
+
+    assert first is again
+    assert masks.cache_info().hits == 1
+    assert masks._distance_cache.info().currsize == 1
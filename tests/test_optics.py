@@ -0,0 +1,54 @@
+import os
+from PIL import Image, ImageChops, ImageFilter
+from polaroid import optics
+from polaroid import masks
+from polaroid import config
+from polaroid import profiles
+
+
+def test_soft_focus_matches_full_frame_blur():
+    """Размытие только периферии совпадает с размытием всего кадра через маску, и при дробном радиусе."""
+    image = Image.frombytes("RGB", (640, 480), os.urandom(640 * 480 * 3))
+    mask = masks.radial_mask(image.size, config.OPTICS_BLUR_SHARP_AREA, 1.0, invert=True)
+
+    for radius in (3, 0.36, 0.5, 1.7):
+        expected = Image.composite(image.filter(ImageFilter.GaussianBlur(radius=radius)), image, mask)
+        result = optics._soft_focus(image, radius)
+        assert ImageChops.difference(result, expected).getbbox() is None, radius
+
+
+def test_lens_scales_red_channel_only():
+    """Аберрация увеличивает только красный канал, зеленый и синий не меняются."""
+    image = Image.frombytes("RGB", (300, 200), os.urandom(300 * 200 * 3))
+    result = optics.apply_lens(image, aberration=0.01, distortion=0.0)
+
+    assert result.getchannel("G").tobytes() == image.getchannel("G").tobytes()
+    assert result.getchannel("B").tobytes() == image.getchannel("B").tobytes()
+    assert result.getchannel("R").tobytes() != image.getchannel("R").tobytes()
+    assert result.size == image.size
+
+
+def test_lens_distortion_keeps_center():
+    """Дисторсия не сдвигает центр кадра и не оставляет черных углов."""
+    image = Image.new("RGB", (256, 256), (200, 100, 50))
+    image.putpixel((128, 128), (0, 0, 0))
+
+    for k in (-0.1, 0.1):
+        result = optics.apply_lens(image, aberration=0.0, distortion=k)
+        assert result.size == image.size
+        assert result.getpixel((0, 0)) == (200, 100, 50)
+        assert result.getpixel((255, 255)) == (200, 100, 50)
+        assert result.getpixel((128, 128)) != (200, 100, 50)
+
+
+def test_optics_region_matches_full_frame():
+    """Фрагмент оптики (с дисторсией) совпадает с тем же окном обработки всего кадра."""
+    image = Image.frombytes("RGB", (400, 300), os.urandom(400 * 300 * 3))
+    settings = profiles.snapshot(LENS_DISTORTION=-0.05)
+    full = optics.apply_optics(image, settings=settings)
+
+    for box in [(0, 0, 150, 120), (130, 90, 330, 260), (300, 200, 400, 300)]:
+        source_box = optics.optics_source_box(image.size, box, settings=settings)
+        part = optics.apply_optics_region(image.crop(source_box), source_box[:2], image.size, box, settings=settings)
+        diff = ImageChops.difference(part, full.crop(box))
+        assert max(high for _, high in diff.getextrema()) <= 1
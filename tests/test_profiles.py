@@ -0,0 +1,79 @@
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from PIL import Image
+from polaroid import config
+from polaroid import process_image, register_profile, unregister_profile, get_profile, InvalidProfileError
+
+
+@pytest.fixture
+def scratch_profiles():
+    """Имена профилей, зарегистрированных тестом; после теста они удаляются из реестра."""
+    names = []
+    yield names
+    for name in names:
+        unregister_profile(name)
+
+
+def test_unknown_profile_raises():
+    """Незарегистрированный профиль — InvalidProfileError, а не молчаливый classic."""
+    with pytest.raises(InvalidProfileError):
+        process_image(Image.new("RGB", (100, 100)), profile="no-such-look")
+
+
+def test_unknown_setting_raises():
+    with pytest.raises(InvalidProfileError):
+        register_profile("broken", NOT_A_SETTING=1)
+
+
+def test_profile_is_isolated_snapshot(scratch_profiles):
+    """Профиль со своими параметрами не меняет config и дает другой результат."""
+    scratch_profiles.append("test-warm")
+    profile = register_profile("test-warm", PAPER_COLOR=(250, 240, 220), GRAIN_INTENSITY=0.0)
+
+    img = Image.new("RGB", (300, 300), "gray")
+    warm = process_image(img, profile="test-warm", seed=1, generate_normal=False)
+    classic = process_image(img, seed=1, generate_normal=False)
+
+    assert config.PAPER_COLOR == get_profile("classic").settings.PAPER_COLOR
+    assert profile.chassis_colors[0] == (250, 240, 220)
+    assert warm.style_info["profile"] == "test-warm"
+    assert warm.image.tobytes() != classic.image.tobytes()
+
+
+def test_two_profiles_render_concurrently(scratch_profiles):
+    """Два профиля в параллельных потоках дают тот же результат, что и последовательно."""
+    scratch_profiles.append("test-cold")
+    register_profile("test-cold", base="classic", FRINGE_STRENGTH=0, VIGNETTE_STRENGTH=0.1)
+    img = Image.new("RGB", (300, 240), "olive")
+
+    def render(name):
+        return process_image(img, profile=name, seed=4, generate_normal=False).image.tobytes()
+
+    expected = [render("classic"), render("test-cold")]
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(render, ["classic", "test-cold"] * 4))
+
+    assert results == expected * 4
+
+
+def test_compiled_profile_pickles():
+    """Скомпилированный профиль можно передать в другой процесс."""
+    profile = get_profile("classic")
+    assert pickle.loads(pickle.dumps(profile)) == profile
+
+
+def test_profile_overrides_chemistry_and_normal_tiles(scratch_profiles):
+    """Параметры проявки и тайлов карты нормалей из профиля действительно применяются."""
+    scratch_profiles.append("test-chem")
+    profile = register_profile("test-chem", CHEMISTRY_BLACK_POINT=60, CHEMISTRY_SHADOW_RED_SCALE=0.5,
+                               NORMAL_TILE_SEED=1)
+    img = Image.new("RGB", (200, 160), (30, 80, 130))
+
+    custom = process_image(img, profile="test-chem", seed=2)
+    classic = process_image(img, seed=2)
+
+    assert profile.chemistry_lut != get_profile("classic").chemistry_lut
+    assert min(profile.chemistry_lut) == 60
+    assert custom.image.tobytes() != classic.image.tobytes()
+    assert custom.normal_map.tobytes() != classic.normal_map.tobytes()
@@ -0,0 +1,107 @@
+import os
+from PIL import Image
+import polaroid
+from polaroid import process_image, get_profile
+from polaroid.result_cache import ResultCache
+
+
+def test_result_cache_hit_matches_render(tmp_path):
+    """Повторный запрос читается из кэша и совпадает с рендером, включая ленивые выходы."""
+    cache = ResultCache(str(tmp_path))
+    img = Image.new("RGB", (160, 120), color="navy")
+
+    first = cache.process_image(img, seed=3)
+    second = cache.process_image(img.copy(), seed=3)
+    reference = process_image(img, seed=3)
+
+    assert "cached" not in first.style_info
+    assert second.style_info["cached"] is True
+    assert second.image.tobytes() == reference.image.tobytes()
+    assert second.photo_mask.tobytes() == reference.photo_mask.tobytes()
+    assert second.normal_map.tobytes() == reference.normal_map.tobytes()
+
+    # Другой seed или параметры — другая запись
+    cache.process_image(img, seed=4)
+    cache.process_image(img, seed=3, target_size=150)
+    info = cache.info()
+    assert (info.hits, info.misses) == (1, 3)
+
+
+def test_result_cache_bypass_and_eviction(tmp_path):
+    """Вызовы без seed идут мимо кэша; при превышении лимита вытесняются старые записи."""
+    img = Image.new("RGB", (160, 120), color="olive")
+    cache = ResultCache(str(tmp_path))
+
+    cache.process_image(img)
+    assert cache.info().bypassed == 1
+    assert cache.info().currsize == 0
+
+    cache.process_image(img, seed=1)
+    entry_size = cache.info().currsize
+    small = ResultCache(str(tmp_path), max_bytes=int(entry_size * 2.5))
+    small.process_image(img, seed=2)
+    small.process_image(img, seed=3)
+
+    info = small.info()
+    assert info.evictions == 1
+    assert info.currsize <= small.max_bytes
+
+
+def test_result_cache_path_and_corrupt_entry(tmp_path):
+    """process_path кэшируется по байтам файла; поврежденная запись считается промахом."""
+    src = tmp_path / "photo.png"
+    Image.new("RGB", (160, 120), color="maroon").save(src)
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    first = cache.process_path(str(src), seed=5)
+    for root, _, files in os.walk(cache.directory):
+        for name in files:
+            with open(os.path.join(root, name), "wb") as f:
+                f.write(b"garbage")
+
+    again = cache.process_path(str(src), seed=5)
+    assert again.image.tobytes() == first.image.tobytes()
+    assert cache.process_path(str(src), seed=5).style_info["cached"] is True
+    assert cache.info().misses == 2
+
+
+def test_result_cache_entry_is_png_with_metadata(tmp_path, monkeypatch):
+    """Запись — PNG с JSON-метаданными (без pickle); ключ зависит от версии библиотеки."""
+    cache = ResultCache(str(tmp_path))
+    img = Image.new("RGB", (160, 120), color="teal")
+    result = cache.process_image(img, seed=6, quality="draft", target_size=150)
+
+    paths = [os.path.join(root, name) for root, _, files in os.walk(cache.directory) for name in files]
+    assert len(paths) == 1
+    with Image.open(paths[0]) as entry:
+        assert entry.format == "PNG"
+        assert '"seed": 6' in entry.text["polaroid"]
+
+    cached = cache.process_image(img, seed=6, quality="draft", target_size=150)
+    assert cached.style_info["rotation"] == result.style_info["rotation"]
+    assert cached.photo_rect == result.photo_rect
+    assert cached.photo_mask.tobytes() == result.photo_mask.tobytes()
+
+    key = ResultCache.key("content", get_profile("classic"), {"seed": 6})
+    monkeypatch.setattr(polaroid, "__version__", "0.0.0-test")
+    assert ResultCache.key("content", get_profile("classic"), {"seed": 6}) != key
+
+
+def test_result_cache_size_matches_disk(tmp_path):
+    """currsize совпадает с байтами записей на диске, в том числе после перезаписи ключа."""
+    cache = ResultCache(str(tmp_path))
+    img = Image.new("RGB", (160, 120), color="navy")
+
+    def disk_bytes():
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, files in os.walk(cache.directory) for name in files)
+
+    result = cache.process_image(img, seed=1)
+    assert cache.info().currsize == disk_bytes()
+
+    cache.process_image(img, seed=2)
+    assert cache.info().currsize == disk_bytes()
+
+    path = next(os.path.join(root, name) for root, _, files in os.walk(cache.directory) for name in files)
+    cache._store(path, result)
+    assert cache.info().currsize == disk_bytes()
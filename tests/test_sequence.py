@@ -0,0 +1,71 @@
+from PIL import Image, ImageChops, ImageSequence, ImageStat
+from polaroid import process_image, process_sequence, save_animation
+from polaroid.profiles import compile_profile, snapshot
+
+
+def _frames(count, size=(180, 140)):
+    return [Image.new("RGB", size, (40 * i % 256, 90, 160)) for i in range(count)]
+
+
+def test_sequence_single_frame_matches_process_image():
+    """Одиночный кадр последовательности совпадает с process_image того же seed."""
+    frame = Image.effect_noise((180, 140), 30).convert("RGB")
+
+    (result,) = process_sequence([frame], seed=7, workers=1)
+    reference = process_image(frame, seed=7)
+
+    assert result.image.tobytes() == reference.image.tobytes()
+    assert result.photo_mask.tobytes() == reference.photo_mask.tobytes()
+    assert result.style_info["rotation"] == reference.style_info["rotation"]
+
+
+def test_sequence_single_frame_matches_with_tile_bank():
+    """С банком тайлов зерна одиночный кадр тоже совпадает с process_image, а переходы работают."""
+    profile = compile_profile("test-tile-bank", snapshot(GRAIN_TILE_BANK=True))
+    frame = Image.effect_noise((180, 140), 30).convert("RGB")
+
+    (result,) = process_sequence([frame], profile=profile, seed=7, workers=1)
+    reference = process_image(frame, profile=profile, seed=7)
+    assert result.image.tobytes() == reference.image.tobytes()
+
+    results = list(process_sequence([frame] * 3, profile=profile, seed=7, grain_period=2, workers=1))
+    assert results[0].image.tobytes() == reference.image.tobytes()
+    assert results[1].image.tobytes() != results[0].image.tobytes()
+
+
+def test_sequence_grain_is_temporally_coherent():
+    """Поворот общий, а зерно меняется между ключевыми кадрами плавно."""
+    frame = Image.new("RGB", (180, 140), "gray")
+    results = list(process_sequence([frame] * 5, seed=3, grain_period=4, workers=2))
+
+    assert [r.style_info["frame"] for r in results] == [0, 1, 2, 3, 4]
+    assert len({r.style_info["rotation"] for r in results}) == 1
+
+    def distance(a, b):
+        return ImageStat.Stat(ImageChops.difference(a.image, b.image).convert("L")).sum[0]
+
+    # Соседние кадры ближе друг к другу, чем ключевые кадры между собой
+    assert 0 < distance(results[0], results[1]) < distance(results[0], results[4])
+
+
+def test_sequence_adjacent_seeds_are_not_shifted():
+    """Соседние сиды не дают сдвинутых на кадр поворотов и зерна."""
+    frames = [Image.new("RGB", (120, 100), "gray")] * 2
+    first = list(process_sequence(frames, seed=10, fixed_rotation=False, grain_period=1, workers=1))
+    second = list(process_sequence(frames, seed=11, fixed_rotation=False, grain_period=1, workers=1))
+
+    assert first[1].style_info["rotation"] != second[0].style_info["rotation"]
+    assert first[1].image.tobytes() != second[0].image.tobytes()
+
+
+def test_save_animation_formats(tmp_path):
+    """Кадры сохраняются в анимированные WebP, GIF и APNG."""
+    results = list(process_sequence(_frames(3), seed=1, fixed_rotation=False))
+    assert len({r.style_info["rotation"] for r in results}) == 3
+
+    for name in ("anim.webp", "anim.gif", "anim.png"):
+        path = tmp_path / name
+        save_animation(results, str(path), duration=80)
+        with Image.open(path) as image:
+            assert sum(1 for _ in ImageSequence.Iterator(image)) == 3
+            assert image.size == results[0].image.size
@@ -0,0 +1,32 @@
+from PIL import ImageChops
+from polaroid import texture
+
+
+def _row_step(image, y):
+    """Средняя разница между строками y-1 и y канала G."""
+    w = image.width
+    upper = image.crop((0, y - 1, w, y)).getchannel("G").tobytes()
+    lower = image.crop((0, y, w, y + 1)).getchannel("G").tobytes()
+    return sum(abs(a - b) for a, b in zip(upper, lower)) / w
+
+
+def test_normal_tiles_are_seamless():
+    """Тайл нормалей стыкуется сам с собой без шва."""
+    tile = texture.normal_tiles("cardboard")[0]
+    w, h = tile.size
+
+    # Сдвигаем тайл по кругу: бывшая граница оказывается на строке h // 2
+    wrapped = ImageChops.offset(tile, w // 2, h // 2)
+    inner = sum(_row_step(wrapped, y) for y in range(10, 20)) / 10
+
+    assert _row_step(wrapped, h // 2) < inner * 1.5
+
+
+def test_combined_normal_is_deterministic_with_seed():
+    """Одинаковый seed дает одинаковую карту нормалей нужного размера."""
+    a = texture.create_combined_normal((400, 500), (20, 20, 360, 360), seed=7)
+    b = texture.create_combined_normal((400, 500), (20, 20, 360, 360), seed=7)
+
+    assert a.size == (200, 250)
+    assert a.mode == "RGB"
+    assert a.tobytes() == b.tobytes()
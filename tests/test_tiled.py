@@ -0,0 +1,47 @@
+from PIL import Image, ImageChops
+from polaroid import process_image
+from polaroid.profiles import compile_profile, snapshot
+from polaroid.tiled import process_image_tiled, iter_tiles, tile_boxes
+
+def _source():
+    img = Image.radial_gradient("L").resize((420, 300)).convert("RGB")
+    return Image.blend(img, Image.effect_noise((420, 300), 60).convert("RGB"), 0.3)
+
+def test_tiled_matches_monolithic_render():
+    """Тайловый рендер совпадает с обычным в пределах округления ресемплинга, без швов."""
+    img = _source()
+
+    full = process_image(img, seed=7)
+    tiled = process_image_tiled(img, seed=7, tile_size=96, workers=2)
+
+    assert tiled.image.size == full.image.size
+    assert tiled.style_info["rotation"] == full.style_info["rotation"]
+    diff = ImageChops.difference(tiled.image, full.image)
+    assert max(high for _, high in diff.getextrema()) <= 2
+    assert tiled.photo_mask.tobytes() == full.photo_mask.tobytes()
+    assert tiled.normal_map.tobytes() == full.normal_map.tobytes()
+
+def test_iter_tiles_covers_canvas():
+    """Тайлы покрывают холст без пропусков и совпадают с собранным снимком."""
+    img = _source()
+    result = process_image_tiled(img, seed=2, tile_size=128)
+
+    canvas = Image.new("RGBA", result.image.size)
+    boxes = []
+    for box, tile in iter_tiles(img, seed=2, tile_size=128):
+        assert tile.size == (box[2] - box[0], box[3] - box[1])
+        canvas.paste(tile, box[:2])
+        boxes.append(box)
+
+    assert boxes == tile_boxes(result.image.size, 128)
+    assert canvas.tobytes() == result.image.tobytes()
+
+def test_tiled_uses_profile_tile_size():
+    """Размер тайла по умолчанию берется из профиля, а не из config."""
+    img = _source()
+    profile = compile_profile("test-tiles", snapshot(TILE_SIZE=128, TILED_WORKERS=1))
+
+    result = process_image_tiled(img, profile=profile, seed=2)
+
+    assert result.style_info["tiles"] == len(tile_boxes(result.image.size, 128))
+    assert result.image.tobytes() == process_image_tiled(img, seed=2, tile_size=128).image.tobytes()
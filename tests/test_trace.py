@@ -0,0 +1,55 @@
+import json
+import time
+from PIL import Image
+from polaroid.core import process_image
+from polaroid.trace import StageTimer, TraceCollector
+
+
+def test_tracer_receives_stage_spans():
+    """
+    Трассировщик получает замеры этапов, а разбивка попадает в style_info.
+    """
+    collector = TraceCollector()
+    img = Image.new("RGB", (200, 150), "red")
+
+    result = process_image(img, tracer=collector, seed=1)
+    result.normal_map  # карта нормалей строится лениво и тоже попадает в трассировку
+
+    names = {span.name for span in collector.spans}
+    assert {"chemistry", "optics", "grain", "chassis", "shadow", "compositing", "normal_map"} <= names
+
+    timings = result.style_info["timings"]
+    assert timings["chemistry"]["pixels"] == 200 * 150
+    assert timings["compositing"]["wall"] >= 0
+
+
+def test_chrome_trace_export(tmp_path):
+    """
+    Замеры выгружаются в формате Chrome Trace.
+    """
+    collector = TraceCollector()
+    process_image(Image.new("RGB", (200, 150)), tracer=collector, generate_normal=False)
+
+    path = tmp_path / "trace.json"
+    collector.dump_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+
+    assert events and all(e["ph"] == "X" for e in events)
+
+
+def test_no_timings_without_tracer():
+    result = process_image(Image.new("RGB", (200, 150)), generate_normal=False)
+    assert "timings" not in result.style_info
+
+
+def test_memory_report_samples_inside_stage():
+    """Пик памяти замеряется внутри этапа, а не только на его конце."""
+    timer = StageTimer(memory=True, sample_interval=0.001)
+    with timer.stage("scratch"):
+        scratch = Image.new("RGB", (2000, 2000))
+        time.sleep(0.05)
+        del scratch
+
+    # В замер попадают и буферы кэшей процесса, поэтому сравниваем с концом этапа
+    stage = timer.memory_report()["stages"]["scratch"]
+    assert stage["peak_image_bytes"] - stage["image_bytes"] >= 2000 * 2000 * 4
@@ -0,0 +1,44 @@
+import pytest
+from PIL import Image
+from polaroid import process_image, process_variants
+from polaroid.trace import TraceCollector
+
+
+def test_variants_match_process_image():
+    """Каждый вариант совпадает с отдельным process_image того же seed."""
+    img = Image.effect_noise((220, 170), 40).convert("RGB")
+
+    variants = process_variants(img, seeds=[1, 2, 3], workers=2)
+
+    assert [v.style_info["seed"] for v in variants] == [1, 2, 3]
+    for variant in variants:
+        reference = process_image(img, seed=variant.style_info["seed"])
+        assert variant.image.tobytes() == reference.image.tobytes()
+        assert variant.photo_mask.tobytes() == reference.photo_mask.tobytes()
+        assert variant.style_info["rotation"] == reference.style_info["rotation"]
+
+
+def test_variants_share_seed_independent_stages():
+    """Проявка и оптика выполняются один раз, зерно и рамка — для каждого варианта."""
+    collector = TraceCollector()
+    img = Image.new("RGB", (220, 170), "orange")
+
+    variants = process_variants(img, seeds=[5, None], tracer=collector, target_size=200, quality="draft")
+
+    names = [span.name for span in collector.spans]
+    assert names.count("chemistry") == 1 and names.count("optics") == 1
+    assert names.count("grain") == 2 and names.count("chassis") == 2
+    assert "chemistry" in variants[1].style_info["timings"]
+    assert isinstance(variants[1].style_info["seed"], int)
+
+
+def test_variants_memory_report_and_debug():
+    """memory_report дает отчет в каждом варианте; debug не поддерживается и отклоняется."""
+    img = Image.new("RGB", (220, 170), "teal")
+
+    variants = process_variants(img, seeds=[1, 2], memory_report=True, generate_normal=False, workers=1)
+    for variant in variants:
+        assert {"chemistry", "grain"} <= set(variant.style_info["memory"]["stages"])
+
+    with pytest.raises(TypeError):
+        process_variants(img, seeds=[1], debug=True)